@@ -8,6 +8,7 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import hashlib
 from collections import defaultdict
 
 from alarm_backends.core.cache.base import CacheManager
@@ -29,6 +30,8 @@ class AssignCacheManager(CacheManager):
     BIZ_CACHE_KEY_TEMPLATE = CacheManager.CACHE_KEY_PREFIX + ".assign.biz_{bk_biz_id}"
     PRIORITY_CACHE_KEY_TEMPLATE = CacheManager.CACHE_KEY_PREFIX + ".assign.biz_priority_{bk_biz_id}_{priority}"
     GROUP_CACHE_KEY_TEMPLATE = CacheManager.CACHE_KEY_PREFIX + ".assign.biz_group_{bk_biz_id}_{group_id}"
+    # 分派配置版本，配置内容变化时更新，用于进程内的规则索引失效
+    VERSION_CACHE_KEY = CacheManager.CACHE_KEY_PREFIX + ".assign.version"
 
     @classmethod
     def clear(cls):
@@ -86,6 +89,10 @@ class AssignCacheManager(CacheManager):
 
         return local.assign_cache[cache_key]
 
+    @classmethod
+    def get_version(cls):
+        return cls.cache.get(cls.VERSION_CACHE_KEY)
+
     @classmethod
     def get_global_config(cls, key_template, **kwargs):
         kwargs.update({"bk_biz_id": GLOBAL_BIZ_ID})
@@ -178,6 +185,9 @@ class AssignCacheManager(CacheManager):
         deleted_groups = AlertAssignGroup.origin_objects.filter(is_deleted=True)
         for group in deleted_groups:
             pipeline.delete(cls.GROUP_CACHE_KEY_TEMPLATE.format(bk_biz_id=group.bk_biz_id, group_id=group.id))
+
+        version = hashlib.md5(extended_json.dumps([groups, rules]).encode()).hexdigest()
+        pipeline.set(cls.VERSION_CACHE_KEY, version, cls.CACHE_TIMEOUT)
         pipeline.execute()
 
 
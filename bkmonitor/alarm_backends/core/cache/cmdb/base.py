@@ -11,14 +11,18 @@ specific language governing permissions and limitations under the License.
 
 
 import abc
+import hashlib
 import json
 import time
+from typing import Optional
 
 import six.moves.cPickle as pickle
+from django.conf import settings
 from django.core.cache import caches
 
 from alarm_backends.constants import CONST_ONE_DAY
 from alarm_backends.core.cache.base import CacheManager
+from alarm_backends.core.cache.local import MISSING, BizVersionedLRUCache
 from alarm_backends.core.storage.redis import Cache
 from core.drf_resource import api
 from core.prometheus import metrics
@@ -36,6 +40,9 @@ class CMDBCacheManager(CacheManager):
     CACHE_TIMEOUT = 7 * CONST_ONE_DAY
     ObjectClass = None
     cache = Cache("cache-cmdb")
+    # 是否启用进程内LRU缓存，启用的子类需保证数据变更时按业务调用 incr_version
+    LOCAL_CACHE_ENABLED = False
+    _local_caches = {}
 
     @classmethod
     def serialize(cls, obj):
@@ -68,6 +75,61 @@ class CMDBCacheManager(CacheManager):
         """
         return origin_key
 
+    @classmethod
+    def get_version_key(cls):
+        return "{}.biz_version".format(cls.CACHE_KEY)
+
+    @classmethod
+    def incr_version(cls, *bk_biz_ids):
+        """
+        递增业务缓存版本号，通知各进程清理对应业务的本地缓存
+        未指定业务时递增全局版本号，各进程清空本地缓存
+        """
+        pipeline = cls.cache.pipeline()
+        for bk_biz_id in bk_biz_ids or [BizVersionedLRUCache.ALL_BIZ]:
+            pipeline.hincrby(cls.get_version_key(), str(bk_biz_id), 1)
+        pipeline.expire(cls.get_version_key(), cls.CACHE_TIMEOUT)
+        pipeline.execute()
+
+    @classmethod
+    def set_local_cache(cls, local_cache: BizVersionedLRUCache, key, obj):
+        """
+        写入本地缓存，按对象所属业务记录，以便按业务失效
+        """
+        local_cache.set(key, obj, bk_biz_id=getattr(obj, "bk_biz_id", None) if obj else None)
+
+    @classmethod
+    def get_local_cache(cls) -> Optional[BizVersionedLRUCache]:
+        """
+        获取进程内LRU缓存，未启用时返回None
+        本地缓存中的对象在进程内共享，调用方不应修改
+        """
+        if not cls.LOCAL_CACHE_ENABLED or settings.CMDB_LOCAL_CACHE_SIZE <= 0:
+            return None
+
+        local_cache = cls._local_caches.get(cls.CACHE_KEY)
+        if local_cache is None:
+            local_cache = cls._local_caches.setdefault(
+                cls.CACHE_KEY,
+                BizVersionedLRUCache(
+                    name=cls.type,
+                    version_getter=lambda: cls.cache.hgetall(cls.get_version_key()),
+                    maxsize=settings.CMDB_LOCAL_CACHE_SIZE,
+                    check_interval=settings.CMDB_LOCAL_CACHE_CHECK_INTERVAL,
+                ),
+            )
+        local_cache.check_version()
+        return local_cache
+
+    @classmethod
+    def clear_local_cache(cls):
+        """
+        清空当前进程的本地缓存
+        """
+        local_cache = cls._local_caches.get(cls.CACHE_KEY)
+        if local_cache is not None:
+            local_cache.clear()
+
     @classmethod
     def multi_get(cls, keys):
         """
@@ -79,14 +141,19 @@ class CMDBCacheManager(CacheManager):
             return []
         keys = list(keys)
 
-        objs = cls.cache.hmget(cls.CACHE_KEY, keys)
-        result = []
-        for obj in objs:
-            if obj:
-                result.append(cls.deserialize(obj))
-            else:
-                result.append(None)
-        return result
+        local_cache = cls.get_local_cache()
+        objs = local_cache.get_many(keys) if local_cache is not None else {}
+
+        # 仅从redis中获取本地未命中的对象
+        missing_keys = [key for key in keys if key not in objs]
+        if missing_keys:
+            for key, obj in zip(missing_keys, cls.cache.hmget(cls.CACHE_KEY, missing_keys)):
+                obj = cls.deserialize(obj) if obj else None
+                objs[key] = obj
+                if local_cache is not None:
+                    cls.set_local_cache(local_cache, key, obj)
+
+        return [objs[key] for key in keys]
 
     @classmethod
     def get(cls, *args, **kwargs):
@@ -95,7 +162,12 @@ class CMDBCacheManager(CacheManager):
         """
         key = cls.key_to_internal_value(*args, **kwargs)
         local_key = f"{cls.CACHE_KEY}_{key}"
-        if local_key in mem_cache:
+        local_cache = cls.get_local_cache()
+        if local_cache is not None:
+            obj = local_cache.get(key)
+            if obj is not MISSING:
+                return obj
+        elif local_key in mem_cache:
             return mem_cache.get(local_key)
 
         obj = cls.cache.hget(cls.CACHE_KEY, key)
@@ -104,7 +176,11 @@ class CMDBCacheManager(CacheManager):
             cls.logger.warning("unknown {}: {}".format(cls.__name__.replace("Manager", ""), key))
         else:
             obj = cls.deserialize(obj)
-        mem_cache.set(local_key, obj)
+
+        if local_cache is not None:
+            cls.set_local_cache(local_cache, key, obj)
+        else:
+            mem_cache.set(local_key, obj)
         return obj
 
     @classmethod
@@ -157,6 +233,7 @@ class CMDBCacheManager(CacheManager):
         清理缓存
         """
         cls.cache.delete(cls.CACHE_KEY)
+        cls.clear_local_cache()
 
 
 class RefreshByBizMixin(object):
@@ -164,6 +241,10 @@ class RefreshByBizMixin(object):
     def get_biz_cache_key(cls):
         return "{}.biz".format(cls.CACHE_KEY)
 
+    @classmethod
+    def get_digest_cache_key(cls):
+        return "{}.digest".format(cls.CACHE_KEY)
+
     @classmethod
     @abc.abstractmethod
     def refresh_by_biz(cls, bk_biz_id):
@@ -236,6 +317,10 @@ class RefreshByBizMixin(object):
         deleted_keys = set(old_keys) - set(new_keys)
         if deleted_keys:
             cls.cache.hdel(cls.CACHE_KEY, *deleted_keys)
+        if deleted_biz_ids:
+            # 业务内对象的删除已体现在该业务的摘要变化中，此处仅需处理被删除的业务
+            cls.cache.hdel(cls.get_digest_cache_key(), *deleted_biz_ids)
+            cls.incr_version(*deleted_biz_ids)
         cls.cache.expire(cls.CACHE_KEY, cls.CACHE_TIMEOUT)
 
         metrics.ALARM_CACHE_TASK_TIME.labels("0", cls.type, "None").observe(time.time() - start_time)
@@ -255,9 +340,12 @@ class RefreshByBizMixin(object):
         pipeline = cls.cache.pipeline()
         batch_objs = {}
         key_list = []
+        digest = hashlib.md5()
         for index, key in enumerate(objs_dict):
             batch_objs[key] = cls.serialize(objs_dict[key])
             key_list.append(key)
+            digest.update(str(key).encode("utf-8"))
+            digest.update(batch_objs[key].encode("utf-8"))
             if (index + 1) % 1000 == 0:
                 cls.cache.hmset(cls.CACHE_KEY, batch_objs)
                 batch_objs = {}
@@ -269,6 +357,13 @@ class RefreshByBizMixin(object):
         pipeline.hset(cls.get_biz_cache_key(), str(bk_biz_id), json.dumps(key_list))
         pipeline.execute()
 
+        # 业务数据有变化时递增版本号，使各进程的本地缓存失效
+        digest = digest.hexdigest()
+        if cls.cache.hget(cls.get_digest_cache_key(), str(bk_biz_id)) != digest:
+            cls.cache.hset(cls.get_digest_cache_key(), str(bk_biz_id), digest)
+            cls.cache.expire(cls.get_digest_cache_key(), cls.CACHE_TIMEOUT)
+            cls.incr_version(bk_biz_id)
+
     @classmethod
     def can_cache(cls, bk_biz_id: str) -> bool:
         return bool(cls.cache.set(f"{cls.CACHE_KEY}.{bk_biz_id}.updated", int(time.time()), nx=True, ex=60))
@@ -278,4 +373,6 @@ class RefreshByBizMixin(object):
         """
         清理缓存
         """
-        cls.cache.delete(cls.CACHE_KEY, cls.get_biz_cache_key())
+        cls.cache.delete(cls.CACHE_KEY, cls.get_biz_cache_key(), cls.get_digest_cache_key())
+        cls.incr_version()
+        cls.clear_local_cache()
@@ -16,6 +16,7 @@ from typing import Dict, List, Optional, Set
 from django.conf import settings
 
 from alarm_backends.core.cache.cmdb.base import CMDBCacheManager, RefreshByBizMixin
+from alarm_backends.core.cache.local import MISSING
 from api.cmdb.define import Host, TopoTree
 from bkmonitor.utils.local import local
 from core.drf_resource import api
@@ -148,6 +149,7 @@ class HostManager(RefreshByBizMixin, CMDBCacheManager):
     type = "host"
     CACHE_KEY = "{prefix}.cmdb.host".format(prefix=CMDBCacheManager.CACHE_KEY_PREFIX)
     ObjectClass = Host
+    LOCAL_CACHE_ENABLED = True
 
     @classmethod
     def key_to_internal_value(cls, ip, bk_cloud_id=0):
@@ -213,9 +215,14 @@ class HostManager(RefreshByBizMixin, CMDBCacheManager):
                 return host
 
         # 尝试使用bk_host_id获取主机信息
-        host = cls.cache.hget(cls.CACHE_KEY, bk_host_id)
-        if host:
-            host = cls.deserialize(host)
+        local_cache = cls.get_local_cache()
+        host = local_cache.get(bk_host_id) if local_cache is not None else MISSING
+        if host is MISSING:
+            host = cls.cache.hget(cls.CACHE_KEY, bk_host_id)
+            if host:
+                host = cls.deserialize(host)
+            if local_cache is not None:
+                cls.set_local_cache(local_cache, bk_host_id, host)
 
         # 本地缓存主机信息
         if using_mem:
@@ -22,6 +22,7 @@ class ModuleManager(RefreshByBizMixin, CMDBCacheManager):
 
     type = "module"
     CACHE_KEY = "{prefix}.cmdb.module".format(prefix=CMDBCacheManager.CACHE_KEY_PREFIX)
+    LOCAL_CACHE_ENABLED = True
     ObjectClass = Module
 
     @classmethod
@@ -23,6 +23,7 @@ class SetManager(RefreshByBizMixin, CMDBCacheManager):
     ObjectClass = Set
     type = "set"
     CACHE_KEY = "{prefix}.cmdb.set".format(prefix=CMDBCacheManager.CACHE_KEY_PREFIX)
+    LOCAL_CACHE_ENABLED = True
 
     @classmethod
     def key_to_internal_value(cls, bk_set_id):
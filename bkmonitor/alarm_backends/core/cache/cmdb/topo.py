@@ -25,6 +25,7 @@ class TopoManager(RefreshByBizMixin, CMDBCacheManager):
     ObjectClass = TopoNode
     type = "topo"
     CACHE_KEY = "{prefix}.cmdb.topo".format(prefix=CMDBCacheManager.CACHE_KEY_PREFIX)
+    LOCAL_CACHE_ENABLED = True
 
     @classmethod
     def key_to_internal_value(cls, bk_obj_id, bk_inst_id):
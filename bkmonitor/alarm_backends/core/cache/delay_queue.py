@@ -8,63 +8,188 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
-
-
+import hashlib
 import json
 import logging
 import time
+import zlib
 
-from six.moves import zip
+from django.conf import settings
+from redis.exceptions import NoScriptError
 
 from alarm_backends.constants import CONST_MINUTES
 from alarm_backends.core.cache.key import KEY_PREFIX
 from alarm_backends.core.storage.redis import CACHE_BACKEND_CONF_MAP, Cache
+from core.prometheus import metrics
 
 logger = logging.getLogger("cache.delay_queue")
 
 
+class LuaScript(object):
+    """
+    lua脚本，优先通过evalsha执行，脚本未加载时自动加载
+    """
+
+    def __init__(self, script):
+        self.script = script
+        self.sha = hashlib.sha1(script.encode("utf-8")).hexdigest()
+
+    def __call__(self, client, keys=(), args=()):
+        try:
+            return client.evalsha(self.sha, len(keys), *keys, *args)
+        except NoScriptError:
+            client.script_load(self.script)
+            return client.evalsha(self.sha, len(keys), *keys, *args)
+
+
+# 出队: 领取指定的到期任务并推入目标队列
+# 任务内容由调用方预先读取解析，目标队列需全部声明在KEYS中，任务仍在队列中且已到期时才领取
+# KEYS: [分片延时队列, 任务存储, 目标队列...]
+# ARGV: [当前时间, (任务ID, 命令, 目标队列, 参数个数, 参数...)...]，命令为空表示任务无效，领取后直接丢弃
+# 返回: [领取数量, 投递数量, 最早到期时间, 下一个任务到期时间]
+DISPATCH_SCRIPT = LuaScript(
+    """
+local unpack = unpack or table.unpack
+local targets = {}
+for i = 3, #KEYS do
+    targets[KEYS[i]] = true
+end
+local now = tonumber(ARGV[1])
+local claimed = 0
+local dispatched = 0
+local min_score = ""
+local i = 2
+while i <= #ARGV do
+    local task_id, cmd, queue, count = ARGV[i], ARGV[i + 1], ARGV[i + 2], tonumber(ARGV[i + 3])
+    local score = redis.call("ZSCORE", KEYS[1], task_id)
+    if score and tonumber(score) <= now and (cmd == "" or targets[queue]) then
+        redis.call("ZREM", KEYS[1], task_id)
+        redis.call("HDEL", KEYS[2], task_id)
+        claimed = claimed + 1
+        if min_score == "" or tonumber(score) < tonumber(min_score) then
+            min_score = score
+        end
+        if cmd ~= "" and count > 0 then
+            local result = redis.pcall(cmd, queue, unpack(ARGV, i + 4, i + 3 + count))
+            if type(result) ~= "table" or not result.err then
+                dispatched = dispatched + 1
+            end
+        end
+    end
+    i = i + 4 + count
+end
+local next_task = redis.call("ZRANGE", KEYS[1], 0, 0, "WITHSCORES")
+return {claimed, dispatched, min_score, next_task[2] or ""}
+"""
+)
+
+
 class DelayQueueManager(object):
     TASK_STORAGE_QUEUE = KEY_PREFIX + "task_storage"
     TASK_DELAY_QUEUE = KEY_PREFIX + "task_delay_queue"
+    # 已使用的延时队列分片
+    TASK_DELAY_QUEUE_SHARDS = KEY_PREFIX + "task_delay_queue_shards"
+
+    @classmethod
+    def get_delay_queue_key(cls, queue):
+        """
+        按目标队列分片，0号分片沿用原有的延时队列key
+        """
+        shard_count = settings.DELAY_QUEUE_SHARD_COUNT
+        if shard_count <= 1:
+            return cls.TASK_DELAY_QUEUE
+        shard = zlib.crc32(queue.encode("utf-8")) % shard_count
+        if shard == 0:
+            return cls.TASK_DELAY_QUEUE
+        return "{}.{}".format(cls.TASK_DELAY_QUEUE, shard)
+
+    @classmethod
+    def enqueue(cls, redis_client, task_id, message, queue, score):
+        """
+        写入延时任务，任务内容、到期时间及分片登记在同一事务中提交
+        """
+        delay_queue_key = cls.get_delay_queue_key(queue)
+        pipeline = redis_client.pipeline(transaction=True)
+        pipeline.hset(cls.TASK_STORAGE_QUEUE, task_id, message)
+        pipeline.zadd(delay_queue_key, {task_id: score})
+        if delay_queue_key != cls.TASK_DELAY_QUEUE:
+            pipeline.sadd(cls.TASK_DELAY_QUEUE_SHARDS, delay_queue_key)
+        pipeline.execute()
+
+    @classmethod
+    def dispatch(cls, redis_client, delay_queue_key, now, batch_size):
+        """
+        投递单个分片中的到期任务
+        先读取并解析到期任务，再由lua脚本领取并投递，脚本访问的key均通过KEYS声明
+        :return: (领取数量, 投递数量, 最早到期时间, 下一个任务到期时间)
+        """
+        task_ids = redis_client.zrangebyscore(delay_queue_key, "-inf", repr(now), start=0, num=batch_size)
+        if not task_ids:
+            next_task = redis_client.zrange(delay_queue_key, 0, 0, withscores=True)
+            return 0, 0, "", next_task[0][1] if next_task else ""
+
+        target_queues = set()
+        args = [repr(now)]
+        for task_id, message in zip(task_ids, redis_client.hmget(cls.TASK_STORAGE_QUEUE, task_ids)):
+            try:
+                _, cmd, queue, values, _ = json.loads(message)
+                values = [str(value) for value in values]
+            except (TypeError, ValueError):
+                cmd, queue, values = "", "", []
+            if cmd:
+                target_queues.add(queue)
+            args.extend([task_id, cmd, queue, len(values), *values])
+
+        return DISPATCH_SCRIPT(
+            redis_client, keys=[delay_queue_key, cls.TASK_STORAGE_QUEUE, *sorted(target_queues)], args=args
+        )
 
     @classmethod
     def refresh_single_db(cls, backend):
+        """
+        投递单个db中的到期任务
+        :return: 下一个任务的到期时间，队列为空时返回None；仍有到期任务未处理时返回当前时间
+        """
         redis_client = Cache(backend)
-
-        now = int(time.time())
-        task_ids = redis_client.zrangebyscore(cls.TASK_DELAY_QUEUE, 0, now)
-
-        # use the atomicity of zrem to prevent concurrency
-        pipe = redis_client.pipeline()
-        for task_id in task_ids:
-            pipe.zrem(cls.TASK_DELAY_QUEUE, task_id)
-        result = pipe.execute()
-        data_keys = [data_key for data_key, flag in zip(task_ids, result) if flag]
-        if not data_keys:
-            return
-
-        # load data
-        task_list = redis_client.hmget(cls.TASK_STORAGE_QUEUE, data_keys)
-        task_list = [json.loads(task) for task in task_list]
-
-        # delete string key
-        redis_client.hdel(cls.TASK_STORAGE_QUEUE, *data_keys)
-
-        # redo push
-        pipe = redis_client.pipeline()
-        for task in task_list:
-            task_id, cmd, queue, values, scheduled = task
-            getattr(pipe, cmd)(queue, *values)
-        pipe.execute()
+        batch_size = settings.DELAY_QUEUE_DISPATCH_BATCH_SIZE
+
+        delay_queue_keys = set(redis_client.smembers(cls.TASK_DELAY_QUEUE_SHARDS))
+        delay_queue_keys.add(cls.TASK_DELAY_QUEUE)
+
+        next_score = None
+        for delay_queue_key in delay_queue_keys:
+            now = time.time()
+            claimed, dispatched, min_score, shard_next_score = cls.dispatch(
+                redis_client, delay_queue_key, now, batch_size
+            )
+            if claimed:
+                metrics.DELAY_QUEUE_DISPATCH_COUNT.labels(backend=backend).inc(dispatched)
+                metrics.DELAY_QUEUE_DISPATCH_LAG.labels(backend=backend).observe(max(now - float(min_score), 0))
+                if claimed > dispatched:
+                    logger.warning(
+                        "delay queue(%s) backend(%s) dropped %s invalid tasks",
+                        delay_queue_key,
+                        backend,
+                        claimed - dispatched,
+                    )
+
+            if claimed >= batch_size:
+                # 本批次已满，可能还有到期任务
+                shard_next_score = now
+            if shard_next_score:
+                next_score = min(next_score or float(shard_next_score), float(shard_next_score))
+        return next_score
 
     @classmethod
     def refresh(cls):
         """
         由定时任务调度，一分钟运行一次，一次运行一分钟
+        根据最近一个任务的到期时间决定休眠时长，最长不超过 DELAY_QUEUE_POLL_INTERVAL
         """
         now = int(time.time())
         while int(time.time()) - now < CONST_MINUTES:
             duplicate_db = set()
+            next_score = None
             for backend, redis_conf in list(CACHE_BACKEND_CONF_MAP.items()):
                 db = redis_conf.get("db", 0)
                 if db in duplicate_db:
@@ -72,10 +197,18 @@ class DelayQueueManager(object):
                 duplicate_db.add(db)
 
                 try:
-                    cls.refresh_single_db(backend)
+                    db_next_score = cls.refresh_single_db(backend)
                 except Exception as e:
                     logger.exception("redo push(backend:{}), error({})" "".format(backend, e))
-            time.sleep(1)
+                    continue
+                if db_next_score is not None:
+                    next_score = db_next_score if next_score is None else min(next_score, db_next_score)
+
+            sleep_time = settings.DELAY_QUEUE_POLL_INTERVAL
+            if next_score is not None:
+                sleep_time = min(max(next_score - time.time(), 0), sleep_time)
+            if sleep_time > 0:
+                time.sleep(sleep_time)
 
 
 def main():
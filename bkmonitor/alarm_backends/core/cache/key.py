@@ -187,6 +187,26 @@ DATA_LIST_KEY = register_key_with_config(
     }
 )
 
+DATA_LIST_PARTITION_KEY = register_key_with_config(
+    {
+        "label": "[access]待检测数据分区队列",
+        "key_type": "list",
+        "key_tpl": "access.data.{strategy_id}.{item_id}.partition_{partition}",
+        "ttl": 30 * CONST_MINUTES,
+        "backend": "queue",
+    }
+)
+
+DATA_PARTITION_COUNT_KEY = register_key_with_config(
+    {
+        "label": "[access]待检测数据分区数",
+        "key_type": "string",
+        "key_tpl": "access.data.{strategy_id}.partition_count",
+        "ttl": 30 * CONST_MINUTES,
+        "backend": "queue",
+    }
+)
+
 DATA_SIGNAL_KEY = register_key_with_config(
     {
         "label": "[access]待检测数据信号队列",
@@ -207,6 +227,27 @@ NO_DATA_LIST_KEY = register_key_with_config(
     }
 )
 
+NO_DATA_PRESENCE_KEY = register_key_with_config(
+    {
+        "label": "[access]无数据检测单周期维度存在索引",
+        "key_type": "hash",
+        "key_tpl": "access.nodata.presence.{strategy_id}.{item_id}.{timestamp}",
+        "field_tpl": "{dimensions_md5}",
+        "ttl": 10 * CONST_MINUTES,
+        "backend": "queue",
+    }
+)
+
+NO_DATA_PRESENCE_PERIODS_KEY = register_key_with_config(
+    {
+        "label": "[access]无数据检测待检测周期集合",
+        "key_type": "sorted_set",
+        "key_tpl": "access.nodata.presence.periods.{strategy_id}.{item_id}",
+        "ttl": 10 * CONST_MINUTES,
+        "backend": "queue",
+    }
+)
+
 HISTORY_DATA_KEY = register_key_with_config(
     {
         "label": "[detect]待检测数据对应历史数据",
@@ -291,6 +332,16 @@ ACCESS_DUPLICATE_KEY = register_key_with_config(
     }
 )
 
+ACCESS_DUPLICATE_FINGERPRINT_KEY = register_key_with_config(
+    {
+        "label": "[access]数据拉取去重(指纹)",
+        "key_type": "string",
+        "key_tpl": "access.data.duplicate_fp.strategy_group_{strategy_group_key}.{dt_event_time}.{width}",
+        "ttl": 10 * CONST_MINUTES,
+        "backend": "service",
+    }
+)
+
 ACCESS_PRIORITY_KEY = register_key_with_config(
     {
         "label": "[access]数据拉取优先级",
@@ -424,6 +475,16 @@ SERVICE_LOCK_DETECT = register_key_with_config(
     }
 )
 
+SERVICE_LOCK_DETECT_PARTITION = register_key_with_config(
+    {
+        "label": "detect.lock.strategy_{strategy_id}.partition_{partition}",
+        "key_type": "string",
+        "key_tpl": "detect.lock.{strategy_id}.partition_{partition}",
+        "ttl": CONST_MINUTES,
+        "backend": "service",
+    }
+)
+
 SERVICE_LOCK_NODATA = register_key_with_config(
     {
         "label": "nodata.lock.strategy_{strategy_id}",
@@ -951,6 +1012,16 @@ ACCESS_BATCH_DATA_KEY = register_key_with_config(
     }
 )
 
+ACCESS_STREAM_PULL_KEY = register_key_with_config(
+    {
+        "label": "[access]超量策略组分页拉取标记",
+        "key_type": "string",
+        "key_tpl": "access.stream_pull.{strategy_group_key}",
+        "ttl": CONST_ONE_HOUR,
+        "backend": "service",
+    }
+)
+
 ACCESS_BATCH_DATA_RESULT_KEY = register_key_with_config(
     {
         "label": "[access]分批数据处理结果key",
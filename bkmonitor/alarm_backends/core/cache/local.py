@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from core.prometheus import metrics
+
+# 未命中时的占位对象，用于区分缓存值本身为None的情况
+MISSING = object()
+
+
+class LRUCache(object):
+    """
+    进程内有界LRU缓存(线程安全)
+    缓存对象直接以引用方式返回，调用方应将其视为只读
+    """
+
+    def __init__(self, name: str, maxsize: int = 10000):
+        self.name = name
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                metrics.ALARM_LOCAL_CACHE_COUNT.labels(self.name, "miss").inc()
+                return default
+            self._data.move_to_end(key)
+        metrics.ALARM_LOCAL_CACHE_COUNT.labels(self.name, "hit").inc()
+        return value
+
+    def get_many(self, keys):
+        """
+        批量获取，返回 {key: value}，未命中的key不在结果中
+        """
+        result = {}
+        with self._lock:
+            for key in keys:
+                if key in self._data:
+                    self._data.move_to_end(key)
+                    result[key] = self._data[key]
+        hit_count = len(result)
+        if hit_count:
+            metrics.ALARM_LOCAL_CACHE_COUNT.labels(self.name, "hit").inc(hit_count)
+        if len(keys) - hit_count:
+            metrics.ALARM_LOCAL_CACHE_COUNT.labels(self.name, "miss").inc(len(keys) - hit_count)
+        return result
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        evicted = 0
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                evicted += 1
+        if evicted:
+            metrics.ALARM_LOCAL_CACHE_COUNT.labels(self.name, "eviction").inc(evicted)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class VersionedLRUCache(LRUCache):
+    """
+    基于redis版本号失效的进程内LRU缓存
+    数据源刷新时递增版本号，各进程至多每 check_interval 秒检查一次版本号，版本变化时清空本地缓存
+    """
+
+    def __init__(self, name: str, version_getter, maxsize: int = 10000, check_interval: int = 10):
+        super(VersionedLRUCache, self).__init__(name, maxsize)
+        self.version_getter = version_getter
+        self.check_interval = check_interval
+        self.version = None
+        self.last_check_time = 0
+
+    def check_version(self):
+        now = time.time()
+        if now - self.last_check_time < self.check_interval:
+            return
+        self.last_check_time = now
+
+        version = self.version_getter()
+        if version == self.version:
+            return
+        # 首次加载时本地为空，无需计为失效
+        if self.version is not None and len(self):
+            metrics.ALARM_LOCAL_CACHE_COUNT.labels(self.name, "invalidate").inc()
+        self.clear()
+        self.version = version
+
+
+class BizVersionedLRUCache(LRUCache):
+    """
+    按业务版本号失效的进程内LRU缓存
+    version_getter 返回 {bk_biz_id: version}，各进程至多每 check_interval 秒检查一次，
+    仅清理版本号发生变化的业务下的缓存对象；未归属业务的对象(如未命中的None)在任一业务变化时清理。
+    ALL_BIZ 版本号变化时清空全部缓存
+    """
+
+    ALL_BIZ = "all"
+
+    def __init__(self, name: str, version_getter, maxsize: int = 10000, check_interval: int = 10):
+        super(BizVersionedLRUCache, self).__init__(name, maxsize)
+        self.version_getter = version_getter
+        self.check_interval = check_interval
+        self.versions = None
+        self.last_check_time = 0
+        self._key_biz = {}
+
+    def set(self, key, value, bk_biz_id=None):
+        if self.maxsize <= 0:
+            return
+        evicted = 0
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._key_biz[key] = None if bk_biz_id is None else str(bk_biz_id)
+            while len(self._data) > self.maxsize:
+                evicted_key, _ = self._data.popitem(last=False)
+                self._key_biz.pop(evicted_key, None)
+                evicted += 1
+        if evicted:
+            metrics.ALARM_LOCAL_CACHE_COUNT.labels(self.name, "eviction").inc(evicted)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self._key_biz.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._key_biz.clear()
+
+    def invalidate_biz(self, bk_biz_ids):
+        """
+        清理指定业务及未归属业务的缓存对象
+        """
+        bk_biz_ids = {str(bk_biz_id) for bk_biz_id in bk_biz_ids}
+        with self._lock:
+            keys = [key for key, bk_biz_id in self._key_biz.items() if bk_biz_id is None or bk_biz_id in bk_biz_ids]
+            for key in keys:
+                self._data.pop(key, None)
+                self._key_biz.pop(key, None)
+        if keys:
+            metrics.ALARM_LOCAL_CACHE_COUNT.labels(self.name, "invalidate").inc(len(keys))
+
+    def check_version(self):
+        now = time.time()
+        if now - self.last_check_time < self.check_interval:
+            return
+        self.last_check_time = now
+
+        versions = self.version_getter() or {}
+        old_versions = self.versions
+        self.versions = versions
+        if old_versions is None or versions.get(self.ALL_BIZ) != old_versions.get(self.ALL_BIZ):
+            if old_versions is not None and len(self):
+                metrics.ALARM_LOCAL_CACHE_COUNT.labels(self.name, "invalidate").inc(len(self))
+            self.clear()
+            return
+
+        changed_biz_ids = {
+            bk_biz_id
+            for bk_biz_id in set(versions) | set(old_versions)
+            if versions.get(bk_biz_id) != old_versions.get(bk_biz_id)
+        }
+        if changed_biz_ids:
+            self.invalidate_biz(changed_biz_ids)
+
+
+class SizedLRUCache(LRUCache):
+    """
+    按占用字节数限制容量的进程内LRU缓存
+    写入时由调用方提供缓存对象的估算大小，总大小超过 maxbytes 时淘汰最久未使用的对象，
+    单个对象超过 maxbytes 时不缓存
+    """
+
+    def __init__(self, name: str, maxbytes: int):
+        super(SizedLRUCache, self).__init__(name, maxsize=0)
+        self.maxbytes = maxbytes
+        self.total_bytes = 0
+        self._sizes = {}
+
+    def set(self, key, value, size: int = 0):
+        if self.maxbytes <= 0 or size > self.maxbytes:
+            return
+        evicted = 0
+        with self._lock:
+            self.total_bytes += size - self._sizes.get(key, 0)
+            self._sizes[key] = size
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while self.total_bytes > self.maxbytes:
+                evicted_key, _ = self._data.popitem(last=False)
+                self.total_bytes -= self._sizes.pop(evicted_key)
+                evicted += 1
+        if evicted:
+            metrics.ALARM_LOCAL_CACHE_COUNT.labels(self.name, "eviction").inc(evicted)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self.total_bytes -= self._sizes.pop(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.total_bytes = 0
@@ -31,6 +31,8 @@ class ShieldCacheManager(CacheManager):
 
     # 策略详情的缓存key
     CACHE_KEY_TEMPLATE = CacheManager.CACHE_KEY_PREFIX + ".shield.biz_{}"
+    # 屏蔽缓存版本，每次刷新后更新，用于进程内的屏蔽索引失效
+    VERSION_CACHE_KEY = CacheManager.CACHE_KEY_PREFIX + ".shield.version"
 
     @classmethod
     def get_shields_by_biz_id(cls, bk_biz_id):
@@ -84,6 +86,10 @@ class ShieldCacheManager(CacheManager):
         else:
             return []
 
+    @classmethod
+    def get_version(cls):
+        return cls.cache.get(cls.VERSION_CACHE_KEY)
+
     @classmethod
     def refresh(cls):
         now = time_tools.now()
@@ -115,6 +121,8 @@ class ShieldCacheManager(CacheManager):
                 )
             else:
                 pipeline.delete(cls.CACHE_KEY_TEMPLATE.format(bk_biz_id))
+        # 屏蔽配置解析结果(如动态分组主机)可能随时间变化，每次刷新均更新版本
+        pipeline.set(cls.VERSION_CACHE_KEY, str(now.timestamp()), cls.CACHE_TIMEOUT)
         pipeline.execute()
 
 
@@ -21,6 +21,7 @@ from typing import Callable, Dict, Iterable, List, Set, Tuple, Union
 
 import arrow
 from django.conf import settings
+from redis.exceptions import WatchError
 
 from alarm_backends.constants import CONST_ONE_DAY
 from alarm_backends.core.cache.base import CacheManager
@@ -79,6 +80,8 @@ class StrategyCacheManager(CacheManager):
     STRATEGY_GROUP_CACHE_KEY = CacheManager.CACHE_KEY_PREFIX + ".strategy_group"
     # 最近增量更新时间
     LAST_UPDATED_CACHE_KEY = CacheManager.CACHE_KEY_PREFIX + ".last_updated"
+    # 增量更新写入缓存时，读取的缓存被并发修改后的最大重试次数
+    PATCH_MAX_RETRIES = 3
     # 事件型时序检测周期(默认60s)
     fake_event_agg_interval = 60
     # 实例维度
@@ -742,11 +745,11 @@ class StrategyCacheManager(CacheManager):
         return cls.cache.set(cls.BK_BIZ_IDS_CACHE_KEY, json.dumps(old_bk_biz_ids), cls.CACHE_TIMEOUT)
 
     @classmethod
-    def refresh_real_time_strategy_ids(cls, strategies: List[Dict]):
+    def build_real_time_strategy_ids(cls, strategies: List[Dict]) -> Dict:
         """
-        刷新实时数据的相关策略
+        生成实时数据的相关策略
         :param strategies: 策略列表
-        :cache data: type:dict(rt_id -> bk_biz_id -> strategy_ids)
+        :return: type:dict(rt_id -> bk_biz_id -> strategy_ids)
         """
         real_time_strategys = {}
         for strategy in strategies:
@@ -764,13 +767,22 @@ class StrategyCacheManager(CacheManager):
                     ).append(strategy["id"])
             except Exception as e:
                 logger.exception("refresh strategy error when refresh_real_time_strategy_ids: %s", e)
+        return real_time_strategys
 
+    @classmethod
+    def refresh_real_time_strategy_ids(cls, strategies: List[Dict]):
+        """
+        刷新实时数据的相关策略
+        :param strategies: 策略列表
+        :cache data: type:dict(rt_id -> bk_biz_id -> strategy_ids)
+        """
+        real_time_strategys = cls.build_real_time_strategy_ids(strategies)
         cls.cache.set(cls.REAL_TIME_CACHE_KEY, json.dumps(real_time_strategys), cls.CACHE_TIMEOUT)
 
     @classmethod
-    def refresh_nodata_strategy_ids(cls, strategies: List[Dict]):
+    def build_nodata_strategy_ids(cls, strategies: List[Dict]) -> List[int]:
         """
-        刷新无数据策略ID列表缓存
+        生成无数据策略ID列表
         """
         nodata_strategy_ids = []
         for strategy in strategies:
@@ -779,13 +791,21 @@ class StrategyCacheManager(CacheManager):
                 if no_data_config and no_data_config.get("is_enabled"):
                     nodata_strategy_ids.append(strategy["id"])
                     continue
+        return nodata_strategy_ids
 
+    @classmethod
+    def refresh_nodata_strategy_ids(cls, strategies: List[Dict]):
+        """
+        刷新无数据策略ID列表缓存
+        """
+        nodata_strategy_ids = cls.build_nodata_strategy_ids(strategies)
         cls.cache.set(cls.NO_DATA_CACHE_KEY, json.dumps(nodata_strategy_ids), cls.CACHE_TIMEOUT)
 
     @classmethod
-    def refresh_gse_alarm_strategy_ids(cls, strategies: List[Dict]):
+    def build_gse_alarm_strategy_ids(cls, strategies: List[Dict]) -> Dict:
         """
-        刷新gse事件策略ID列表缓存
+        生成gse事件策略ID列表
+        :return: type:dict(bk_biz_id -> strategy_ids)
         """
         gse_event_strategy_ids = defaultdict(list)
         for strategy in strategies:
@@ -798,13 +818,21 @@ class StrategyCacheManager(CacheManager):
                     gse_event_strategy_ids[strategy["bk_biz_id"]].append(strategy["id"])
             except Exception as e:
                 logger.exception("refresh strategy error when refresh_gse_alarm_strategy_ids: %s", e)
+        return gse_event_strategy_ids
 
+    @classmethod
+    def refresh_gse_alarm_strategy_ids(cls, strategies: List[Dict]):
+        """
+        刷新gse事件策略ID列表缓存
+        """
+        gse_event_strategy_ids = cls.build_gse_alarm_strategy_ids(strategies)
         cls.cache.set(cls.GSE_ALARM_CACHE_KEY, json.dumps(gse_event_strategy_ids), cls.CACHE_TIMEOUT)
 
     @classmethod
-    def refresh_fta_alert_strategy_ids(cls, strategies: List[Dict]):
+    def build_fta_alert_strategy_ids(cls, strategies: List[Dict]) -> Dict:
         """
-        刷新自愈策略列表缓存
+        生成自愈关联告警策略列表
+        :return: type:dict(strategy|{strategy_id} 或 alert|{alert_name} -> bk_biz_id -> strategy_ids)
         """
         fta_alert_strategy_ids = {}
         for strategy in strategies:
@@ -827,6 +855,14 @@ class StrategyCacheManager(CacheManager):
 
             except Exception as e:
                 logger.exception("refresh strategy error when refresh_fta_alert_strategy_ids: %s", e)
+        return fta_alert_strategy_ids
+
+    @classmethod
+    def refresh_fta_alert_strategy_ids(cls, strategies: List[Dict]):
+        """
+        刷新自愈策略列表缓存
+        """
+        fta_alert_strategy_ids = cls.build_fta_alert_strategy_ids(strategies)
 
         # 批量保存 Key
         if fta_alert_strategy_ids:
@@ -842,32 +878,13 @@ class StrategyCacheManager(CacheManager):
         cls.cache.expire(cls.FTA_ALERT_CACHE_KEY, cls.CACHE_TIMEOUT)
 
     @classmethod
-    def refresh_strategy(cls, strategies: List[Dict], old_groups=None):
+    def build_strategy_groups(cls, strategies: List[Dict]) -> Dict:
         """
-        刷新策略缓存
-        该方法用于更新策略的缓存，确保策略及其相关分组信息是最新的
-
-        “策略详情信息”循环缓存，每个策略占用缓存中的一个key, 数据结构是string
-        “策略分组信息”一次性缓存，含所有分组的信息占用缓存中的一个key, 数据结构是hash
-        策略分组信息的结构为:
-        {
-        '623446abe6e6a4b6a9af6531bd45faeb': {1: [1], 'bk_biz_id': 2, 'interval_list': [60], 'default_factory': []},
-        '623446abe6e6a4b6a9af6531bd45faec': {2: [2], 'bk_biz_id': 2, 'interval_list': [120], 'default_factory': []},
-        }
-
-        :param strategies: 新的策略列表，每个策略包含其详细信息
-        :param old_groups: 旧的策略分组信息，如果为None，则进行全量更新。否则进行增量更新，删除不在新策略中的旧分组
+        按查询配置md5生成策略分组信息
         """
         # 初始化策略分组缓存结构
         strategy_groups = defaultdict(lambda: defaultdict(list))
-
-        # 开启缓存pipeline以优化写入性能
-        pipeline = cls.cache.pipeline()
         for strategy in strategies:
-            # 将策略信息存储到缓存中
-            pipeline.set(
-                cls.CACHE_KEY_TEMPLATE.format(strategy_id=strategy["id"]), json.dumps(strategy), cls.CACHE_TIMEOUT
-            )
             # 默认周期 50s
             for item in strategy["items"]:
                 if item.get("query_md5"):
@@ -889,6 +906,34 @@ class StrategyCacheManager(CacheManager):
                             strategy_groups[item["query_md5"]].setdefault("interval_list", []).append(interval)
                         except (TypeError, ValueError, AssertionError):
                             continue
+        return strategy_groups
+
+    @classmethod
+    def refresh_strategy(cls, strategies: List[Dict], old_groups=None):
+        """
+        刷新策略缓存
+        该方法用于更新策略的缓存，确保策略及其相关分组信息是最新的
+
+        “策略详情信息”循环缓存，每个策略占用缓存中的一个key, 数据结构是string
+        “策略分组信息”一次性缓存，含所有分组的信息占用缓存中的一个key, 数据结构是hash
+        策略分组信息的结构为:
+        {
+        '623446abe6e6a4b6a9af6531bd45faeb': {1: [1], 'bk_biz_id': 2, 'interval_list': [60], 'default_factory': []},
+        '623446abe6e6a4b6a9af6531bd45faec': {2: [2], 'bk_biz_id': 2, 'interval_list': [120], 'default_factory': []},
+        }
+
+        :param strategies: 新的策略列表，每个策略包含其详细信息
+        :param old_groups: 旧的策略分组信息，如果为None，则进行全量更新。否则进行增量更新，删除不在新策略中的旧分组
+        """
+        strategy_groups = cls.build_strategy_groups(strategies)
+
+        # 开启缓存pipeline以优化写入性能
+        pipeline = cls.cache.pipeline()
+        for strategy in strategies:
+            # 将策略信息存储到缓存中
+            pipeline.set(
+                cls.CACHE_KEY_TEMPLATE.format(strategy_id=strategy["id"]), json.dumps(strategy), cls.CACHE_TIMEOUT
+            )
 
         # 判断是否是全量更新
         refresh_all = old_groups is None
@@ -950,6 +995,31 @@ class StrategyCacheManager(CacheManager):
                         logger.exception("refresh strategy error when add_enabled_cluster_condition: %s", e)
                 add_condition(enabled_cluster_map[bk_biz_id], strategy_config)
 
+    @classmethod
+    def is_system_event_strategy(cls, strategy_config: Dict) -> bool:
+        """
+        判断是否是系统事件策略
+        """
+        query_config = strategy_config["items"][0]["query_configs"][0]
+        return (
+            query_config["data_type_label"] == DataTypeLabel.EVENT
+            and query_config["data_source_label"] == DataSourceLabel.BK_MONITOR_COLLECTOR
+        )
+
+    @classmethod
+    def is_target_shield_strategy(cls, strategy_config: Dict) -> bool:
+        """
+        判断是否是需要添加抑制条件的策略
+        """
+        item = strategy_config["items"][0]
+        target = item["target"]
+        return bool(
+            (item["query_md5"] or cls.is_system_event_strategy(strategy_config))
+            and target
+            and target[0]
+            and not strategy_config.get("priority")
+        )
+
     @classmethod
     def add_target_shield_condition(cls, strategy_configs: List[Dict]):
         """
@@ -967,25 +1037,10 @@ class StrategyCacheManager(CacheManager):
             return x["items"][0]["query_md5"] or x["items"][0]["query_configs"][0]["metric_id"]
 
         # 过滤掉无目标，无查询分组的策略
-        def is_valid_strategy_config(strategy_config):
-            """
-            判断是否是需要添加抑制条件的策略
-            """
-            item = strategy_config["items"][0]
-            target = item["target"]
-            query_config = item["query_configs"][0]
-
-            is_system_event = (
-                query_config["data_type_label"] == DataTypeLabel.EVENT
-                and query_config["data_source_label"] == DataSourceLabel.BK_MONITOR_COLLECTOR
-            )
-
-            return (
-                (item["query_md5"] or is_system_event) and target and target[0] and not strategy_config.get("priority")
-            )
-
         strategy_configs = [
-            strategy_config for strategy_config in strategy_configs if is_valid_strategy_config(strategy_config)
+            strategy_config
+            for strategy_config in strategy_configs
+            if cls.is_target_shield_strategy(strategy_config)
         ]
 
         cmdb_levels = [cmdb_level["bk_obj_id"] for cmdb_level in api.cmdb.get_mainline_object_topo()]
@@ -1122,11 +1177,281 @@ class StrategyCacheManager(CacheManager):
 
         return target_biz_set, to_be_deleted_strategy_ids
 
+    @classmethod
+    def merge_strategy_ids(cls, old, new, removed_ids: Set[int]):
+        """
+        合并策略ID结构(list 或多层 dict 嵌套的 list)，先移除重新计算的策略，再加入新的策略，并清理空节点
+        dict 的键统一为字符串，与 json 反序列化后的缓存保持一致
+        """
+        if isinstance(new, list) or isinstance(old, list):
+            result = [strategy_id for strategy_id in old or [] if strategy_id not in removed_ids]
+            existed = set(result)
+            result.extend(strategy_id for strategy_id in new or [] if strategy_id not in existed)
+            return result
+
+        result = {}
+        old = old or {}
+        new = {str(key): value for key, value in (new or {}).items()}
+        for key in set(old) | set(new):
+            value = cls.merge_strategy_ids(old.get(key), new.get(key), removed_ids)
+            if value:
+                result[key] = value
+        return result
+
+    @classmethod
+    def merge_strategy_group(cls, group: Dict, old_group: Dict, new_group: Dict, removed_ids: Set[int]) -> Dict:
+        """
+        合并策略分组: 移除重新计算的策略及其周期配置，再加入新的策略分组信息
+        """
+        for strategy_id in removed_ids:
+            group.pop(str(strategy_id), None)
+
+        interval_list = list(group.get("interval_list", []))
+        for interval in (old_group or {}).get("interval_list", []):
+            if interval in interval_list:
+                interval_list.remove(interval)
+
+        for key, value in (new_group or {}).items():
+            if key == "interval_list":
+                interval_list.extend(value)
+            elif key == "bk_biz_id":
+                group["bk_biz_id"] = value
+            else:
+                group[str(key)] = value
+
+        if interval_list:
+            group["interval_list"] = interval_list
+        else:
+            group.pop("interval_list", None)
+        return group
+
+    @classmethod
+    def get_related_strategies(cls, changed_strategy_ids: Set[int]) -> Tuple[Dict, Dict]:
+        """
+        获取需要重新计算的策略
+        目标抑制条件依赖同一查询分组内的其他策略，因此需要把变更策略新旧分组内的策略一并重新计算，直到分组闭合。
+        系统事件策略没有查询分组(按指标分组抑制)，只能回退为重新计算整个业务的策略
+        :return: (缓存中的旧策略, 数据库中的新策略)，均为 策略ID -> 策略配置
+        """
+        old_strategies: Dict[int, Union[Dict, None]] = {}
+        strategies_map: Dict[int, Dict] = {}
+        checked_groups = set()
+        fallback_biz_ids = set()
+
+        pending_ids = set(changed_strategy_ids)
+        while pending_ids:
+            pending_ids = list(pending_ids)
+            for strategy in cls.get_strategy_by_ids(pending_ids):
+                old_strategies[strategy["id"]] = strategy
+            for strategy_id in pending_ids:
+                old_strategies.setdefault(strategy_id, None)
+            strategies_map.update(cls.get_strategies_map({"id__in": pending_ids}))
+
+            groups = set()
+            for strategy_id in pending_ids:
+                for strategy in [old_strategies[strategy_id], strategies_map.get(strategy_id)]:
+                    if not strategy:
+                        continue
+                    groups.update(item["query_md5"] for item in strategy["items"] if item.get("query_md5"))
+                    if not strategy["items"][0].get("query_md5") and cls.is_system_event_strategy(strategy):
+                        fallback_biz_ids.add(strategy["bk_biz_id"])
+            groups -= checked_groups
+            checked_groups |= groups
+
+            member_ids = set()
+            if groups:
+                groups = list(groups)
+                for group in cls.cache.hmget(cls.STRATEGY_GROUP_CACHE_KEY, groups):
+                    member_ids.update(int(key) for key in json.loads(group or "{}") if key.isdigit())
+            pending_ids = member_ids - set(old_strategies)
+
+        if fallback_biz_ids:
+            biz_strategies_map = cls.get_strategies_map({"bk_biz_id__in": list(fallback_biz_ids)})
+            new_ids = [strategy_id for strategy_id in biz_strategies_map if strategy_id not in old_strategies]
+            for strategy in cls.get_strategy_by_ids(new_ids):
+                old_strategies[strategy["id"]] = strategy
+            for strategy_id in new_ids:
+                old_strategies.setdefault(strategy_id, None)
+            strategies_map.update(biz_strategies_map)
+
+        return old_strategies, strategies_map
+
+    @classmethod
+    def patch_strategies(cls, old_strategies: Dict, strategies_map: Dict) -> Dict:
+        """
+        按重新计算的策略修补缓存
+        策略详情、策略分组及派生的策略ID列表在同一个事务中写入。
+        读取的缓存通过 WATCH 监视，期间被并发修改时事务放弃执行并基于最新缓存重试
+        :param old_strategies: 重新计算的策略在缓存中的旧配置
+        :param strategies_map: 重新计算后仍然生效的策略配置
+        :return: 各类变更条目数量
+        """
+        strategies = list(strategies_map.values())
+        old_strategy_list = [strategy for strategy in old_strategies.values() if strategy]
+        removed_ids = set(old_strategies)
+        deleted_ids = removed_ids - set(strategies_map)
+
+        for processor in [cls.add_target_shield_condition, cls.add_enabled_cluster_condition]:
+            try:
+                processor(strategies)
+            except Exception as e:
+                logger.exception(f"[incremental_strategy_cache]: refresh strategy error when {processor.__name__}: {e}")
+
+        new_groups = cls.build_strategy_groups(strategies)
+        old_groups = cls.build_strategy_groups(old_strategy_list)
+        group_keys = list(set(new_groups) | set(old_groups))
+        new_fta = cls.build_fta_alert_strategy_ids(strategies)
+        fta_keys = list(set(new_fta) | set(cls.build_fta_alert_strategy_ids(old_strategy_list)))
+        new_nodata_strategy_ids = cls.build_nodata_strategy_ids(strategies)
+        new_real_time_strategy_ids = cls.build_real_time_strategy_ids(strategies)
+        new_gse_alarm_strategy_ids = cls.build_gse_alarm_strategy_ids(strategies)
+
+        # 重新计算后不再有策略的业务，需要确认业务下是否还有其他已缓存的策略
+        new_bk_biz_ids = {strategy["bk_biz_id"] for strategy in strategies}
+        pruned_biz_ids = {strategy["bk_biz_id"] for strategy in old_strategy_list} - new_bk_biz_ids
+        biz_strategy_ids = defaultdict(set)
+        if pruned_biz_ids:
+            for strategy_id, bk_biz_id in StrategyModel.objects.filter(
+                bk_biz_id__in=pruned_biz_ids, is_enabled=True
+            ).values_list("id", "bk_biz_id"):
+                biz_strategy_ids[bk_biz_id].add(strategy_id)
+
+        watch_keys = [
+            cls.STRATEGY_GROUP_CACHE_KEY,
+            cls.FTA_ALERT_CACHE_KEY,
+            cls.IDS_CACHE_KEY,
+            cls.BK_BIZ_IDS_CACHE_KEY,
+            cls.NO_DATA_CACHE_KEY,
+            cls.REAL_TIME_CACHE_KEY,
+            cls.GSE_ALARM_CACHE_KEY,
+        ]
+        for _ in range(cls.PATCH_MAX_RETRIES):
+            with cls.cache.pipeline() as pipeline:
+                try:
+                    # WATCH 之后、MULTI 之前，pipeline 的命令立即执行
+                    pipeline.watch(*watch_keys)
+                    current_groups = pipeline.hmget(cls.STRATEGY_GROUP_CACHE_KEY, group_keys) if group_keys else []
+                    current_fta = pipeline.hmget(cls.FTA_ALERT_CACHE_KEY, fta_keys) if fta_keys else []
+
+                    strategy_ids = cls.merge_strategy_ids(
+                        json.loads(pipeline.get(cls.IDS_CACHE_KEY) or "[]"), list(strategies_map), removed_ids
+                    )
+                    nodata_strategy_ids = cls.merge_strategy_ids(
+                        json.loads(pipeline.get(cls.NO_DATA_CACHE_KEY) or "[]"), new_nodata_strategy_ids, removed_ids
+                    )
+                    real_time_strategy_ids = cls.merge_strategy_ids(
+                        json.loads(pipeline.get(cls.REAL_TIME_CACHE_KEY) or "{}"),
+                        new_real_time_strategy_ids,
+                        removed_ids,
+                    )
+                    gse_alarm_strategy_ids = cls.merge_strategy_ids(
+                        json.loads(pipeline.get(cls.GSE_ALARM_CACHE_KEY) or "{}"),
+                        new_gse_alarm_strategy_ids,
+                        removed_ids,
+                    )
+
+                    cached_strategy_ids = set(strategy_ids)
+                    bk_biz_ids = [
+                        bk_biz_id
+                        for bk_biz_id in json.loads(pipeline.get(cls.BK_BIZ_IDS_CACHE_KEY) or "[]")
+                        or cls.get_all_bk_biz_ids()
+                        if bk_biz_id not in pruned_biz_ids or biz_strategy_ids[bk_biz_id] & cached_strategy_ids
+                    ]
+                    bk_biz_ids.extend(new_bk_biz_ids - set(bk_biz_ids))
+
+                    pipeline.multi()
+                    for strategy in strategies:
+                        pipeline.set(
+                            cls.CACHE_KEY_TEMPLATE.format(strategy_id=strategy["id"]),
+                            json.dumps(strategy),
+                            cls.CACHE_TIMEOUT,
+                        )
+                    for strategy_id in deleted_ids:
+                        pipeline.delete(cls.CACHE_KEY_TEMPLATE.format(strategy_id=strategy_id))
+
+                    for query_md5, group in zip(group_keys, current_groups):
+                        group = cls.merge_strategy_group(
+                            json.loads(group or "{}"), old_groups.get(query_md5), new_groups.get(query_md5), removed_ids
+                        )
+                        if any(key.isdigit() for key in group):
+                            pipeline.hset(cls.STRATEGY_GROUP_CACHE_KEY, query_md5, json.dumps(group))
+                        else:
+                            pipeline.hdel(cls.STRATEGY_GROUP_CACHE_KEY, query_md5)
+                    pipeline.expire(cls.STRATEGY_GROUP_CACHE_KEY, cls.CACHE_TIMEOUT)
+
+                    for fta_key, value in zip(fta_keys, current_fta):
+                        value = cls.merge_strategy_ids(json.loads(value or "{}"), new_fta.get(fta_key), removed_ids)
+                        if value:
+                            pipeline.hset(cls.FTA_ALERT_CACHE_KEY, fta_key, json.dumps(value))
+                        else:
+                            pipeline.hdel(cls.FTA_ALERT_CACHE_KEY, fta_key)
+                    pipeline.expire(cls.FTA_ALERT_CACHE_KEY, cls.CACHE_TIMEOUT)
+
+                    pipeline.set(cls.IDS_CACHE_KEY, json.dumps(strategy_ids), cls.CACHE_TIMEOUT)
+                    pipeline.set(cls.BK_BIZ_IDS_CACHE_KEY, json.dumps(bk_biz_ids), cls.CACHE_TIMEOUT)
+                    pipeline.set(cls.NO_DATA_CACHE_KEY, json.dumps(nodata_strategy_ids), cls.CACHE_TIMEOUT)
+                    pipeline.set(cls.REAL_TIME_CACHE_KEY, json.dumps(real_time_strategy_ids), cls.CACHE_TIMEOUT)
+                    pipeline.set(cls.GSE_ALARM_CACHE_KEY, json.dumps(gse_alarm_strategy_ids), cls.CACHE_TIMEOUT)
+                    pipeline.execute()
+                except WatchError:
+                    logger.info("[incremental_strategy_cache]: strategy cache changed during patching, retry")
+                    continue
+
+            return {"strategy": len(strategies), "deleted_strategy": len(deleted_ids), "group": len(group_keys)}
+
+        raise WatchError(f"strategy cache keeps changing, patching aborted after {cls.PATCH_MAX_RETRIES} retries")
+
+    @classmethod
+    def incremental_refresh(cls):
+        """
+        基于策略变更记录的增量更新
+        只重新计算发生变更的策略及其所在分组内的策略，而非整个业务，更新成功后才推进最后更新时间
+        """
+        start_time = time.time()
+        exc = None
+        last_updated = cls.cache.get(cls.LAST_UPDATED_CACHE_KEY) or 0
+        # 增量更新范围（默认5min）
+        timeshift = start_time - int(last_updated) if last_updated else 300
+        changed_strategy_ids = set(
+            StrategyHistoryModel.objects.filter(create_time__gt=datetime.now() - timedelta(seconds=timeshift))
+            .values_list("strategy_id", flat=True)
+            .distinct()
+        )
+
+        if changed_strategy_ids:
+            logger.info(
+                f"[incremental_strategy_cache]: {len(changed_strategy_ids)} strategy changed "
+                f"in the past {timeshift} seconds"
+            )
+            try:
+                old_strategies, strategies_map = cls.get_related_strategies(changed_strategy_ids)
+                changes = cls.patch_strategies(old_strategies, strategies_map)
+            except Exception as e:  # noqa
+                logger.exception(f"[incremental_strategy_cache]: refresh strategy error: {e}")
+                exc = e
+            else:
+                for change_type, count in changes.items():
+                    metrics.STRATEGY_CACHE_REFRESH_CHANGED_COUNT.labels(type=change_type).inc(count)
+                logger.info(f"[incremental_strategy_cache]: changes: {changes}")
+        else:
+            logger.info(f"[incremental_strategy_cache]: no changed strategy found in the past {timeshift} seconds")
+
+        # 更新失败时不推进最后更新时间，下次重新处理本次的变更
+        if exc is None:
+            cls.cache.set(cls.LAST_UPDATED_CACHE_KEY, int(start_time), cls.CACHE_TIMEOUT)
+        duration = time.time() - start_time
+        logger.info(f"[incremental_strategy_cache]: cache strategy done, cost: {duration}")
+        metrics.ALARM_CACHE_TASK_TIME.labels("0", "incremental_strategy", str(exc)).observe(duration)
+        metrics.report_all()
+
     @classmethod
     def smart_refresh(cls):
         """
         增量更新，默认300s内变更的业务将被更新。 更新后将设置最后更新时间。
         """
+        if settings.ENABLE_STRATEGY_CACHE_INCREMENTAL_REFRESH:
+            return cls.incremental_refresh()
+
         start_time = time.time()
         exc = None
         # 拿最近更新成功时间
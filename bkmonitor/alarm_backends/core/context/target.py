@@ -8,6 +8,7 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import copy
 from typing import Dict, List
 
 from django.utils.functional import cached_property
@@ -68,6 +69,8 @@ class Target(BaseContextObject):
 
         if not result:
             return
+        # 主机对象来自进程内共享缓存，需在副本上补充展示字段
+        result = copy.copy(result)
         result.operator_string = ",".join(result.operator)
         result.bk_bak_operator_string = ",".join(result.bk_bak_operator)
         module_names = set()
@@ -95,6 +98,7 @@ class Target(BaseContextObject):
                 continue
 
             if host:
+                host = copy.copy(host)
                 host.operator_string = host.operator
                 host.bk_bak_operator_string = host.bk_bak_operator
                 module_names = set()
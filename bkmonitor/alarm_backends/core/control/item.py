@@ -11,7 +11,7 @@ specific language governing permissions and limitations under the License.
 
 import logging
 from collections import defaultdict
-from typing import List
+from typing import Iterator, List
 
 from django.conf import settings
 from django.db.models.sql import AND, OR
@@ -21,7 +21,7 @@ from alarm_backends.core.control.mixins import CheckMixin, DetectMixin, DoubleCh
 from bkmonitor.data_source import load_data_source
 from bkmonitor.data_source.unify_query.query import UnifyQuery
 from bkmonitor.strategy.new_strategy import get_metric_id
-from bkmonitor.utils.range import load_condition_instance
+from bkmonitor.utils.range import compile_condition_instance
 from bkmonitor.utils.range.target import TargetCondition
 from constants.strategy import AGG_METHOD_REAL_TIME
 
@@ -48,7 +48,7 @@ def gen_condition_matcher(agg_condition):
     if and_cond:
         or_cond.append(and_cond)
 
-    return load_condition_instance(or_cond)
+    return compile_condition_instance(or_cond)
 
 
 class Item(DetectMixin, CheckMixin, DoubleCheckMixin):
@@ -108,6 +108,17 @@ class Item(DetectMixin, CheckMixin, DoubleCheckMixin):
             record["_time_"] //= 1000
         return records
 
+    def query_record_pages(self, start_time: int, end_time: int, page_interval: int) -> Iterator[List]:
+        """
+        按时间分页查询数据
+        每页为 [page_start, page_end) 时间段内的全部数据，页之间按时间先后产出，同一时间点的数据不会跨页
+        """
+        page_start = start_time
+        while page_start < end_time:
+            page_end = min(page_start + page_interval, end_time)
+            yield self.query_record(page_start, page_end)
+            page_start = page_end
+
     @cached_property
     def target_condition_obj(self):
         if not self.target or not self.target[0]:
@@ -181,7 +192,7 @@ class Item(DetectMixin, CheckMixin, DoubleCheckMixin):
                 for file_type in settings.FILE_SYSTEM_TYPE_IGNORE:
                     t = {"field": settings.FILE_SYSTEM_TYPE_FIELD_NAME, "method": "neq", "value": file_type}
                     and_cond.append(t)
-                return load_condition_instance([and_cond])
+                return compile_condition_instance([and_cond])
 
             if getattr(data_source, "_is_system_net", lambda: False)():
                 and_cond = []
@@ -192,7 +203,7 @@ class Item(DetectMixin, CheckMixin, DoubleCheckMixin):
                         "value": condition["sql_statement"],
                     }
                     and_cond.append(t)
-                return load_condition_instance([and_cond])
+                return compile_condition_instance([and_cond])
 
     def is_range_match(self, dimensions):
         # 1. 匹配监控目标
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from typing import Optional, Tuple
+
+from django.conf import settings
+
+from alarm_backends.core.cache import key
+
+# detect 分区处理
+# 对配置了分区数的策略，access 按维度哈希将待检测数据写入多个分区队列，detect 按分区独立加锁处理。
+# 同一维度的数据总是落在同一分区，因此按维度存储的检测状态(如检测结果缓存)不受影响。
+
+# 检测信号中策略ID与分区号的分隔符
+SIGNAL_SEPARATOR = "|"
+
+
+def get_partition_count(strategy_id) -> int:
+    """
+    获取策略的detect分区数，未配置时为1(不分区)
+    """
+    partitions = settings.DETECT_PARTITION_STRATEGIES or {}
+    try:
+        return max(int(partitions.get(str(strategy_id), 1)), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def get_recorded_partition_count(strategy_id) -> int:
+    """
+    获取 access 最近写入分区队列时记录的分区数，用于关闭或缩减分区后处理遗留的分区队列
+    """
+    try:
+        count = key.DATA_PARTITION_COUNT_KEY.client.get(key.DATA_PARTITION_COUNT_KEY.get_key(strategy_id=strategy_id))
+        return max(int(count or 1), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def get_partition(record_id: str, partition_count: int) -> int:
+    """
+    根据记录ID中的维度md5计算分区号
+    """
+    dimensions_md5 = record_id.split(".")[0]
+    return int(dimensions_md5[:8], 16) % partition_count
+
+
+def make_detect_signal(strategy_id, partition: Optional[int] = None) -> str:
+    if partition is None:
+        return str(strategy_id)
+    return "{}{}{}".format(strategy_id, SIGNAL_SEPARATOR, partition)
+
+
+def parse_detect_signal(signal) -> Tuple[str, Optional[int]]:
+    """
+    解析检测信号
+    :return: (策略ID, 分区号)，未分区时分区号为None
+    """
+    strategy_id, _, partition = str(signal).partition(SIGNAL_SEPARATOR)
+    return strategy_id, int(partition) if partition else None
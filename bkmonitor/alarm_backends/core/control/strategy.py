@@ -15,12 +15,14 @@ from datetime import datetime
 from typing import Dict
 
 import arrow
+from django.conf import settings
 from django.utils.functional import cached_property
 from django.utils.translation import ugettext as _
 
 from alarm_backends.constants import CONST_MINUTES, CONST_ONE_HOUR, NO_DATA_LEVEL
 from alarm_backends.core.cache import key
 from alarm_backends.core.cache.calendar import CalendarCacheManager
+from alarm_backends.core.cache.local import MISSING, SizedLRUCache
 from alarm_backends.core.cache.strategy import StrategyCacheManager
 from alarm_backends.core.control.item import Item
 from alarm_backends.core.i18n import i18n
@@ -29,6 +31,62 @@ from core.errors.alarm_backends import StrategyItemNotFound
 
 logger = logging.getLogger("core.control")
 
+_snapshot_cache = None
+
+
+def get_snapshot_cache():
+    """
+    进程内共享的策略快照缓存，detect、trigger、alert 等模块共用
+    快照内容按key不可变，因此无需失效，只按占用字节数淘汰
+    """
+    global _snapshot_cache
+    if _snapshot_cache is None:
+        _snapshot_cache = SizedLRUCache("strategy_snapshot", maxbytes=settings.STRATEGY_SNAPSHOT_LOCAL_CACHE_BYTES)
+    return _snapshot_cache
+
+
+class StrategySnapshot(object):
+    """
+    策略快照及其预解析结果
+    对象在进程内共享，调用方应将其及 config 视为只读
+    """
+
+    def __init__(self, config: Dict):
+        self.config = config
+        self.items = {item["id"]: item for item in config.get("items", [])}
+        self._no_data_configs = {}
+        self._check_window_units = {}
+
+    @cached_property
+    def trigger_configs(self) -> Dict[str, Dict]:
+        return Strategy.get_trigger_configs(self.config)
+
+    @cached_property
+    def recovery_configs(self) -> Dict[str, Dict]:
+        return Strategy.get_recovery_configs(self.config)
+
+    def get_item(self, item_id):
+        item = self.items.get(item_id)
+        if item is None:
+            return Strategy.get_item_in_strategy(self.config, item_id)
+        return item
+
+    def get_no_data_configs(self, item_id) -> Dict:
+        """
+        获取监控项的无数据触发配置，返回副本，调用方可修改
+        """
+        if item_id not in self._no_data_configs:
+            self._no_data_configs[item_id] = Strategy.get_no_data_configs(self.get_item(item_id))
+        return dict(self._no_data_configs[item_id])
+
+    def get_check_window_unit(self, item_id, default_check_unit=None):
+        cache_key = (item_id, default_check_unit)
+        if cache_key not in self._check_window_units:
+            self._check_window_units[cache_key] = Strategy.get_check_window_unit(
+                self.get_item(item_id), default_check_unit
+            )
+        return self._check_window_units[cache_key]
+
 
 class Strategy(object):
     def __init__(self, strategy_id, default_config=None):
@@ -209,19 +267,41 @@ class Strategy(object):
         return snapshot_key
 
     @classmethod
-    def get_strategy_snapshot_by_key(cls, snapshot_key, strategy_id=None):
+    def get_snapshot(cls, snapshot_key, strategy_id=None):
+        """
+        获取策略快照对象(优先从进程内缓存获取)
+        :rtype: StrategySnapshot | None
+        """
         from bkmonitor.strategy.new_strategy import Strategy as StrategyClass
 
+        cache = get_snapshot_cache()
+        snapshot = cache.get(str(snapshot_key))
+        if snapshot is not MISSING:
+            return snapshot
+
         client = key.STRATEGY_SNAPSHOT_KEY.client
+        redis_key = snapshot_key
         if strategy_id:
-            snapshot_key = key.SimilarStr(snapshot_key)
-            snapshot_key.strategy_id = strategy_id
-        snapshot = client.get(snapshot_key)
-        if not snapshot:
+            redis_key = key.SimilarStr(snapshot_key)
+            redis_key.strategy_id = strategy_id
+        raw_snapshot = client.get(redis_key)
+        if not raw_snapshot:
+            # 快照不存在时不缓存，快照可能稍后才写入
             return None
 
-        snapshot_strategy = json.loads(snapshot)
-        return StrategyClass.convert_v1_to_v2(snapshot_strategy)
+        snapshot = StrategySnapshot(StrategyClass.convert_v1_to_v2(json.loads(raw_snapshot)))
+        cache.set(str(snapshot_key), snapshot, size=len(raw_snapshot))
+        return snapshot
+
+    @classmethod
+    def get_strategy_snapshot_by_key(cls, snapshot_key, strategy_id=None):
+        """
+        获取策略快照配置，返回的配置在进程内共享，调用方应视为只读
+        """
+        snapshot = cls.get_snapshot(snapshot_key, strategy_id)
+        if snapshot is None:
+            return None
+        return snapshot.config
 
     @classmethod
     def get_item_in_strategy(cls, strategy, item_id):
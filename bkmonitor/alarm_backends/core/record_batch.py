@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+"""
+access -> detect 待检测数据的列式批量编码
+
+旧格式：每条 DataRecord.data 单独序列化为一个 json 字符串，逐条 LPUSH 到 DATA_LIST_KEY
+新格式：一次推送的多条记录编码为一个列式数据块，维度key、指标key按 schema 共享，时间、值、维度值按列存储
+
+数据块格式: "{MAGIC}{flag}{payload}"
+- flag: "j" 表示 payload 为明文 json，"z" 表示 payload 为 zlib 压缩后的 base64
+- payload:
+{
+    "schemas": [[dimension_keys, value_keys, dimension_fields], ...],
+    "schema": [0, 0, 1, ...],
+    "record_id": [...],
+    "time": [...],
+    "value": [...],
+    "values": [[...], ...],
+    "dimensions": [[...], ...],
+    "extra": [{...}, ...]   # 非标准字段，如 access_time，没有时为 null
+}
+"""
+import base64
+import json
+import zlib
+from typing import Dict, Iterator, List
+
+MAGIC = "#RB1"
+FLAG_JSON = "j"
+FLAG_ZLIB = "z"
+
+# 标准字段，其余字段统一放到 extra 中
+STANDARD_FIELDS = {"record_id", "time", "value", "values", "dimensions", "dimension_fields"}
+
+
+def is_record_batch(raw: str) -> bool:
+    """
+    判断队列中的数据是否为列式数据块，旧格式为 json 对象，以 "{" 开头
+    """
+    return raw.startswith(MAGIC)
+
+
+def encode_record_batch(records: List[Dict], compress: bool = True) -> str:
+    """
+    将多条 DataRecord.data 编码为一个列式数据块
+    """
+    schema_index = {}
+    schemas = []
+    columns = {
+        "schema": [],
+        "record_id": [],
+        "time": [],
+        "value": [],
+        "values": [],
+        "dimensions": [],
+        "extra": [],
+    }
+    has_extra = False
+
+    for record in records:
+        dimensions = record.get("dimensions", {})
+        values = record.get("values", {})
+        schema = (tuple(dimensions), tuple(values), tuple(record.get("dimension_fields", ())))
+        index = schema_index.get(schema)
+        if index is None:
+            index = schema_index[schema] = len(schemas)
+            schemas.append([list(field) for field in schema])
+
+        columns["schema"].append(index)
+        columns["record_id"].append(record.get("record_id"))
+        columns["time"].append(record.get("time"))
+        columns["value"].append(record.get("value"))
+        columns["values"].append(list(values.values()))
+        columns["dimensions"].append(list(dimensions.values()))
+
+        extra = {k: v for k, v in record.items() if k not in STANDARD_FIELDS}
+        has_extra = has_extra or bool(extra)
+        columns["extra"].append(extra)
+
+    columns["schemas"] = schemas
+    if not has_extra:
+        columns["extra"] = None
+
+    payload = json.dumps(columns, separators=(",", ":"))
+    if compress:
+        return MAGIC + FLAG_ZLIB + base64.b64encode(zlib.compress(payload.encode("utf-8"))).decode("ascii")
+    return MAGIC + FLAG_JSON + payload
+
+
+class RecordBatch(object):
+    """
+    列式数据块的惰性解码，迭代时才逐条还原为 DataRecord.data 格式的字典
+    """
+
+    def __init__(self, raw: str):
+        flag, payload = raw[len(MAGIC)], raw[len(MAGIC) + 1 :]
+        if flag == FLAG_ZLIB:
+            try:
+                payload = zlib.decompress(base64.b64decode(payload)).decode("utf-8")
+            except zlib.error as e:
+                raise ValueError("invalid record batch: {}".format(e))
+        elif flag != FLAG_JSON:
+            raise ValueError("unknown record batch flag: {}".format(flag))
+        self.columns = json.loads(payload)
+
+    def __len__(self):
+        return len(self.columns["record_id"])
+
+    def __iter__(self) -> Iterator[Dict]:
+        columns = self.columns
+        schemas = columns["schemas"]
+        extras = columns.get("extra")
+        for index, schema_index in enumerate(columns["schema"]):
+            dimension_keys, value_keys, dimension_fields = schemas[schema_index]
+            record = {
+                "record_id": columns["record_id"][index],
+                "time": columns["time"][index],
+                "value": columns["value"][index],
+                "values": dict(zip(value_keys, columns["values"][index])),
+                "dimensions": dict(zip(dimension_keys, columns["dimensions"][index])),
+                "dimension_fields": list(dimension_fields),
+            }
+            if extras and extras[index]:
+                record.update(extras[index])
+            yield record
+
+
+def iter_records(raw: str) -> Iterator[Dict]:
+    """
+    兼容新旧两种格式，逐条返回 DataRecord.data 格式的字典
+    """
+    if is_record_batch(raw):
+        yield from RecordBatch(raw)
+    else:
+        yield json.loads(raw)
@@ -211,13 +211,14 @@ class BaseRedisCache(object):
             delay = 0
         score = time.time() + delay
         task_id = option.get("task_id", str(uuid.uuid4()))
+        # 与redis客户端的参数编码保持一致，投递时原样写入目标队列
+        values = [value if isinstance(value, str) else str(value) for value in values]
 
         message = json.dumps([task_id, cmd, queue, values, score])
 
         from alarm_backends.core.cache.delay_queue import DelayQueueManager
 
-        self.hset(DelayQueueManager.TASK_STORAGE_QUEUE, task_id, message)
-        self.zadd(DelayQueueManager.TASK_DELAY_QUEUE, {task_id: score})
+        DelayQueueManager.enqueue(self, task_id, message, queue, score)
 
 
 class RedisCache(BaseRedisCache):
@@ -122,6 +122,35 @@ class RedisProxy(KeyRouterMixin):
 
         return self._client_pool[node.id]
 
+    def group_keys_by_node(self, keys):
+        """
+        按路由节点对key进行分组
+        :return: {node_id: (node, [(index, key), ...])}
+        """
+        node_keys = {}
+        for index, key in enumerate(keys):
+            cache_node = get_node_by_strategy_id(self.strategy_id_from_key(key))
+            node_keys.setdefault(cache_node.id, (cache_node, []))[1].append((index, key))
+        return node_keys
+
+    def mget_by_node(self, keys, chunk_size=1000):
+        """
+        按路由节点分组后批量获取，每个节点每批次仅发起一次 MGET
+        :param keys: key列表，key需要携带strategy_id用于路由
+        :param chunk_size: 单次 MGET 的最大key数量
+        :return: 与keys顺序一致的值列表
+        """
+        result = [None] * len(keys)
+        for cache_node, indexed_keys in self.group_keys_by_node(keys).values():
+            client = self.get_client(cache_node)
+            for offset in range(0, len(indexed_keys), chunk_size):
+                chunk = indexed_keys[offset : offset + chunk_size]
+                # 连接异常重试由客户端处理
+                values = client.mget([key for _, key in chunk])
+                for (index, _), value in zip(chunk, values):
+                    result[index] = value
+        return result
+
     def __getattr__(self, name):
         def handle(*args, **kwargs):
             exception = None
@@ -9,12 +9,19 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import logging
+
+from django.conf import settings
 
 from alarm_backends.management.base.protocol import AbstractDispatchMixin
-from alarm_backends.management.hashring import HashRing
+from alarm_backends.management.hashring import count_moved_keys, get_hash_ring
+
+logger = logging.getLogger(__name__)
 
 
 class DefaultDispatchMixin(AbstractDispatchMixin):
+    _last_host_ring = None
+
     def dispatch_all_hosts(self, hosts):
         if isinstance(hosts, (list, tuple)):
             hosts = {host: 1 for host in hosts}
@@ -23,13 +30,31 @@ class DefaultDispatchMixin(AbstractDispatchMixin):
 
         host_targets_dict = {host: list() for host in hosts}
         if targets:
-            host_ring = HashRing(hosts)
+            host_ring = get_hash_ring(hosts, hash_func=settings.DISPATCH_HASH_RING_FUNC)
             for target in targets:
                 host = host_ring.get_node(target)
                 host_targets_dict[host].append(target)
+            self.report_rebalance(host_ring, targets)
 
         return targets, host_targets_dict
 
+    def report_rebalance(self, host_ring, targets):
+        """
+        节点成员变化时，记录需要迁移的分配对象数量
+        """
+        last_host_ring, self._last_host_ring = self._last_host_ring, host_ring
+        if last_host_ring is None or last_host_ring is host_ring:
+            return
+
+        moved_count, _ = count_moved_keys(last_host_ring, host_ring, targets)
+        logger.info(
+            "[dispatch] hosts changed(%s -> %s), %s/%s targets moved",
+            len(last_host_ring.nodes),
+            len(host_ring.nodes),
+            moved_count,
+            len(targets),
+        )
+
     def dispatch_for_host(self, hosts):
         targets, host_targets_dict = self.dispatch_all_hosts(hosts)
 
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from .alert_benchmark import AlertCacheBenchmark
+from .base import bc
+from .condition_benchmark import ConditionBenchmark
+from .delay_queue_benchmark import DelayQueueBenchmark
+from .duplicate_benchmark import DuplicateBenchmark
+from .trigger_benchmark import TriggerCheckBenchmark
+
+__all__ = [
+    "bc",
+    "AlertCacheBenchmark",
+    "ConditionBenchmark",
+    "DelayQueueBenchmark",
+    "DuplicateBenchmark",
+    "TriggerCheckBenchmark",
+]
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import hashlib
+import json
+
+from alarm_backends.core.cache.key import ALERT_DEDUPE_CONTENT_KEY
+from alarm_backends.management.benchmark.base import Benchmark, register_benchmark
+
+# 模拟告警分布在多个策略上
+STRATEGY_COUNT = 50
+
+
+@register_benchmark
+class AlertCacheBenchmark(Benchmark):
+    """
+    对比告警内容缓存逐个 GET 与按路由节点分组 MGET 的吞吐
+    """
+
+    name = "alert_cache"
+    description = "ALERT_DEDUPE_CONTENT_KEY per-key get vs mget by node"
+
+    def setup(self):
+        self.keys = []
+        pipeline = ALERT_DEDUPE_CONTENT_KEY.client.pipeline(transaction=False)
+        for index in range(self.count):
+            dedupe_md5 = hashlib.md5(str(index).encode()).hexdigest()
+            cache_key = ALERT_DEDUPE_CONTENT_KEY.get_key(strategy_id=index % STRATEGY_COUNT + 1, dedupe_md5=dedupe_md5)
+            self.keys.append(cache_key)
+            pipeline.set(cache_key, json.dumps({"id": index, "dedupe_md5": dedupe_md5}), ALERT_DEDUPE_CONTENT_KEY.ttl)
+        pipeline.execute()
+
+    def teardown(self):
+        for index in range(0, len(self.keys), 1000):
+            ALERT_DEDUPE_CONTENT_KEY.client.delete(*self.keys[index : index + 1000])
+
+    def bench_per_key(self):
+        return [ALERT_DEDUPE_CONTENT_KEY.client.get(cache_key) for cache_key in self.keys]
+
+    def bench_mget_by_node(self):
+        return ALERT_DEDUPE_CONTENT_KEY.client.mget_by_node(self.keys)
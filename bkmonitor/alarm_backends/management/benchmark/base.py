@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import time
+from collections import OrderedDict
+
+
+class Benchmark(object):
+    """
+    性能基准测试基类
+    子类实现 setup / teardown 准备和清理数据，并将需要对比的实现以 bench_xxx 方法的形式提供
+    """
+
+    name = ""
+    description = ""
+
+    def __init__(self, count=10000, repeat=3, **options):
+        self.count = count
+        self.repeat = repeat
+        self.options = options
+
+    def setup(self):
+        pass
+
+    def teardown(self):
+        pass
+
+    def cases(self):
+        return OrderedDict(
+            (name[len("bench_") :], getattr(self, name)) for name in sorted(dir(self)) if name.startswith("bench_")
+        )
+
+    def run(self):
+        results = OrderedDict()
+        self.setup()
+        try:
+            for case_name, case in self.cases().items():
+                cost_list = []
+                for _ in range(self.repeat):
+                    start = time.perf_counter()
+                    case()
+                    cost_list.append(time.perf_counter() - start)
+                results[case_name] = min(cost_list)
+        finally:
+            self.teardown()
+        return results
+
+    def report(self, results):
+        print("*" * 80)
+        print("{}: {} (count={}, repeat={})".format(self.name, self.description, self.count, self.repeat))
+        baseline = None
+        for case_name, cost in results.items():
+            if baseline is None:
+                baseline = cost
+            throughput = self.count / cost if cost else 0
+            speedup = baseline / cost if cost else 0
+            print(
+                "  - {:<24} {:>10.4f}s {:>14.1f} ops/s {:>8.2f}x".format(case_name, cost, throughput, speedup)
+            )
+
+
+class BenchmarkCollection(object):
+
+    benchmarks = OrderedDict()
+
+    def register(self, benchmark_cls):
+        self.benchmarks[benchmark_cls.name] = benchmark_cls
+
+    def run(self, names=None, **options):
+        for name, benchmark_cls in self.benchmarks.items():
+            if names and name not in names:
+                continue
+            benchmark = benchmark_cls(**options)
+            benchmark.report(benchmark.run())
+
+
+bc = BenchmarkCollection()
+
+
+def register_benchmark(cls):
+    bc.register(cls)
+    return cls
+
+
+def use_fake_redis():
+    """
+    使用 fakeredis 作为本地 redis 替身，仅用于基准测试
+    """
+    import fakeredis
+    import mock
+
+    server = fakeredis.FakeServer()
+    mock.patch(
+        "alarm_backends.core.storage.redis.redis.Redis",
+        side_effect=lambda *args, **kwargs: fakeredis.FakeRedis(server=server, decode_responses=True),
+    ).start()
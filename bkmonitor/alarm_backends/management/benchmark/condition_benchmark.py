@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import random
+
+from alarm_backends.management.benchmark.base import Benchmark, register_benchmark
+from bkmonitor.utils.range import compile_condition_instance, load_condition_instance
+
+# 模拟分派规则/策略过滤中常见的条件组合
+RULE_CONDITIONS = [
+    [
+        [
+            {"field": "bk_target_ip", "method": "eq", "value": ["10.0.0.{}".format(i) for i in range(200)]},
+            {"field": "alert.name", "method": "include", "value": ["CPU", "内存", "磁盘"]},
+        ],
+        [
+            {"field": "bk_biz_id", "method": "eq", "value": ["2", "3"]},
+            {"field": "device_name", "method": "reg", "value": [r"^eth\d+$", r"^bond\d+$"]},
+        ],
+    ],
+    [
+        [
+            {"field": "severity", "method": "lte", "value": [2]},
+            {"field": "tags.env", "method": "neq", "value": ["test", "dev"]},
+            {"field": "bk_topo_node", "method": "eq", "value": ["set|{}".format(i) for i in range(50)]},
+        ]
+    ],
+    [
+        [
+            {"field": "path", "method": "nreg", "value": [r"^/tmp/.*", r"^/var/log/.*\.log$"]},
+            {"field": "usage", "method": "gt", "value": [80]},
+        ]
+    ],
+]
+
+
+@register_benchmark
+class ConditionBenchmark(Benchmark):
+    """
+    对比每次重新加载条件对象与使用编译后条件对象的匹配耗时
+    """
+
+    name = "range_condition"
+    description = "dimension condition rebuild vs compiled"
+
+    def setup(self):
+        rand = random.Random(0)
+        self.data_list = [
+            {
+                "bk_target_ip": "10.0.0.{}".format(rand.randint(0, 400)),
+                "alert.name": rand.choice(["CPU使用率过高", "内存使用率", "进程端口"]),
+                "bk_biz_id": str(rand.randint(1, 5)),
+                "device_name": rand.choice(["eth0", "lo", "bond1"]),
+                "severity": rand.randint(1, 3),
+                "tags.env": rand.choice(["prod", "test"]),
+                "bk_topo_node": ["set|{}".format(rand.randint(0, 100)), "module|1"],
+                "path": rand.choice(["/tmp/a", "/data/b", "/var/log/c.log"]),
+                "usage": rand.randint(0, 100),
+            }
+            for _ in range(self.count)
+        ]
+
+    def bench_rebuild(self):
+        for data in self.data_list:
+            for conditions_config in RULE_CONDITIONS:
+                load_condition_instance(conditions_config, False).is_match(data)
+
+    def bench_compiled(self):
+        for data in self.data_list:
+            for conditions_config in RULE_CONDITIONS:
+                compile_condition_instance(conditions_config, False).is_match(data)
+
+    def bench_compiled_reuse(self):
+        conditions = [compile_condition_instance(conditions_config, False) for conditions_config in RULE_CONDITIONS]
+        for data in self.data_list:
+            for condition in conditions:
+                condition.is_match(data)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import json
+import time
+import uuid
+
+from alarm_backends.core.cache.delay_queue import DelayQueueManager
+from alarm_backends.core.storage.redis import Cache
+from alarm_backends.management.benchmark.base import Benchmark, register_benchmark
+
+BACKEND = "service"
+TARGET_QUEUE = "benchmark.delay_queue.target"
+
+
+@register_benchmark
+class DelayQueueBenchmark(Benchmark):
+    """
+    对比原有 hset+zadd 入队、逐个zrem出队的方式与事务入队、lua批量领取投递的吞吐
+    每轮将 count 个立即到期的任务入队，并持续投递直到目标队列收到全部任务
+    注意: 使用 fakeredis 时需要安装 lupa 以支持lua脚本
+    """
+
+    name = "delay_queue"
+    description = "delay queue legacy hset/zadd + zrem vs transactional enqueue + batched lua claim"
+
+    def setup(self):
+        self.client = Cache(BACKEND)
+        self.clear()
+
+    def teardown(self):
+        self.clear()
+
+    def clear(self):
+        self.client.delete(
+            DelayQueueManager.TASK_STORAGE_QUEUE,
+            DelayQueueManager.TASK_DELAY_QUEUE,
+            DelayQueueManager.TASK_DELAY_QUEUE_SHARDS,
+            TARGET_QUEUE,
+        )
+
+    def legacy_delay(self, cmd, queue, *values):
+        score = time.time()
+        task_id = str(uuid.uuid4())
+        message = json.dumps([task_id, cmd, queue, values, score])
+        self.client.hset(DelayQueueManager.TASK_STORAGE_QUEUE, task_id, message)
+        self.client.zadd(DelayQueueManager.TASK_DELAY_QUEUE, {task_id: score})
+
+    def legacy_dispatch(self):
+        task_ids = self.client.zrangebyscore(DelayQueueManager.TASK_DELAY_QUEUE, 0, int(time.time()) + 1)
+        pipe = self.client.pipeline()
+        for task_id in task_ids:
+            pipe.zrem(DelayQueueManager.TASK_DELAY_QUEUE, task_id)
+        result = pipe.execute()
+        data_keys = [data_key for data_key, flag in zip(task_ids, result) if flag]
+        if not data_keys:
+            return
+        task_list = [json.loads(task) for task in self.client.hmget(DelayQueueManager.TASK_STORAGE_QUEUE, data_keys)]
+        self.client.hdel(DelayQueueManager.TASK_STORAGE_QUEUE, *data_keys)
+        pipe = self.client.pipeline()
+        for task_id, cmd, queue, values, scheduled in task_list:
+            getattr(pipe, cmd)(queue, *values)
+        pipe.execute()
+
+    def run_cycle(self, enqueue, dispatch):
+        self.clear()
+        for index in range(self.count):
+            enqueue("rpush", TARGET_QUEUE, str(index))
+        while self.client.llen(TARGET_QUEUE) < self.count:
+            dispatch()
+
+    def bench_legacy(self):
+        self.run_cycle(self.legacy_delay, self.legacy_dispatch)
+
+    def bench_lua(self):
+        self.run_cycle(
+            lambda cmd, queue, *values: self.client.delay(cmd, queue, *values),
+            lambda: DelayQueueManager.refresh_single_db(BACKEND),
+        )
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import hashlib
+
+from alarm_backends.management.benchmark.base import Benchmark, register_benchmark
+from alarm_backends.service.access.data.duplicate import (
+    Duplicate,
+    FingerprintDuplicate,
+)
+
+STRATEGY_GROUP_KEY = "benchmark"
+STRATEGY_ID = 1
+TIMESTAMP = 1569246480
+
+
+class Record(object):
+    def __init__(self, record_id, time):
+        self.record_id = record_id
+        self.time = time
+
+
+@register_benchmark
+class DuplicateBenchmark(Benchmark):
+    """
+    对比集合去重与指纹去重的耗时及redis存储量
+    每轮模拟两个拉取周期：第一个周期全部写入，第二个周期全部判定为重复
+    """
+
+    name = "access_duplicate"
+    description = "access duplicate filter set vs fingerprint"
+
+    def setup(self):
+        self.records = [
+            Record("{}.{}".format(hashlib.md5(str(index).encode()).hexdigest(), TIMESTAMP), TIMESTAMP)
+            for index in range(self.count)
+        ]
+        self.payload_sizes = {}
+
+    def teardown(self):
+        for dup_class in (Duplicate, FingerprintDuplicate):
+            self.clear(dup_class(STRATEGY_GROUP_KEY, strategy_id=STRATEGY_ID))
+
+    @staticmethod
+    def clear(dup):
+        dup.get_record_ids(TIMESTAMP)
+        for dup_key in dup.record_ids_cache:
+            dup.client.delete(dup_key)
+
+    def run_cycles(self, dup_class):
+        self.clear(dup_class(STRATEGY_GROUP_KEY, strategy_id=STRATEGY_ID))
+        for _ in range(2):
+            dup = dup_class(STRATEGY_GROUP_KEY, strategy_id=STRATEGY_ID)
+            for record in self.records:
+                if not dup.is_duplicate(record):
+                    dup.add_record(record)
+            dup.refresh_cache()
+
+        # 近似的存储量(不含redis自身的数据结构开销)
+        dup = dup_class(STRATEGY_GROUP_KEY, strategy_id=STRATEGY_ID)
+        self.payload_sizes[dup_class.__name__] = sum(len(str(i)) for i in dup.get_record_ids(TIMESTAMP))
+
+    def bench_set(self):
+        self.run_cycles(Duplicate)
+
+    def bench_fingerprint(self):
+        self.run_cycles(FingerprintDuplicate)
+
+    def report(self, results):
+        super(DuplicateBenchmark, self).report(results)
+        for name, size in self.payload_sizes.items():
+            print("  - {:<24} {:>10} payload bytes".format(name, size))
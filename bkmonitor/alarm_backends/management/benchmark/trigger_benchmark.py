@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import hashlib
+
+from alarm_backends.core.cache.key import CHECK_RESULT_CACHE_KEY
+from alarm_backends.core.detect_result import ANOMALY_LABEL
+from alarm_backends.management.benchmark.base import Benchmark, register_benchmark
+from alarm_backends.service.trigger.checker import AnomalyChecker
+
+STRATEGY_ID = 1
+ITEM_ID = 1
+LEVEL = "1"
+INTERVAL = 60
+
+STRATEGY = {
+    "id": STRATEGY_ID,
+    "bk_biz_id": 2,
+    "items": [
+        {
+            "id": ITEM_ID,
+            "query_configs": [{"agg_interval": INTERVAL}],
+            "no_data_config": {"is_enabled": False, "continuous": 5},
+        }
+    ],
+    "detects": [
+        {
+            "level": int(LEVEL),
+            "expression": "",
+            "connector": "and",
+            "trigger_config": {"count": 3, "check_window": 5},
+            "recovery_config": {"check_window": 5},
+        }
+    ],
+}
+
+
+@register_benchmark
+class TriggerCheckBenchmark(Benchmark):
+    """
+    对比 trigger 逐点查询检测窗口与批量预取检测窗口的吞吐
+    """
+
+    name = "trigger"
+    description = "AnomalyChecker per-point zrangebyscore vs batch prefetch"
+
+    # 每个维度的异常点数量
+    POINTS_PER_DIMENSION = 5
+
+    def setup(self):
+        self.points = []
+        self.keys = []
+        dimension_count = max(self.count // self.POINTS_PER_DIMENSION, 1)
+        start_time = 1569246480
+
+        pipeline = CHECK_RESULT_CACHE_KEY.client.pipeline(transaction=False)
+        for index in range(dimension_count):
+            dimensions_md5 = hashlib.md5(str(index).encode()).hexdigest()
+            check_cache_key = CHECK_RESULT_CACHE_KEY.get_key(
+                strategy_id=STRATEGY_ID, item_id=ITEM_ID, dimensions_md5=dimensions_md5, level=LEVEL
+            )
+            self.keys.append(check_cache_key)
+            for offset in range(self.POINTS_PER_DIMENSION):
+                timestamp = start_time + offset * INTERVAL
+                pipeline.zadd(check_cache_key, {"{}|{}".format(timestamp, ANOMALY_LABEL): timestamp})
+                self.points.append(
+                    {
+                        "data": {
+                            "record_id": "{}.{}".format(dimensions_md5, timestamp),
+                            "value": 1,
+                            "values": {"timestamp": timestamp, "load5": 1},
+                            "dimensions": {"ip": str(index)},
+                            "time": timestamp,
+                        },
+                        "anomaly": {
+                            LEVEL: {
+                                "anomaly_message": "",
+                                "anomaly_id": "{}.{}.{}.{}.{}".format(
+                                    dimensions_md5, timestamp, STRATEGY_ID, ITEM_ID, LEVEL
+                                ),
+                                "anomaly_time": "",
+                            }
+                        },
+                        "strategy_snapshot_key": "",
+                    }
+                )
+        pipeline.execute()
+
+    def teardown(self):
+        for index in range(0, len(self.keys), 1000):
+            CHECK_RESULT_CACHE_KEY.client.delete(*self.keys[index : index + 1000])
+
+    def bench_per_point(self):
+        for point in self.points:
+            AnomalyChecker(point, STRATEGY, ITEM_ID).check_anomaly()
+
+    def bench_batch(self):
+        checkers = [AnomalyChecker(point, STRATEGY, ITEM_ID) for point in self.points]
+        AnomalyChecker.prefetch_check_results(checkers)
+        for checker in checkers:
+            checker.check_anomaly()
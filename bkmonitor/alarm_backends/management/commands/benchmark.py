@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from django.core.management.base import BaseCommand
+
+from alarm_backends.management.benchmark import bc
+from alarm_backends.management.benchmark.base import use_fake_redis
+
+
+class Command(BaseCommand):
+    help = "run backend performance benchmarks"
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            "names", nargs="*", help="benchmark names, run all if empty: {}".format(list(bc.benchmarks))
+        )
+        parser.add_argument("--count", type=int, default=10000, help="data count of each benchmark")
+        parser.add_argument("--repeat", type=int, default=3, help="repeat times of each case, report the best")
+        parser.add_argument("--fake-redis", action="store_true", help="use fakeredis as local redis stand-in")
+
+    def handle(self, *args, **options):
+        if options["fake_redis"]:
+            use_fake_redis()
+        bc.run(names=options["names"], count=options["count"], repeat=options["repeat"])
@@ -10,6 +10,8 @@ specific language governing permissions and limitations under the License.
 """
 
 
+import threading
+import zlib
 from bisect import bisect_left
 from hashlib import md5
 
@@ -17,9 +19,30 @@ import six
 from six.moves import range
 
 
+def md5_hash(key):
+    # 等价于 int(md5(key).hexdigest(), 16) % (2 ** 32)，即取摘要的低32位
+    return int.from_bytes(md5(key.encode("utf-8")).digest()[-4:], "big")
+
+
+def crc32_hash(key):
+    return zlib.crc32(key.encode("utf-8")) & 0xFFFFFFFF
+
+
+HASH_FUNCS = {
+    "md5": md5_hash,
+    "crc32": crc32_hash,
+}
+
+
 class HashRing(object):
-    def __init__(self, nodes, num_vnodes=2 ** 16):
+    # 单个哈希环缓存的key->node查询结果上限
+    MAX_LOOKUP_CACHE_SIZE = 100000
+
+    def __init__(self, nodes, num_vnodes=2 ** 16, hash_func="md5"):
         self.nodes = nodes
+        self.hash_func = hash_func
+        self._hash_func = HASH_FUNCS[hash_func]
+        self._lookup_cache = {}
 
         self.ring = []
         self.hash2node = {}
@@ -38,9 +61,63 @@ class HashRing(object):
         self.ring.sort()
 
     def _hash(self, key):
-        return int(md5(str(key).encode("utf-8")).hexdigest(), 16) % (2 ** 32)
+        return self._hash_func(str(key))
 
     def get_node(self, key):
+        try:
+            return self._lookup_cache[key]
+        except (KeyError, TypeError):
+            pass
+
         h = self._hash(key)
         n = bisect_left(self.ring, h) % self.vnodes
-        return self.hash2node[self.ring[n]]
+        node = self.hash2node[self.ring[n]]
+
+        if len(self._lookup_cache) >= self.MAX_LOOKUP_CACHE_SIZE:
+            self._lookup_cache.clear()
+        try:
+            self._lookup_cache[key] = node
+        except TypeError:
+            pass
+        return node
+
+
+_ring_cache = {}
+_ring_cache_lock = threading.Lock()
+# 缓存的哈希环数量上限，节点成员变化不频繁，保留最近的少量即可
+MAX_RING_CACHE_SIZE = 16
+
+
+def get_hash_ring(nodes, num_vnodes=2 ** 16, hash_func="md5"):
+    """
+    获取哈希环，相同节点集合只构建一次
+    :param nodes: {node: weight} 或 node 列表
+    """
+    if isinstance(nodes, (list, tuple, set)):
+        nodes = {node: 1 for node in nodes}
+
+    cache_key = (frozenset(six.iteritems(nodes)), num_vnodes, hash_func)
+    ring = _ring_cache.get(cache_key)
+    if ring is not None:
+        return ring
+
+    ring = HashRing(nodes, num_vnodes=num_vnodes, hash_func=hash_func)
+    with _ring_cache_lock:
+        if len(_ring_cache) >= MAX_RING_CACHE_SIZE:
+            _ring_cache.clear()
+        _ring_cache[cache_key] = ring
+    return ring
+
+
+def count_moved_keys(old_ring, new_ring, keys):
+    """
+    统计节点变化后需要迁移的key数量
+    :return: (迁移数量, {key: (旧节点, 新节点)})
+    """
+    moved = {}
+    for key in keys:
+        old_node = old_ring.get_node(key)
+        new_node = new_ring.get_node(key)
+        if old_node != new_node:
+            moved[key] = (old_node, new_node)
+    return len(moved), moved
@@ -8,6 +8,11 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import hashlib
+import math
+
+from django.conf import settings
+
 from alarm_backends.core.cache import key
 
 
@@ -66,3 +71,78 @@ class Duplicate:
             ttl_dup_key.strategy_id = self.strategy_id
             pipeline.expire(ttl_dup_key, key.ACCESS_DUPLICATE_KEY.ttl)
         pipeline.execute()
+
+
+class FingerprintDuplicate(Duplicate):
+    """
+    基于定长哈希指纹的去重
+    每个时间点的记录ID截断为定长哈希指纹(hex)，追加写入同一个字符串key中，
+    相比集合方案内存及传输量更小，代价是存在可控的误判(将新数据判为重复)
+    """
+
+    # 指纹长度范围(字节)
+    MIN_WIDTH = 4
+    MAX_WIDTH = 8
+
+    def __init__(self, strategy_group_key, strategy_id=None, false_positive_rate=None, capacity=None):
+        super(FingerprintDuplicate, self).__init__(strategy_group_key, strategy_id)
+        self.width = self.get_fingerprint_width(
+            false_positive_rate or settings.ACCESS_DUPLICATE_FALSE_POSITIVE_RATE,
+            capacity or settings.ACCESS_DUPLICATE_CAPACITY,
+        )
+        self.client = key.ACCESS_DUPLICATE_FINGERPRINT_KEY.client
+
+    @classmethod
+    def get_fingerprint_width(cls, false_positive_rate, capacity):
+        """
+        根据误判率预算计算指纹长度
+        单次判断的误判率约为 capacity / 2^(8 * width)
+        """
+        bits = math.log2(max(capacity, 1) / false_positive_rate)
+        return min(max(math.ceil(bits / 8), cls.MIN_WIDTH), cls.MAX_WIDTH)
+
+    def fingerprint(self, record_id):
+        return hashlib.blake2b(str(record_id).encode("utf-8"), digest_size=self.width).hexdigest()
+
+    def get_dup_key(self, time):
+        dup_key = key.ACCESS_DUPLICATE_FINGERPRINT_KEY.get_key(
+            strategy_group_key=self.strategy_group_key, dt_event_time=time, width=self.width
+        )
+        if self.strategy_id is not None:
+            dup_key.strategy_id = self.strategy_id
+        return dup_key
+
+    def get_record_ids(self, time):
+        dup_key = self.get_dup_key(time)
+        if dup_key not in self.record_ids_cache:
+            packed = self.client.get(dup_key) or ""
+            step = self.width * 2
+            self.record_ids_cache[dup_key] = {packed[i : i + step] for i in range(0, len(packed), step)}
+        return self.record_ids_cache[dup_key]
+
+    def is_duplicate(self, record):
+        return self.fingerprint(record.record_id) in self.get_record_ids(record.time)
+
+    def add_record(self, record):
+        dup_key = self.get_dup_key(record.time)
+        fingerprint = self.fingerprint(record.record_id)
+        self.record_ids_cache.setdefault(dup_key, set()).add(fingerprint)
+        self.pending_to_add.setdefault(dup_key, set()).add(fingerprint)
+
+    def refresh_cache(self):
+        # append 为原子操作，同一策略组的多个子任务并发写入也不会丢失指纹
+        # 仅刷新有写入的key的过期时间，只读的时间点无需续期
+        pipeline = self.client.pipeline(transaction=False)
+        for dup_key, fingerprints in self.pending_to_add.items():
+            pipeline.append(dup_key, "".join(fingerprints))
+            pipeline.expire(dup_key, key.ACCESS_DUPLICATE_FINGERPRINT_KEY.ttl)
+        pipeline.execute()
+
+
+def get_duplicate(strategy_group_key, strategy_id=None):
+    """
+    根据配置的去重模式创建去重对象
+    """
+    if settings.ACCESS_DUPLICATE_MODE == "fingerprint":
+        return FingerprintDuplicate(strategy_group_key, strategy_id=strategy_id)
+    return Duplicate(strategy_group_key, strategy_id=strategy_id)
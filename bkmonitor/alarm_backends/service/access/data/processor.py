@@ -36,11 +36,17 @@ from alarm_backends.core.cache.strategy import StrategyCacheManager
 from alarm_backends.core.cluster import get_cluster
 from alarm_backends.core.control.checkpoint import Checkpoint
 from alarm_backends.core.control.item import Item
+from alarm_backends.core.control.partition import (
+    get_partition,
+    get_partition_count,
+    make_detect_signal,
+)
 from alarm_backends.core.control.strategy import Strategy
+from alarm_backends.core.record_batch import encode_record_batch
 from alarm_backends.core.storage.redis import Cache
-from alarm_backends.management.hashring import HashRing
+from alarm_backends.management.hashring import get_hash_ring
 from alarm_backends.service.access import base
-from alarm_backends.service.access.data.duplicate import Duplicate
+from alarm_backends.service.access.data.duplicate import get_duplicate
 from alarm_backends.service.access.data.filters import (
     ExpireFilter,
     HostStatusFilter,
@@ -135,10 +141,47 @@ class BaseAccessDataProcess(base.BaseAccessProcess):
         :param record_list
         :param output_client
         :param data_list_key：数据队列，默认为 key.DATA_LIST_KEY
+        :return: 需要发送的检测信号列表
         """
         data_list_key = data_list_key or key.DATA_LIST_KEY
+        strategy_id = item.strategy.strategy_id
+
+        # 配置了分区的策略，待检测数据按维度写入分区队列
+        partition_count = get_partition_count(strategy_id) if data_list_key is key.DATA_LIST_KEY else 1
+        if partition_count > 1:
+            partition_records = defaultdict(list)
+            for record in record_list:
+                partition_records[get_partition(record.record_id, partition_count)].append(record)
+
+            signals = []
+            for partition, records in partition_records.items():
+                output_key = key.DATA_LIST_PARTITION_KEY.get_key(
+                    strategy_id=strategy_id, item_id=item.id, partition=partition
+                )
+                self._push_records(item, records, output_key, key.DATA_LIST_PARTITION_KEY, output_client)
+                signals.append(make_detect_signal(strategy_id, partition))
+
+            client = output_client or data_list_key.client
+            # 记录分区数，关闭或缩减分区后由非分区处理拉取遗留的分区队列
+            client.set(
+                key.DATA_PARTITION_COUNT_KEY.get_key(strategy_id=strategy_id),
+                partition_count,
+                ex=key.DATA_PARTITION_COUNT_KEY.ttl,
+            )
+            # 启用分区前遗留在非分区队列中的数据，仍需按非分区方式处理
+            if client.llen(data_list_key.get_key(strategy_id=strategy_id, item_id=item.id)):
+                signals.append(make_detect_signal(strategy_id))
+            return signals
+
+        output_key = data_list_key.get_key(strategy_id=strategy_id, item_id=item.id)
+        self._push_records(item, record_list, output_key, data_list_key, output_client)
+        return [make_detect_signal(strategy_id)]
+
+    def _push_records(self, item, record_list, output_key, data_list_key, output_client=None):
+        """
+        推送数据到指定队列
+        """
         client = output_client or data_list_key.client
-        output_key = data_list_key.get_key(strategy_id=item.strategy.strategy_id, item_id=item.id)
         queue_length = client.llen(output_key)
         # 超过最大检测长度10倍(50w)说明detect模块处理能力不足,数据将被丢弃。
         if queue_length > settings.SQL_MAX_LIMIT * 10:
@@ -150,11 +193,25 @@ class BaseAccessDataProcess(base.BaseAccessProcess):
             )
             raise Exception(msg)
 
+        # 列式批量格式仅用于待检测队列，无数据队列仍使用逐条格式
+        use_record_batch = settings.ENABLE_ACCESS_RECORD_BATCH and data_list_key in (
+            key.DATA_LIST_KEY,
+            key.DATA_LIST_PARTITION_KEY,
+        )
+
         pipeline = client.pipeline(transaction=False)
         _offset = 0
         while _offset < len(record_list):
             chunk_records = record_list[_offset : _offset + 10000]
-            pipeline.lpush(output_key, *[json.dumps(record.data) for record in chunk_records])
+            if use_record_batch:
+                pipeline.lpush(
+                    output_key,
+                    encode_record_batch(
+                        [record.data for record in chunk_records], compress=settings.ACCESS_RECORD_BATCH_COMPRESS
+                    ),
+                )
+            else:
+                pipeline.lpush(output_key, *[json.dumps(record.data) for record in chunk_records])
             _offset += 10000
         # 避免监控周期大于默认key过期时间，引起数据丢失
         agg_interval = min(query_config["agg_interval"] for query_config in item.query_configs)
@@ -181,6 +238,42 @@ class BaseAccessDataProcess(base.BaseAccessProcess):
                 "count": len(record_list),
             }
 
+    def _push_no_data_presence(self, item, record_list, output_client=None):
+        """
+        推送无数据检测维度存在索引
+        无数据检测只关心每个周期有哪些维度上报，因此按周期写入维度集合(hash: 维度md5 -> 维度)，
+        同一周期同一维度只保留一份，并在周期集合中登记待检测周期
+        """
+        if not record_list:
+            return
+
+        strategy_id = item.strategy.strategy_id
+        period_dimensions = defaultdict(dict)
+        for record in record_list:
+            dimensions = record.data["dimensions"]
+            period_dimensions[record.data["time"]][count_md5(dimensions)] = json.dumps(dimensions)
+
+        agg_interval = min(query_config["agg_interval"] for query_config in item.query_configs)
+        ttl = max([key.NO_DATA_PRESENCE_KEY.ttl, agg_interval * 5])
+        periods_key = key.NO_DATA_PRESENCE_PERIODS_KEY.get_key(strategy_id=strategy_id, item_id=item.id)
+
+        client = output_client or key.NO_DATA_PRESENCE_KEY.client
+        pipeline = client.pipeline(transaction=False)
+        # 先写维度集合再登记周期，保证nodata读取到周期时维度集合已写入
+        for timestamp, dimensions in period_dimensions.items():
+            presence_key = key.NO_DATA_PRESENCE_KEY.get_key(
+                strategy_id=strategy_id, item_id=item.id, timestamp=timestamp
+            )
+            pipeline.hmset(presence_key, dimensions)
+            pipeline.expire(presence_key, ttl)
+        pipeline.zadd(periods_key, {str(timestamp): timestamp for timestamp in period_dimensions})
+        pipeline.expire(periods_key, ttl)
+        pipeline.execute()
+
+        metrics.ACCESS_PROCESS_PUSH_DATA_COUNT.labels(strategy_id=metrics.TOTAL_TAG, type="nodata_presence").inc(
+            sum(len(dimensions) for dimensions in period_dimensions.values())
+        )
+
     def push(self, records: List = None, output_client=None):
         """
         推送格式化后的数据到 detect 和 nodata 中(按单个策略，单个item项，写入不同的队列)
@@ -206,14 +299,12 @@ class BaseAccessDataProcess(base.BaseAccessProcess):
                 if record.is_retains[item_id] and not record.inhibitions[item_id]:
                     pending_to_push[item_id].append(record)
 
-        strategy_ids = set()
+        signals = set()
         for item_id, record_list in list(pending_to_push.items()):
             item = item_id_to_item[item_id]
             if record_list:
-                strategy_ids.add(item.strategy.strategy_id)
-
                 # 推送到检测队列
-                self._push(item, record_list, output_client)
+                signals.update(self._push(item, record_list, output_client))
 
                 # 推送降噪基数至redis队列
                 try:
@@ -223,13 +314,16 @@ class BaseAccessDataProcess(base.BaseAccessProcess):
 
             # 推送无数据处理
             if item.no_data_config["is_enabled"]:
-                self._push(item, records, output_client, key.NO_DATA_LIST_KEY)
+                if settings.ENABLE_NODATA_PRESENCE_INDEX:
+                    self._push_no_data_presence(item, records, output_client)
+                else:
+                    self._push(item, records, output_client, key.NO_DATA_LIST_KEY)
 
         # 推送数据处理信号
         if records:
             client = output_client or key.DATA_SIGNAL_KEY.client
-            if strategy_ids:
-                client.lpush(key.DATA_SIGNAL_KEY.get_key(), *list(strategy_ids))
+            if signals:
+                client.lpush(key.DATA_SIGNAL_KEY.get_key(), *list(signals))
             client.expire(key.DATA_SIGNAL_KEY.get_key(), key.DATA_SIGNAL_KEY.ttl)
 
 
@@ -306,25 +400,111 @@ class AccessDataProcess(BaseAccessDataProcess):
         if self.from_timestamp > self.until_timestamp:
             return
 
+        # 超量策略组按时间分页拉取，边拉取边下发分批任务
+        if self.is_stream_pull():
+            points, point_total = self.pull_stream()
+            self.check_point_overflow(point_total)
+            self.filter_duplicates(points)
+            return
+
         # 数据查询
         points = self.query_data(now_timestamp)
 
         # 当点数大于阈值时，将数据拆分为多个批量任务
         point_total = len(points)
-        if point_total > (settings.ACCESS_DATA_BATCH_PROCESS_THRESHOLD or 500000):
-            # 超过50w点，或者触发了分批处理阈值， 则记录策略信息
-            metrics.PROCESS_OVER_FLOW.labels(
-                module="access.data",
-                strategy_id=self.items[0].strategy.id,
-                bk_biz_id=self.items[0].strategy.bk_biz_id,
-                strategy_name=self.items[0].strategy.name,
-            ).inc(point_total)
-            if settings.ACCESS_DATA_BATCH_PROCESS_THRESHOLD > 0:
-                points = self.send_batch_data(points, settings.ACCESS_DATA_BATCH_PROCESS_SIZE)
+        if self.check_point_overflow(point_total) and settings.ACCESS_DATA_BATCH_PROCESS_THRESHOLD > 0:
+            points = self.send_batch_data(points, settings.ACCESS_DATA_BATCH_PROCESS_SIZE)
 
         # 过滤重复数据并实例化
         self.filter_duplicates(points)
 
+    def check_point_overflow(self, point_total: int) -> bool:
+        """
+        检查数据点数是否超过分批处理阈值
+        """
+        if point_total <= (settings.ACCESS_DATA_BATCH_PROCESS_THRESHOLD or 500000):
+            return False
+
+        # 超过50w点，或者触发了分批处理阈值， 则记录策略信息
+        metrics.PROCESS_OVER_FLOW.labels(
+            module="access.data",
+            strategy_id=self.items[0].strategy.id,
+            bk_biz_id=self.items[0].strategy.bk_biz_id,
+            strategy_name=self.items[0].strategy.name,
+        ).inc(point_total)
+
+        # 标记为超量策略组，后续周期使用分页拉取
+        if settings.ENABLE_ACCESS_STREAM_PULL:
+            stream_key = key.ACCESS_STREAM_PULL_KEY.get_key(strategy_group_key=self.strategy_group_key)
+            stream_key.strategy_id = self.items[0].strategy.id
+            key.ACCESS_STREAM_PULL_KEY.client.set(stream_key, point_total, ex=key.ACCESS_STREAM_PULL_KEY.ttl)
+        return True
+
+    def is_stream_pull(self) -> bool:
+        """
+        是否使用分页拉取
+        仅对上次拉取超过阈值的策略组生效，计算平台数据源需要基于全量数据判断localTime，不支持分页
+        """
+        if not settings.ENABLE_ACCESS_STREAM_PULL or settings.ACCESS_DATA_BATCH_PROCESS_THRESHOLD <= 0:
+            return False
+
+        if DataSourceLabel.BK_DATA in self.items[0].data_source_labels:
+            return False
+
+        stream_key = key.ACCESS_STREAM_PULL_KEY.get_key(strategy_group_key=self.strategy_group_key)
+        stream_key.strategy_id = self.items[0].strategy.id
+        return bool(key.ACCESS_STREAM_PULL_KEY.client.exists(stream_key))
+
+    def pull_stream(self):
+        """
+        按时间分页拉取数据，累计达到分批大小即下发分批任务，返回第一批数据及总点数
+        页之间没有重叠的时间点，按页切分批次可以保证同一时间点的数据在同一批次中
+        """
+        first_item = self.items[0]
+
+        # 由于某些数据源需要进行策略分组，因此需要将条件置为空
+        if not (first_item.data_source_types & MULTI_METRIC_DATA_SOURCES):
+            first_item.data_sources[0]._advance_where = []
+
+        agg_interval = min(query_config["agg_interval"] for query_config in first_item.query_configs)
+        page_interval = agg_interval * max(settings.ACCESS_DATA_STREAM_PAGE_PERIODS, 1)
+        pages = first_item.query_record_pages(self.from_timestamp, self.until_timestamp, page_interval)
+
+        self.batch_timestamp = int(time.time())
+        first_batch_points, batch_points = [], []
+        batch_count = point_total = 0
+        for page in self.iter_record_pages(pages):
+            point_total += len(page)
+            batch_points.extend(page)
+            if len(batch_points) < settings.ACCESS_DATA_BATCH_PROCESS_SIZE:
+                continue
+
+            batch_count += 1
+            if batch_count == 1:
+                first_batch_points = batch_points
+            else:
+                self.send_batch(batch_points, batch_count)
+            batch_points = []
+
+        # 剩余不足一批的数据
+        if batch_points:
+            batch_count += 1
+            if batch_count == 1:
+                first_batch_points = batch_points
+            else:
+                self.send_batch(batch_points, batch_count)
+
+        if batch_count > 1:
+            self.sub_task_id = f"{self.batch_timestamp}.1"
+            self.batch_count = batch_count
+            logger.info(
+                "strategy_group_key({}), stream pull {} access data into {} batch tasks".format(
+                    self.strategy_group_key, point_total, batch_count
+                )
+            )
+
+        return first_batch_points, point_total
+
     def query_data(self, now_timestamp: int) -> List[Dict]:
         """
         数据源查询
@@ -420,15 +600,46 @@ class AccessDataProcess(BaseAccessDataProcess):
 
         self.until_timestamp = until_timestamp
 
-    def send_batch_data(self, points: List[Dict], batch_threshold: int = 50000) -> List[Dict]:
+    def iter_record_pages(self, pages):
         """
-        发送分批处理任务，并返回第一批数据
+        迭代分页数据，查询异常时停止拉取后续时间段
+        检测点不会越过未拉取的数据，下个周期会重新拉取
+        """
+        try:
+            for page in pages:
+                yield page
+        except BKAPIError as e:
+            logger.error(e)
+        except Exception as e:  # noqa
+            logger.exception(
+                "strategy_group_key({strategy_group_key}) query records error, {err}".format(
+                    strategy_group_key=self.strategy_group_key, err=e
+                )
+            )
+
+    def send_batch(self, batch_points: List[Dict], batch_count: int):
+        """
+        将分批数据写入redis，并发起异步任务
         """
         from alarm_backends.service.access.tasks import run_access_batch_data
 
+        sub_task_id = f"{self.batch_timestamp}.{batch_count}"
+        data_key = key.ACCESS_BATCH_DATA_KEY.get_key(
+            strategy_group_key=self.strategy_group_key, sub_task_id=sub_task_id
+        )
+        data_key.strategy_id = self.items[0].strategy.id
+        compress_batch_points = base64.b64encode(gzip.compress(json.dumps(batch_points).encode("utf-8")))
+        key.ACCESS_BATCH_DATA_KEY.client.set(data_key, compress_batch_points, ex=key.ACCESS_BATCH_DATA_KEY.ttl)
+
+        # 发起异步任务
+        run_access_batch_data.delay(self.strategy_group_key, sub_task_id)
+
+    def send_batch_data(self, points: List[Dict], batch_threshold: int = 50000) -> List[Dict]:
+        """
+        发送分批处理任务，并返回第一批数据
+        """
         self.batch_timestamp = int(time.time())
 
-        client = key.ACCESS_BATCH_DATA_KEY.client
         first_batch_points = []
         latest_record_timestamp = None
         last_batch_index, batch_count = 0, 0
@@ -453,17 +664,7 @@ class AccessDataProcess(BaseAccessDataProcess):
             if batch_count == 1:
                 first_batch_points = batch_points
             else:
-                # 将分批数据写入redis
-                sub_task_id = f"{self.batch_timestamp}.{batch_count}"
-                data_key = key.ACCESS_BATCH_DATA_KEY.get_key(
-                    strategy_group_key=self.strategy_group_key, sub_task_id=sub_task_id
-                )
-                data_key.strategy_id = self.items[0].strategy.id
-                compress_batch_points = base64.b64encode(gzip.compress(json.dumps(batch_points).encode("utf-8")))
-                client.set(data_key, compress_batch_points, ex=key.ACCESS_BATCH_DATA_KEY.ttl)
-
-                # 发起异步任务
-                run_access_batch_data.delay(self.strategy_group_key, sub_task_id)
+                self.send_batch(batch_points, batch_count)
 
             # 记录下一轮的起始位置
             last_batch_index = index
@@ -486,7 +687,7 @@ class AccessDataProcess(BaseAccessDataProcess):
         first_item = self.items[0]
 
         records = []
-        dup_obj = Duplicate(self.strategy_group_key, strategy_id=first_item.strategy.id)
+        dup_obj = get_duplicate(self.strategy_group_key, strategy_id=first_item.strategy.id)
         duplicate_counts = none_point_counts = 0
 
         # 是否有优先级
@@ -938,7 +1139,7 @@ class AccessRealTimeDataProcess(BaseAccessDataProcess):
 
             # 使用哈希算法分配topic到机器上
             hosts = self.get_all_hosts()
-            hash_ring = HashRing({host: 1 for host in hosts})
+            hash_ring = get_hash_ring(hosts, hash_func=settings.DISPATCH_HASH_RING_FUNC)
             host_topics = defaultdict(set)
             for partition in partitions:
                 host = hash_ring.get_node(partition)
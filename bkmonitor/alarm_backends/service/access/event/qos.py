@@ -34,36 +34,78 @@ class QoSMixin(object):
         )
 
     def check_qos(self, check_client=None):
+        """
+        QoS 流控检测
+        流控生效时通常正处于事件洪峰，因此先在内存中按告警维度聚合计数，再通过一次 pipeline 批量累加，
+        根据累加后的计数还原每条记录对应的序号，超过阈值的记录将被丢弃
+        """
         client = check_client or key.QOS_CONTROL_KEY.client
         if not client.exists(key.QOS_CONTROL_KEY.get_key()):
             return False
 
-        new_record_list = []
+        # 按记录顺序收集待计数的 (记录, 策略ID, 监控项ID, 维度md5)
+        pending = []
+        # 相同匹配信息的维度md5只计算一次
+        md5_cache = {}
+        dimensions_md5_counts = {}
         for event_record in self.record_list:
             for item in event_record.items:
                 strategy_id = item.strategy.id
                 item_id = item.id
                 if not event_record.is_retains[item_id] or event_record.inhibitions[item_id]:
                     continue
-                dimensions_md5 = self.hash_alarm_by_match_info(event_record, strategy_id, item_id)
-                try:
-                    count_of_alarm = client.hincrby(
-                        key.QOS_CONTROL_KEY.get_key(), key.QOS_CONTROL_KEY.get_field(dimensions_md5=dimensions_md5), 1
+                match_info = (
+                    event_record.bk_biz_id,
+                    strategy_id,
+                    item_id,
+                    event_record.data["data"]["dimensions"]["bk_target_ip"],
+                    event_record.level,
+                )
+                dimensions_md5 = md5_cache.get(match_info)
+                if dimensions_md5 is None:
+                    dimensions_md5 = md5_cache[match_info] = self.hash_alarm_by_match_info(
+                        event_record, strategy_id, item_id
                     )
-                    if count_of_alarm > settings.QOS_DROP_ALARM_THREADHOLD:
-                        logger.warning(
-                            "qos drop alarm: cc_biz_id(%s), host(%s), " "strategy_id(%s), item_id(%s), level(%s)",
-                            event_record.bk_biz_id,
-                            event_record.data["data"]["dimensions"]["bk_target_ip"],
-                            strategy_id,
-                            item_id,
-                            event_record.level,
-                        )
-                    else:
-                        new_record_list.append(event_record)
-                except Exception as err:
-                    new_record_list.append(event_record)
-                    logger.exception(err)
+                pending.append((event_record, strategy_id, item_id, dimensions_md5))
+                dimensions_md5_counts[dimensions_md5] = dimensions_md5_counts.get(dimensions_md5, 0) + 1
+
+        if not pending:
+            self.record_list = []
+            return True
+
+        try:
+            pipeline = client.pipeline(transaction=False)
+            for dimensions_md5, count in dimensions_md5_counts.items():
+                pipeline.hincrby(
+                    key.QOS_CONTROL_KEY.get_key(), key.QOS_CONTROL_KEY.get_field(dimensions_md5=dimensions_md5), count
+                )
+            results = pipeline.execute()
+        except Exception as err:
+            # 计数失败时不丢弃数据
+            logger.exception(err)
+            self.record_list = [event_record for event_record, _, _, _ in pending]
+            return True
+
+        # 批量累加后的计数减去本批次数量，即为本批次第一条记录累加前的计数
+        start_counts = {
+            dimensions_md5: int(result) - dimensions_md5_counts[dimensions_md5]
+            for dimensions_md5, result in zip(dimensions_md5_counts, results)
+        }
+
+        new_record_list = []
+        for event_record, strategy_id, item_id, dimensions_md5 in pending:
+            start_counts[dimensions_md5] += 1
+            if start_counts[dimensions_md5] > settings.QOS_DROP_ALARM_THREADHOLD:
+                logger.warning(
+                    "qos drop alarm: cc_biz_id(%s), host(%s), " "strategy_id(%s), item_id(%s), level(%s)",
+                    event_record.bk_biz_id,
+                    event_record.data["data"]["dimensions"]["bk_target_ip"],
+                    strategy_id,
+                    item_id,
+                    event_record.level,
+                )
+            else:
+                new_record_list.append(event_record)
 
         self.record_list = new_record_list
         return True
@@ -25,7 +25,7 @@ from alarm_backends.core.cache.key import (
 )
 from alarm_backends.core.cluster import get_cluster
 from alarm_backends.core.handlers import base
-from alarm_backends.management.hashring import HashRing
+from alarm_backends.management.hashring import get_hash_ring
 from alarm_backends.management.utils import get_host_addr
 from alarm_backends.service.alert.builder.tasks import run_alert_builder
 from bkmonitor.models import EventPluginInstance
@@ -221,7 +221,7 @@ class AlertHandler(base.BaseHandler):
                     # 一般没有获取到hosts， 可能是consul服务有问题, 暂时等待一下
                     time.sleep(15)
                 else:
-                    hash_ring = HashRing({host: 1 for host in hosts})
+                    hash_ring = get_hash_ring(hosts, hash_func=settings.DISPATCH_HASH_RING_FUNC)
                     host_kfk_info = defaultdict(list)
                     for data_id, kfk_info in plugin_kafka_configs.items():
                         for partition_info in kfk_info:
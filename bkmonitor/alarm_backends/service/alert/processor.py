@@ -53,7 +53,8 @@ class BaseAlertProcessor:
             )
             dedupe_md5_list.extend(md5_list)
 
-        alert_data = [ALERT_DEDUPE_CONTENT_KEY.client.get(cache_key) for cache_key in cache_keys]
+        # 按路由节点分组批量获取，避免逐个key请求
+        alert_data = ALERT_DEDUPE_CONTENT_KEY.client.mget_by_node(cache_keys)
 
         alerts = []
 
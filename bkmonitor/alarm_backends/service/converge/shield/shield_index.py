@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import bisect
+import logging
+from collections import defaultdict
+
+import arrow
+
+from alarm_backends.core.cache.local import MISSING, VersionedLRUCache
+from alarm_backends.core.cache.shield import ShieldCacheManager
+from alarm_backends.service.converge.shield.shield_obj import AlertShieldObj
+from bkmonitor.documents.alert import AlertDocument
+from bkmonitor.utils.range.conditions import EqualCondition
+
+logger = logging.getLogger("fta_action.shield")
+
+
+class AlertShieldIndex:
+    """
+    业务屏蔽配置索引
+    1. 按屏蔽配置的生效时间范围排序，快速过滤当前不在时间范围内的屏蔽配置
+    2. 以屏蔽配置中的一个等值维度条件(策略ID、主机、实例、拓扑节点等)建立倒排索引，告警仅需与命中的屏蔽配置进行完整匹配
+    无等值维度条件的屏蔽配置(如全业务屏蔽、仅包含高级维度条件的屏蔽)始终参与匹配
+    """
+
+    # 优先作为索引的维度字段
+    INDEX_FIELDS = (
+        "strategy_id",
+        "bk_host_id",
+        "bk_target_ip",
+        "ip",
+        "service_instance_id",
+        "bk_target_service_instance_id",
+        "bk_topo_node",
+    )
+
+    def __init__(self, configs):
+        self.configs = configs
+        self.shield_objs = [AlertShieldObj(config) for config in configs]
+        self.shield_objs_by_id = {str(shield_obj.id): shield_obj for shield_obj in self.shield_objs}
+
+        # 生效时间范围，按开始时间排序: [(begin_time, end_time, 配置位置)]
+        time_ranges = []
+        for position, shield_obj in enumerate(self.shield_objs):
+            time_check = shield_obj.time_check
+            begin_time = time_check.begin_datetime.timestamp if time_check.begin_datetime else float("-inf")
+            end_time = time_check.end_datetime.timestamp if time_check.end_datetime else float("inf")
+            time_ranges.append((begin_time, end_time, position))
+        time_ranges.sort()
+        self.time_ranges = time_ranges
+        self.begin_times = [time_range[0] for time_range in time_ranges]
+
+        # {字段取值方式: (维度字段对象, {维度值: {配置位置}})}
+        self.index = {}
+        self.unindexed_positions = set()
+        for position, shield_obj in enumerate(self.shield_objs):
+            condition = self.get_index_condition(shield_obj)
+            if condition is None:
+                self.unindexed_positions.add(position)
+                continue
+
+            cond_field = condition.cond_field
+            field_key = self.get_field_key(cond_field)
+            if field_key not in self.index:
+                self.index[field_key] = (cond_field, defaultdict(set))
+            value_index = self.index[field_key][1]
+            for value in cond_field.to_str_list():
+                value_index[value].add(position)
+
+    @classmethod
+    def get_index_condition(cls, shield_obj: AlertShieldObj):
+        """
+        选取屏蔽配置中用于索引的等值条件
+        """
+        equal_conditions = {}
+        for condition in shield_obj.dimension_check.conditions:
+            if type(condition) is EqualCondition:
+                equal_conditions.setdefault(condition.cond_field.name, condition)
+
+        for field_name in cls.INDEX_FIELDS:
+            if field_name in equal_conditions:
+                return equal_conditions[field_name]
+        return next(iter(equal_conditions.values()), None)
+
+    @staticmethod
+    def get_field_key(cond_field):
+        """
+        字段取值方式的标识
+        部分字段(如ip)会根据配置值首个元素的格式决定如何从数据中取值，需要区分
+        """
+        first_value = cond_field.value
+        if cond_field.value and isinstance(cond_field.value, (list, tuple)):
+            first_value = cond_field.value[0]
+        value_keys = tuple(sorted(first_value)) if isinstance(first_value, dict) else None
+        return cond_field.__class__, cond_field.name, value_keys
+
+    def get_active_positions(self, timestamp):
+        """
+        获取生效时间范围包含当前时间的屏蔽配置
+        """
+        started_count = bisect.bisect_right(self.begin_times, timestamp)
+        return {position for _, end_time, position in self.time_ranges[:started_count] if end_time >= timestamp}
+
+    def get_candidate_positions(self, dimension):
+        """
+        获取维度命中索引的屏蔽配置
+        """
+        positions = set(self.unindexed_positions)
+        for cond_field, value_index in self.index.values():
+            is_exists, data_value = cond_field.get_value_from_data(dimension)
+            if not is_exists:
+                continue
+            for value in cond_field.value_to_str_list(data_value):
+                if value in value_index:
+                    positions.update(value_index[value])
+        return positions
+
+    def match(self, alert: AlertDocument):
+        """
+        获取告警命中的屏蔽配置，顺序与屏蔽配置顺序一致
+        """
+        positions = self.get_active_positions(arrow.now().timestamp)
+        if not positions:
+            return []
+
+        dimension = self.shield_objs[0].get_dimension(alert)
+        positions &= self.get_candidate_positions(dimension)
+        return [
+            self.shield_objs[position]
+            for position in sorted(positions)
+            if self.shield_objs[position].is_match(alert, dimension=dimension)
+        ]
+
+
+# 屏蔽配置索引的进程内缓存，按业务缓存，屏蔽缓存每次刷新后重建
+_shield_indexes = VersionedLRUCache("alert_shield_index", version_getter=ShieldCacheManager.get_version, maxsize=1000)
+
+
+def get_shield_index(bk_biz_id) -> AlertShieldIndex:
+    _shield_indexes.check_version()
+    shield_index = _shield_indexes.get(bk_biz_id)
+    if shield_index is MISSING:
+        shield_index = AlertShieldIndex(ShieldCacheManager.get_shields_by_biz_id(bk_biz_id))
+        _shield_indexes.set(bk_biz_id, shield_index)
+    return shield_index
@@ -437,6 +437,13 @@ class AlertShieldObj(ShieldObj):
                 new_dimensions[key[len(tag_prefix) :]] = value
         return new_dimensions
 
-    def is_match(self, alert: AlertDocument):
+    def is_match(self, alert: AlertDocument, dimension=None):
+        """
+        :param dimension: 已获取的告警维度，批量匹配多个屏蔽配置时避免重复获取
+        """
         source_time = arrow.now()
-        return self.time_check.is_match(source_time) and self.dimension_check.is_match(self.get_dimension(alert))
+        if not self.time_check.is_match(source_time):
+            return False
+        if dimension is None:
+            dimension = self.get_dimension(alert)
+        return self.dimension_check.is_match(dimension)
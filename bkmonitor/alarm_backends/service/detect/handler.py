@@ -13,6 +13,7 @@ specific language governing permissions and limitations under the License.
 import logging
 
 from alarm_backends.core.cache import key
+from alarm_backends.core.control.partition import parse_detect_signal
 from alarm_backends.core.handlers import base
 from alarm_backends.service.detect.tasks import run_detect
 
@@ -32,7 +33,7 @@ class DetectHandler(base.BaseHandler):
             logger.debug("未拉取到待处理的策略项")
             return
 
-        run_detect(ret[1])
+        run_detect(*parse_detect_signal(ret[1]))
 
 
 class DetectCeleryHandler(DetectHandler):
@@ -40,6 +41,7 @@ class DetectCeleryHandler(DetectHandler):
     max_input_count = 100
 
     def handle(self):
+        # 信号为策略ID，分区策略的信号为 策略ID|分区号
         strategy_ids = set()
         while len(strategy_ids) <= self.max_input_count:
             strategy_id = self.client.rpop(self.data_signal_key)
@@ -61,6 +63,6 @@ class DetectCeleryHandler(DetectHandler):
             break
 
         for strategy_id in strategy_ids:
-            run_detect.apply_async(args=(strategy_id,))
+            run_detect.apply_async(args=parse_detect_signal(strategy_id))
 
         logger.info("[detect] published {} strategy_ids: {}".format(len(strategy_ids), strategy_ids))
@@ -12,24 +12,34 @@ specific language governing permissions and limitations under the License.
 import json
 import logging
 import time
+from contextlib import ExitStack, contextmanager
 
 from django.conf import settings
+from django.utils.functional import cached_property
 
 from alarm_backends.core.cache import key
+from alarm_backends.core.control.partition import (
+    get_partition_count,
+    get_recorded_partition_count,
+)
 from alarm_backends.core.control.strategy import Strategy
 from alarm_backends.core.i18n import i18n
 from alarm_backends.core.lock.service_lock import service_lock
 from alarm_backends.core.processor.base import BaseAbnormalPushProcessor
+from alarm_backends.core.record_batch import RecordBatch, is_record_batch
 from alarm_backends.service.detect import DataPoint
+from core.errors.alarm_backends import LockError
 from core.prometheus import metrics
 
 logger = logging.getLogger("detect")
 
 
 class DetectProcess(BaseAbnormalPushProcessor):
-    def __init__(self, strategy_id: str):
+    def __init__(self, strategy_id: str, partition: int = None):
         # note: 这里有个坑，进来的策略id是字符串
         self.strategy_id = strategy_id
+        # 分区号，为None时处理非分区队列
+        self.partition = partition
         self.inputs = {}
         self.outputs = {}
         self.strategy = Strategy(strategy_id)
@@ -57,50 +67,134 @@ class DetectProcess(BaseAbnormalPushProcessor):
             self.inputs[item.id].extend(inputs)
             return
         # pull data
-        data_channel = key.DATA_LIST_KEY.get_key(strategy_id=self.strategy_id, item_id=item.id)
-        client = key.DATA_LIST_KEY.client
-
-        total_points = client.llen(data_channel)
         assert settings.SQL_MAX_LIMIT > 0, "SQL_MAX_LIMIT should bigger than zero"
-        offset = min([total_points, settings.SQL_MAX_LIMIT])
-        if offset == 0:
+        for client, data_channel in self.get_data_channels(item):
+            self.pull_channel_data(item, client, data_channel)
+
+        if not self.inputs[item.id]:
             logger.info("[detect] strategy({}) item({}) 暂无待检测数据".format(self.strategy_id, item.id))
             return
-        if offset == settings.SQL_MAX_LIMIT:
-            self.is_busy = True
-            logger.error(
-                "[detect] strategy({}) item({}) 待检测数据量达到配置值"
-                "(SQL_MAX_LIMIT){}，部分数据可能存在处理延时".format(self.strategy_id, item.id, settings.SQL_MAX_LIMIT)
+
+        # 上报detect拉取数据量
+        metrics.DETECT_PROCESS_DATA_COUNT.labels(strategy_id=metrics.TOTAL_TAG, type="pull").inc(
+            len(self.inputs[item.id])
+        )
+        logger.info(
+            "[detect] strategy({}) item({}) 拉取数据({})条".format(self.strategy_id, item.id, len(self.inputs[item.id]))
+        )
+
+    @cached_property
+    def max_partition_count(self) -> int:
+        """
+        策略当前配置的分区数与 access 最近写入时记录的分区数中的较大值
+        """
+        return max(get_partition_count(self.strategy_id), get_recorded_partition_count(self.strategy_id))
+
+    def get_data_channels(self, item):
+        """
+        获取待拉取的数据队列
+        分区处理只拉取对应的分区队列；非分区处理拉取非分区队列，
+        并一并拉取关闭或缩减分区前遗留在已停用分区队列中的数据
+        :return: [(client, data_channel), …]
+        """
+        if self.partition is not None:
+            data_channel = key.DATA_LIST_PARTITION_KEY.get_key(
+                strategy_id=self.strategy_id, item_id=item.id, partition=self.partition
             )
+            return [(key.DATA_LIST_PARTITION_KEY.client, data_channel)]
 
-        records = client.lrange(data_channel, -offset, -1)
+        channels = [
+            (key.DATA_LIST_KEY.client, key.DATA_LIST_KEY.get_key(strategy_id=self.strategy_id, item_id=item.id))
+        ]
+        # 仍在使用的分区由分区处理负责，未分区时全部分区均已停用
+        partition_count = get_partition_count(self.strategy_id)
+        start_partition = partition_count if partition_count > 1 else 0
+        for partition in range(start_partition, self.max_partition_count):
+            data_channel = key.DATA_LIST_PARTITION_KEY.get_key(
+                strategy_id=self.strategy_id, item_id=item.id, partition=partition
+            )
+            channels.append((key.DATA_LIST_PARTITION_KEY.client, data_channel))
+        return channels
 
-        # 上报detect拉取数据量
-        metrics.DETECT_PROCESS_DATA_COUNT.labels(strategy_id=metrics.TOTAL_TAG, type="pull").inc(len(records))
+    def pull_channel_data(self, item, client, data_channel):
+        """
+        从单个数据队列拉取待检测数据，单次检测的总记录数不超过 SQL_MAX_LIMIT
+        """
+        total_points = client.llen(data_channel)
+        if total_points == 0:
+            return
 
+        # 队列中可能同时存在逐条 json 格式和列式数据块格式，一个数据块包含多条记录
+        # 按记录数而非队列元素数限制单次拉取量：从队尾分页读取，每页读取后立即删除，
+        # 页大小按已读取元素的平均记录数估算，首页只读取一个元素
         unexpected_record_count = 0
         last_unexpected_record = None
-        if records:
-            client.ltrim(data_channel, 0, -offset - 1)
+        pulled_count = 0
+        page_size = 1
+        while pulled_count < total_points:
+            remaining = settings.SQL_MAX_LIMIT - len(self.inputs[item.id])
+            if remaining <= 0:
+                break
+            page_size = max(min(page_size, remaining, total_points - pulled_count), 1)
+            records = client.lrange(data_channel, -page_size, -1)
+            if not records:
+                break
+            client.ltrim(data_channel, 0, -len(records) - 1)
+            pulled_count += len(records)
+
             # 队列左进右出，lrange 取出时需要做一次倒序才能保证先进先出
             for record in reversed(records):
-                try:
-                    data_point = DataPoint(json.loads(record), item)
-                    # fill data point into inputs list
-                    self.inputs[item.id].append(data_point)
-                except ValueError:
-                    unexpected_record_count += 1
+                lost_count = self.load_data_points(item, record)
+                if lost_count:
+                    unexpected_record_count += lost_count
                     last_unexpected_record = record
-            if unexpected_record_count > 0:
-                logger.error(
-                    "[detect] strategy({}) item({}) 发现非期望格式的待检测数据{}条,"
-                    " 其中之一: {}".format(self.strategy_id, item.id, unexpected_record_count, last_unexpected_record)
-                )
 
-            logger.info(
-                "[detect] strategy({}) item({}) 拉取数据({})条".format(self.strategy_id, item.id, len(self.inputs[item.id]))
+            records_per_entry = max(len(self.inputs[item.id]) / pulled_count, 1)
+            page_size = int((settings.SQL_MAX_LIMIT - len(self.inputs[item.id])) / records_per_entry)
+
+        if pulled_count < total_points:
+            self.is_busy = True
+            logger.error(
+                "[detect] strategy({}) item({}) 待检测数据量达到配置值"
+                "(SQL_MAX_LIMIT){}，部分数据可能存在处理延时".format(self.strategy_id, item.id, settings.SQL_MAX_LIMIT)
             )
 
+        if unexpected_record_count > 0:
+            logger.error(
+                "[detect] strategy({}) item({}) 发现非期望格式的待检测数据{}条,"
+                " 其中之一: {}".format(self.strategy_id, item.id, unexpected_record_count, last_unexpected_record)
+            )
+
+    def load_data_points(self, item, record: str) -> int:
+        """
+        解析队列中的单个元素并追加到待检测数据中，逐条记录捕获异常
+        :return: 解析失败而丢弃的记录数
+        """
+        try:
+            if is_record_batch(record):
+                batch = RecordBatch(record)
+                total = len(batch)
+            else:
+                batch = [json.loads(record)]
+                total = 1
+        except Exception:
+            # 无法解码时无法得知其中的记录数，按一条计
+            return 1
+
+        loaded_count = 0
+        lost_count = 0
+        try:
+            for data in batch:
+                try:
+                    self.inputs[item.id].append(DataPoint(data, item))
+                    loaded_count += 1
+                except Exception:
+                    lost_count += 1
+        except Exception:
+            # 数据块中途解码失败，剩余记录全部丢弃
+            lost_count = max(total - loaded_count, lost_count)
+        return lost_count
+
     def handle_data(self, item):
         # detect data
         data_points = self.inputs[item.id]
@@ -160,8 +254,33 @@ class DetectProcess(BaseAbnormalPushProcessor):
         logger.info("[detect] strategy({}) item({}) 开始异常二次确认流程".format(self.strategy_id, item.id))
         item.double_check(outputs=self.outputs[item.id])
 
+    @contextmanager
+    def get_lock(self):
+        """
+        同一策略的非分区处理与分区处理互斥，不同分区之间可并行处理
+        非分区处理: 持有策略锁，并持有全部分区锁
+        分区处理: 持有分区锁，若策略锁已被非分区处理持有则放弃本次处理
+        """
+        with ExitStack() as stack:
+            if self.partition is None:
+                stack.enter_context(service_lock(key.SERVICE_LOCK_DETECT, strategy_id=self.strategy_id))
+                partitions = range(self.max_partition_count)
+            else:
+                partitions = [self.partition]
+
+            for partition in partitions:
+                stack.enter_context(
+                    service_lock(key.SERVICE_LOCK_DETECT_PARTITION, strategy_id=self.strategy_id, partition=partition)
+                )
+
+            if self.partition is not None:
+                strategy_lock_key = key.SERVICE_LOCK_DETECT.get_key(strategy_id=self.strategy_id)
+                if key.SERVICE_LOCK_DETECT.client.exists(strategy_lock_key):
+                    raise LockError(msg="{} is already locked".format(strategy_lock_key))
+            yield
+
     def process(self):
-        with service_lock(key.SERVICE_LOCK_DETECT, strategy_id=self.strategy_id):
+        with self.get_lock():
             start_at = time.time()
             logger.info(f"[detect][latency] strategy({self.strategy_id}) processing start")
             self.strategy.gen_strategy_snapshot()
@@ -14,6 +14,8 @@ import functools
 import inspect
 import json
 import logging
+import time
+from collections import defaultdict
 
 from django.conf import settings
 from django.template import Context, Template
@@ -21,6 +23,7 @@ from django.utils.translation import ugettext as _
 from six.moves import range
 
 from alarm_backends.core.cache import key
+from alarm_backends.core.cache.local import MISSING, SizedLRUCache
 from alarm_backends.service.access.data.records import DataRecord
 from alarm_backends.service.detect import AnomalyDataPoint, DataPoint
 from alarm_backends.templatetags.unit import unit_auto_convert, unit_convert_min
@@ -29,6 +32,7 @@ from core.errors.alarm_backends.detect import (
     InvalidAlgorithmsConfig,
     InvalidDataPoint,
 )
+from core.prometheus import metrics
 from core.unit import load_unit
 
 logger = logging.getLogger("detect")
@@ -39,6 +43,32 @@ class DetectContext(dict):
         return self.__getitem__(item)
 
 
+def as_number(value):
+    """
+    批量预筛选时，仅对数值类型做比较，其余类型返回None
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return value
+
+
+def candidate_tolerance(left, right):
+    """
+    批量预筛选的比较容差，需覆盖单位换算的舍入(POINT_PRECISION)及浮点运算误差，保证预筛选结果是精确结果的超集
+    """
+    return 10 ** -settings.POINT_PRECISION + 1e-9 * max(abs(left), abs(right))
+
+
+# 批量预筛选的比较方法，在精确比较的基础上放宽容差。不支持的比较方法(如 !=)不做预筛选
+CANDIDATE_COMPARATORS = {
+    ">": lambda left, right, tolerance: left > right - tolerance,
+    ">=": lambda left, right, tolerance: left >= right - tolerance,
+    "<": lambda left, right, tolerance: left < right + tolerance,
+    "<=": lambda left, right, tolerance: left <= right + tolerance,
+    "==": lambda left, right, tolerance: abs(left - right) <= tolerance,
+}
+
+
 class Algorithms(object):
     """
     检测算法基类，定义一个算法对象。
@@ -131,7 +161,7 @@ class Algorithms(object):
         if isinstance(data_points, DataPoint):
             data_points = [data_points]
         anomaly_points = []
-        for data_point in data_points:
+        for data_point in self.filter_candidates(data_points):
             try:
                 check_result = self.detect(data_point)
             except Exception:
@@ -147,6 +177,13 @@ class Algorithms(object):
 
         return anomaly_points
 
+    def filter_candidates(self, data_points):
+        """
+        批量预筛选可能异常的数据点，只有候选数据点才会走表达式检测
+        默认不做筛选
+        """
+        return data_points
+
     def anomaly_message_template_tuple(self, data_point):
         """
         异常描述模板，
@@ -289,6 +326,66 @@ class BasicAlgorithmsCollection(Algorithms):
         )
         return context
 
+    def candidate_mask(self, values, data_points, unit):
+        """
+        批量预筛选，基于同一单位的一批数据点的值计算每个点是否可能异常
+        仅适用于无需额外查询即可判断的算法(如静态阈值)，避免预筛选与表达式检测重复获取数据
+        :param values: 经过单位换算的数据点值列表，非数值类型为None
+        :param data_points: 数据点列表
+        :param unit: 数据点单位
+        :return: 与 data_points 等长的布尔列表，返回 None 表示不支持预筛选
+        """
+        return None
+
+    def filter_candidates(self, data_points):
+        """
+        内置算法支持批量预筛选：先对整批数据做数值比较，再仅对候选点执行表达式检测并生成异常点
+        自定义表达式或不支持预筛选的算法，仍全部走表达式检测
+        """
+        if not settings.ENABLE_DETECT_BATCH_PREFILTER or len(data_points) <= 1:
+            return data_points
+
+        # 数据点按各自的单位分组，并与表达式检测使用相同的换算方法(含舍入)
+        unit_indexes = defaultdict(list)
+        for index, data_point in enumerate(data_points):
+            unit_indexes[data_point.unit].append(index)
+
+        mask = [True] * len(data_points)
+        try:
+            for unit, indexes in unit_indexes.items():
+                values = []
+                for index in indexes:
+                    value = as_number(data_points[index].value)
+                    values.append(None if value is None else unit_convert_min(value, unit))
+                unit_mask = self.candidate_mask(values, [data_points[index] for index in indexes], unit)
+                if unit_mask is None:
+                    return data_points
+                for index, is_candidate in zip(indexes, unit_mask):
+                    mask[index] = is_candidate
+        except Exception as e:
+            logger.exception("[detect] batch prefilter error, fallback to expression detect: %s", e)
+            return data_points
+
+        return [
+            data_point
+            for data_point, is_candidate in zip(data_points, mask)
+            if is_candidate or hasattr(data_point, "__debug__")
+        ]
+
+
+_history_local_cache = None
+
+
+def get_history_local_cache():
+    """
+    进程内共享的历史数据缓存，同一worker中的不同策略共用，按占用字节数淘汰
+    value: (过期时间, {dimensions_md5: raw_data})
+    """
+    global _history_local_cache
+    if _history_local_cache is None:
+        _history_local_cache = SizedLRUCache("history_point", maxbytes=settings.DETECT_HISTORY_LOCAL_CACHE_BYTES)
+    return _history_local_cache
+
 
 class HistoryPointFetcher(object):
     def set_default(self, value: int):
@@ -315,17 +412,14 @@ class HistoryPointFetcher(object):
                 sorted_data_points[0].timestamp - end,
                 sorted_data_points[-1].timestamp - start + item.query_configs[0]["agg_interval"],
             )
+            history_timestamps = list(range(from_timestamp, until_timestamp, item.query_configs[0]["agg_interval"]))
 
-            accessed = None
-            for history_timestamp in range(from_timestamp, until_timestamp, item.query_configs[0]["agg_interval"]):
-                if accessed is None:
-                    accessed = True
-                accessed = accessed and self._check_history_points(item, history_timestamp)
-
-            if accessed:
+            if self._check_history_points(item, history_timestamps):
                 # 历史时刻的数据都已经查过
+                self._prefetch_history_points(item, history_timestamps)
                 continue
 
+            metrics.DETECT_HISTORY_POINT_COUNT.labels(strategy_id=metrics.TOTAL_TAG, source="query").inc()
             item_records = item.query_record(from_timestamp, until_timestamp)
             for record in item_records:
                 point = DataRecord(item, record)
@@ -333,53 +427,129 @@ class HistoryPointFetcher(object):
                     records.append(adapter_data_access_2_detect(point, item))
 
             self._local_history_storage = {}
-            self._publish_history_points(item, records)
+            published_points = self._publish_history_points(item, records)
+            # 查询结果即为该时间范围的完整数据，直接使用，无需再从redis读取
+            for history_timestamp in history_timestamps:
+                history_key = self._get_history_key(item, history_timestamp)
+                data = published_points.get(history_timestamp, {})
+                self._local_history_storage[history_key] = data
+                if data:
+                    self._set_shared_history_data(history_key, history_timestamp, data)
+
+    def _get_history_key(self, item, history_timestamp):
+        return key.HISTORY_DATA_KEY.get_key(strategy_id=item.strategy.id, item_id=item.id, timestamp=history_timestamp)
 
-    def _check_history_points(self, item, history_timestamp):
+    def _get_shared_history_data(self, history_key, history_timestamp):
         """
-        检查历史时刻的数据是否已经拉取过，如果存在，则更新过期时间。
+        从进程内共享缓存获取历史数据
+        近期的历史数据可能仍有新数据写入，不使用共享缓存
         """
-        client = key.HISTORY_DATA_KEY.client
-        history_key = key.HISTORY_DATA_KEY.get_key(
-            strategy_id=item.strategy.id, item_id=item.id, timestamp=history_timestamp
+        if history_timestamp > time.time() - settings.DETECT_HISTORY_LOCAL_CACHE_MIN_AGE:
+            return MISSING
+
+        cached = get_history_local_cache().get(history_key)
+        if cached is MISSING or cached[0] < time.time():
+            return MISSING
+        return cached[1]
+
+    def _set_shared_history_data(self, history_key, history_timestamp, data):
+        if history_timestamp > time.time() - settings.DETECT_HISTORY_LOCAL_CACHE_MIN_AGE:
+            return
+        # 按原始字符串长度估算占用
+        size = len(history_key) + sum(len(field) + len(value) for field, value in data.items())
+        get_history_local_cache().set(
+            history_key, (time.time() + settings.DETECT_HISTORY_LOCAL_CACHE_TTL, data), size=size
         )
-        return client.exists(history_key)
+
+    def _check_history_points(self, item, history_timestamps):
+        """
+        检查历史时刻的数据是否都已经拉取过，进程内已缓存的时刻无需检查，其余时刻批量检查
+        """
+        if not history_timestamps:
+            return False
+
+        history_keys = []
+        for history_timestamp in history_timestamps:
+            history_key = self._get_history_key(item, history_timestamp)
+            if self._get_shared_history_data(history_key, history_timestamp) is MISSING:
+                history_keys.append(history_key)
+
+        if not history_keys:
+            return True
+
+        pipeline = key.HISTORY_DATA_KEY.client.pipeline(transaction=False)
+        for history_key in history_keys:
+            pipeline.exists(history_key)
+        return all(pipeline.execute())
+
+    def _prefetch_history_points(self, item, history_timestamps):
+        """
+        批量加载历史时刻的数据到本地
+        """
+        if not getattr(self, "_local_history_storage", None):
+            self._local_history_storage = {}
+
+        missing = []
+        for history_timestamp in history_timestamps:
+            history_key = self._get_history_key(item, history_timestamp)
+            if history_key in self._local_history_storage:
+                continue
+
+            data = self._get_shared_history_data(history_key, history_timestamp)
+            if data is MISSING:
+                missing.append((history_key, history_timestamp))
+            else:
+                self._local_history_storage[history_key] = data
+                metrics.DETECT_HISTORY_POINT_COUNT.labels(strategy_id=metrics.TOTAL_TAG, source="local").inc()
+
+        if not missing:
+            return
+
+        pipeline = key.HISTORY_DATA_KEY.client.pipeline(transaction=False)
+        for history_key, _ in missing:
+            pipeline.hgetall(history_key)
+        for (history_key, history_timestamp), data in zip(missing, pipeline.execute()):
+            self._local_history_storage[history_key] = data
+            self._set_shared_history_data(history_key, history_timestamp, data)
+        metrics.DETECT_HISTORY_POINT_COUNT.labels(strategy_id=metrics.TOTAL_TAG, source="redis").inc(len(missing))
 
     def _publish_history_points(self, item, history_points):
         """
         发布历史时刻的数据
+        :return: {timestamp: {dimensions_md5: raw_data}}
         """
         if not history_points:
-            return
+            return {}
         pipeline = key.HISTORY_DATA_KEY.client.pipeline(transaction=False)
-        history_key_maker = functools.partial(
-            key.HISTORY_DATA_KEY.get_key, strategy_id=item.strategy.id, item_id=item.id
-        )
+        history_key_maker = functools.partial(self._get_history_key, item)
         # bulk cache json data
         history_points_map = {}
         for point in history_points:
             points_with_timestamp_map = history_points_map.setdefault(point.timestamp, {})
-            points_with_timestamp_map[point.record_id.split(".")[0]] = json.dumps(point.as_dict())
+            points_with_timestamp_map[point.record_id.split(".")[0]] = json.dumps(
+                point.as_dict(), separators=(",", ":")
+            )
 
+        local_cache = get_history_local_cache()
         for timestamp, _points_with_timestamp_map in history_points_map.items():
-            history_key = history_key_maker(timestamp=timestamp)
+            history_key = history_key_maker(timestamp)
             pipeline.hmset(history_key, _points_with_timestamp_map)
             pipeline.expire(history_key, key.HISTORY_DATA_KEY.ttl)
+            # 数据有更新，进程内缓存失效
+            local_cache.delete(history_key)
         pipeline.execute()
+        return history_points_map
 
     def fetch_history_point(self, item, point, history_timestamp):
         """
         获取当前数据点对应的历史数据点
         """
-        client = key.HISTORY_DATA_KEY.client
-        history_key = key.HISTORY_DATA_KEY.get_key(
-            strategy_id=item.strategy.id, item_id=item.id, timestamp=history_timestamp
-        )
+        history_key = self._get_history_key(item, history_timestamp)
         if not getattr(self, "_local_history_storage", None):
             self._local_history_storage = {}
 
         if history_key not in self._local_history_storage:
-            self._local_history_storage[history_key] = client.hgetall(history_key)
+            self._prefetch_history_points(item, [history_timestamp])
 
         raw_data = self._local_history_storage[history_key].get(point.record_id.split(".")[0])
         if not raw_data:
@@ -19,7 +19,13 @@ import logging
 from django.utils.safestring import mark_safe
 from six.moves import zip
 
-from alarm_backends.service.detect.strategy import BasicAlgorithmsCollection, ExprDetectAlgorithms
+from alarm_backends.service.detect.strategy import (
+    CANDIDATE_COMPARATORS,
+    BasicAlgorithmsCollection,
+    ExprDetectAlgorithms,
+    candidate_tolerance,
+)
+from alarm_backends.templatetags.unit import unit_convert_min
 from bkmonitor.strategy.serializers import ThresholdSerializer, allowed_threshold_method
 from core.errors.alarm_backends.detect import InvalidThresholdConfig
 
@@ -61,6 +67,28 @@ class AndThreshold(BasicAlgorithmsCollection):
         for args in zip(expr_list, tpl_list):
             yield ExprDetectAlgorithms(*args)
 
+    def candidate_mask(self, values, data_points, unit):
+        if type(self).gen_expr is not AndThreshold.gen_expr:
+            return None
+
+        comparisons = []
+        for t_config in self.validated_config:
+            comparator = CANDIDATE_COMPARATORS.get(allowed_threshold_method[t_config["method"]])
+            if comparator is None:
+                return None
+            comparisons.append((comparator, unit_convert_min(t_config["threshold"], unit, self.unit)))
+
+        mask = []
+        for value in values:
+            if value is None:
+                # 非数值类型交给表达式检测
+                mask.append(True)
+                continue
+            mask.append(
+                all(comparator(value, bound, candidate_tolerance(value, bound)) for comparator, bound in comparisons)
+            )
+        return mask
+
 
 class Threshold(AndThreshold):
     config_serializer = ThresholdSerializer
@@ -69,3 +97,15 @@ class Threshold(AndThreshold):
     def gen_expr(self):
         for t_config in self.validated_config:
             yield AndThreshold(t_config, self.unit)
+
+    def candidate_mask(self, values, data_points, unit):
+        if type(self).gen_expr is not Threshold.gen_expr:
+            return None
+
+        mask = [False] * len(values)
+        for detector in self.detectors:
+            detector_mask = detector.candidate_mask(values, data_points, unit)
+            if detector_mask is None:
+                return None
+            mask = [current or candidate for current, candidate in zip(mask, detector_mask)]
+        return mask
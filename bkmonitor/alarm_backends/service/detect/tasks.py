@@ -14,6 +14,7 @@ import logging
 from celery.task import task
 
 from alarm_backends.core.cache import key
+from alarm_backends.core.control.partition import make_detect_signal
 from alarm_backends.service.detect.process import DetectProcess
 from core.errors.alarm_backends import LockError
 from core.prometheus import metrics
@@ -22,24 +23,24 @@ logger = logging.getLogger("detect")
 
 
 @task(ignore_result=True, queue="celery_service")
-def run_detect(strategy_id):
+def run_detect(strategy_id, partition=None):
     client = key.DATA_SIGNAL_KEY.client
     data_signal_key = key.DATA_SIGNAL_KEY.get_key()
     exc = None
     try:
-        processor = DetectProcess(strategy_id)
+        processor = DetectProcess(strategy_id, partition=partition)
         processor.process()
     except LockError:
-        logger.info("Failed to acquire lock. on strategy({})".format(strategy_id))
-        client.delay("lpush", data_signal_key, strategy_id, delay=20)
+        logger.info("Failed to acquire lock. on strategy({}) partition({})".format(strategy_id, partition))
+        client.delay("lpush", data_signal_key, make_detect_signal(strategy_id, partition), delay=20)
     except Exception as e:
         exc = e
         logger.exception("Process strategy({strategy_id}) exception, " "{msg}".format(strategy_id=strategy_id, msg=e))
     else:
         # 当前策略待检测数据过多
         if processor.is_busy:
-            run_detect.apply_async(args=(strategy_id,))
-            logger.info(f"detect processor is busy with strategy({strategy_id})")
+            run_detect.apply_async(args=(strategy_id, partition))
+            logger.info(f"detect processor is busy with strategy({strategy_id}) partition({partition})")
 
     metrics.DETECT_PROCESS_COUNT.labels(
         strategy_id=metrics.TOTAL_TAG, status=metrics.StatusEnum.from_exc(exc), exception=exc
@@ -14,10 +14,12 @@ from collections import defaultdict
 from typing import List
 
 from alarm_backends.core.cache.assign import AssignCacheManager
+from alarm_backends.core.cache.local import MISSING, VersionedLRUCache
 from alarm_backends.core.context import ActionContext
 from alarm_backends.service.fta_action import AlertAssignee
 from bkmonitor.action.alert_assign import (
     AlertAssignMatchManager,
+    AssignRuleIndex,
     AssignRuleMatch,
     UpgradeRuleMatch,
 )
@@ -26,6 +28,18 @@ from constants.action import ActionNoticeType, AssignMode, UserGroupType
 
 logger = logging.getLogger("fta_action.run")
 
+# 分派规则索引的进程内缓存，按 (业务ID, 优先级) 缓存，分派缓存刷新导致版本变化时重建
+_assign_rule_indexes = VersionedLRUCache("assign_rule_index", version_getter=AssignCacheManager.get_version)
+
+
+def get_assign_rule_index(bk_biz_id, priority, rules) -> AssignRuleIndex:
+    _assign_rule_indexes.check_version()
+    rule_index = _assign_rule_indexes.get((bk_biz_id, priority))
+    if rule_index is MISSING:
+        rule_index = AssignRuleIndex(rules)
+        _assign_rule_indexes.set((bk_biz_id, priority), rule_index)
+    return rule_index
+
 
 class BackendAssignMatchManager(AlertAssignMatchManager):
     """
@@ -66,8 +80,14 @@ class BackendAssignMatchManager(AlertAssignMatchManager):
             group_rules = []
             for group_id in groups:
                 group_rules.extend(AssignCacheManager.get_assign_rules_by_group(self.bk_biz_id, group_id))
+            rule_index = get_assign_rule_index(self.bk_biz_id, priority_id, group_rules)
+            candidates = rule_index.get_candidates(self.dimensions)
             for rule in group_rules:
-                rule_match_obj = AssignRuleMatch(rule, self.rule_snaps.get(str(rule["id"])), self.alert)
+                rule_snap = self.rule_snaps.get(str(rule["id"]))
+                # 有快照的规则在未变化时直接适配，不能通过索引过滤
+                if not rule_snap and not rule_index.is_candidate(rule, candidates):
+                    continue
+                rule_match_obj = AssignRuleMatch(rule, rule_snap, self.alert)
                 if rule_match_obj.is_matched(dimensions=self.dimensions):
                     matched_rules.append(rule_match_obj)
             if matched_rules:
@@ -14,6 +14,7 @@ import json
 import logging
 
 import arrow
+from django.conf import settings
 
 from alarm_backends.constants import LATEST_NO_DATA_CHECK_POINT
 from alarm_backends.core.cache import key
@@ -58,12 +59,43 @@ class CheckProcessor(BaseAbnormalPushProcessor):
             # for debug
             self.inputs[item.id].extend(inputs)
             return
-        # pull data
+
+        if not settings.ENABLE_NODATA_PRESENCE_INDEX:
+            self.pull_queue_data(item, check_timestamp)
+            return
+
+        # 先消费维度索引中不晚于检测点的周期
+        self.pull_presence_data(item, check_timestamp, "-inf", check_timestamp)
+        # 启用维度存在索引后，仍需消费切换前遗留在队列中的数据
+        self.pull_queue_data(item, check_timestamp)
+
+        data_points = self.inputs[item.id]
+        if not data_points:
+            # 如果当前监测点之前无数据，但是未来有数据，那么取未来最早一个周期的数据
+            self.pull_presence_data(item, check_timestamp, "({}".format(check_timestamp), "+inf", num=1)
+        elif data_points[0].timestamp > check_timestamp:
+            # 队列中取到的是未来周期的数据，维度索引只合并同一周期的数据，避免混合不同周期
+            future_timestamp = data_points[0].timestamp
+            self.pull_presence_data(item, check_timestamp, future_timestamp, future_timestamp)
+
+        if not self.inputs[item.id]:
+            logger.info(
+                "[nodata] strategy({}) item({}) check_timestamp({}) 无待检测数据，可能触发无数据告警".format(
+                    self.strategy_id, item.id, check_timestamp
+                )
+            )
+
+    def pull_queue_data(self, item, check_timestamp):
+        """
+        从待检测数据队列拉取数据
+        """
         data_channel = key.NO_DATA_LIST_KEY.get_key(strategy_id=self.strategy_id, item_id=item.id)
         client = key.NO_DATA_LIST_KEY.client
 
         total_points = client.llen(data_channel)
         if total_points == 0:
+            if self.inputs[item.id] or settings.ENABLE_NODATA_PRESENCE_INDEX:
+                return
             logger.info(
                 "[nodata] strategy({}) item({}) check_timestamp({}) 无待检测数据，可能触发无数据告警".format(
                     self.strategy_id, item.id, check_timestamp
@@ -115,6 +147,7 @@ class CheckProcessor(BaseAbnormalPushProcessor):
                         earliest_future_records_idx.append(index + 1)
 
                 self.inputs[item.id] = earliest_future_points
+                earliest_future_records_idx = set(earliest_future_records_idx)
                 future_records = [
                     record for index, record in enumerate(future_records) if index not in earliest_future_records_idx
                 ]
@@ -147,6 +180,69 @@ class CheckProcessor(BaseAbnormalPushProcessor):
                 )
             )
 
+    def pull_presence_data(self, item, check_timestamp, min_timestamp, max_timestamp, num=None):
+        """
+        从维度存在索引拉取指定周期范围内的待检测维度
+        :param min_timestamp: 周期范围下限，格式同 zrangebyscore
+        :param max_timestamp: 周期范围上限，格式同 zrangebyscore
+        :param num: 最多拉取的周期数，为空时拉取范围内所有周期
+        """
+        periods_key = key.NO_DATA_PRESENCE_PERIODS_KEY.get_key(strategy_id=self.strategy_id, item_id=item.id)
+        client = key.NO_DATA_PRESENCE_PERIODS_KEY.client
+
+        if num is None:
+            periods = client.zrangebyscore(periods_key, min_timestamp, max_timestamp, withscores=True)
+        else:
+            periods = client.zrangebyscore(periods_key, min_timestamp, max_timestamp, start=0, num=num, withscores=True)
+        if not periods:
+            return
+
+        # 读取维度集合与删除在同一事务中完成，避免丢失期间写入的维度
+        pipeline = client.pipeline()
+        timestamps = []
+        for member, score in periods:
+            timestamp = int(score)
+            timestamps.append(timestamp)
+            presence_key = key.NO_DATA_PRESENCE_KEY.get_key(
+                strategy_id=self.strategy_id, item_id=item.id, timestamp=timestamp
+            )
+            pipeline.hgetall(presence_key)
+            pipeline.delete(presence_key)
+        pipeline.zrem(periods_key, *[member for member, _ in periods])
+        results = pipeline.execute()
+
+        unexpected_record_count = 0
+        data_points = []
+        for timestamp, dimensions_map in zip(timestamps, results[0:-1:2]):
+            for dimensions_md5, dimensions in dimensions_map.items():
+                try:
+                    dimensions = json.loads(dimensions)
+                except ValueError:
+                    unexpected_record_count += 1
+                    continue
+                record = {
+                    "record_id": "{}.{}".format(dimensions_md5, timestamp),
+                    "value": None,
+                    "values": {},
+                    "dimensions": dimensions,
+                    "time": timestamp,
+                }
+                data_points.append(DataPoint(record, item))
+
+        self.inputs[item.id].extend(data_points)
+        metrics.NODATA_PROCESS_PULL_DATA_COUNT.labels(strategy_id=metrics.TOTAL_TAG).inc(len(data_points))
+        if unexpected_record_count > 0:
+            logger.error(
+                "[nodata] strategy({}) item({}) check_timestamp({}) 发现非期望格式的维度索引{}条".format(
+                    self.strategy_id, item.id, check_timestamp, unexpected_record_count
+                )
+            )
+        logger.info(
+            "[nodata] strategy({}) item({}) check_timestamp({}) 从维度索引拉取周期{}，维度({})条".format(
+                self.strategy_id, item.id, check_timestamp, timestamps, len(data_points)
+            )
+        )
+
     def handle_data(self, item, check_timestamp):
         # check no data
         data_points = self.inputs[item.id]
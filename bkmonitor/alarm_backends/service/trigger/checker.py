@@ -10,6 +10,7 @@ specific language governing permissions and limitations under the License.
 """
 
 
+import bisect
 import logging
 
 from django.utils.translation import ugettext as _
@@ -19,7 +20,7 @@ from alarm_backends.core.cache.key import CHECK_RESULT_CACHE_KEY
 from alarm_backends.core.control.record_parser import RecordParser
 from alarm_backends.core.control.strategy import Strategy
 from alarm_backends.core.detect_result import ANOMALY_LABEL
-from bkmonitor.models import AnomalyRecord
+from alarm_backends.service.trigger.sink import AnomalyRecordData
 
 logger = logging.getLogger("trigger")
 
@@ -31,21 +32,35 @@ class AnomalyChecker(object):
 
     # 检测窗口单位(默认1min)
     DEFAULT_CHECK_WINDOW_UNIT = 60
+    # 批量预取检测结果时，单个pipeline的最大命令数
+    PREFETCH_PIPELINE_SIZE = 1000
 
-    def __init__(self, point, strategy, item_id):
-        self.item = Strategy.get_item_in_strategy(strategy, item_id)
+    def __init__(self, point, strategy, item_id, check_results_cache=None, snapshot=None):
+        """
+        :param snapshot: 策略快照对象(StrategySnapshot)，传入时复用其预解析的配置，避免逐点重复解析
+        """
         self.strategy = strategy
         self.strategy_id = strategy["id"]
         self.item_id = item_id
         self.point = point
-        if self.is_no_data_point(point):
-            no_data_configs = Strategy.get_no_data_configs(self.item)
-            no_data_level = no_data_configs.pop("level")
-            self.trigger_configs = {str(no_data_level): no_data_configs}
+        if snapshot is not None:
+            self.item = snapshot.get_item(item_id)
+            if self.is_no_data_point(point):
+                no_data_configs = snapshot.get_no_data_configs(item_id)
+                no_data_level = no_data_configs.pop("level")
+                self.trigger_configs = {str(no_data_level): no_data_configs}
+            else:
+                self.trigger_configs = snapshot.trigger_configs
+            self.check_window_unit = snapshot.get_check_window_unit(item_id, self.DEFAULT_CHECK_WINDOW_UNIT)
         else:
-            self.trigger_configs = Strategy.get_trigger_configs(self.strategy)
-
-        self.check_window_unit = Strategy.get_check_window_unit(self.item, self.DEFAULT_CHECK_WINDOW_UNIT)
+            self.item = Strategy.get_item_in_strategy(strategy, item_id)
+            if self.is_no_data_point(point):
+                no_data_configs = Strategy.get_no_data_configs(self.item)
+                no_data_level = no_data_configs.pop("level")
+                self.trigger_configs = {str(no_data_level): no_data_configs}
+            else:
+                self.trigger_configs = Strategy.get_trigger_configs(self.strategy)
+            self.check_window_unit = Strategy.get_check_window_unit(self.item, self.DEFAULT_CHECK_WINDOW_UNIT)
 
         self.anomaly_ids = {
             level: anomaly_info["anomaly_id"] for level, anomaly_info in list(self.point["anomaly"].items())
@@ -54,6 +69,8 @@ class AnomalyChecker(object):
         # shortcut
         self.dimensions_md5 = self.record_parser.dimensions_md5
         self.source_time = self.record_parser.source_time
+        # 批量模式下预取的检测结果，格式: {check_cache_key: (scores, check_results)}，均按score升序排列
+        self.check_results_cache = check_results_cache
 
     @staticmethod
     def is_no_data_point(point):
@@ -122,8 +139,8 @@ class AnomalyChecker(object):
 
     def gen_anomaly_records(self):
         """
-        创建异常记录
-        :rtype: list[AnomalyRecord]
+        创建异常记录(轻量对象，由 sink 按需批量转换写出)
+        :rtype: list[AnomalyRecordData]
         """
         origin_alarm = {
             "data": self.point["data"],
@@ -131,12 +148,11 @@ class AnomalyChecker(object):
         }
         records = []
         for level, anomaly_info in list(self.point["anomaly"].items()):
-            anomaly_record = AnomalyRecord(
+            anomaly_record = AnomalyRecordData(
                 anomaly_id=anomaly_info["anomaly_id"],
                 source_time=self.record_parser.mysql_time,
                 strategy_id=self.strategy_id,
                 origin_alarm=origin_alarm,
-                event_id="",
             )
             records.append(anomaly_record)
         return records
@@ -165,14 +181,14 @@ class AnomalyChecker(object):
                 anomaly_level = level
         return anomaly_level, anomaly_timestamps
 
-    def _check_anomaly_by_level(self, level):
+    def get_trigger_config(self, level):
         """
-        检测某个级别的异常点是否满足触发条件
+        获取某个级别的触发配置
         :param str level: 告警级别
-        :return: 二元组：是否被触发，异常次数
+        :return: 触发配置，不存在时返回 None
         """
         try:
-            trigger_config = self.trigger_configs[level]
+            return self.trigger_configs[level]
         except KeyError:
             trigger_configs = self.trigger_configs.values()
             if not trigger_configs:
@@ -182,11 +198,16 @@ class AnomalyChecker(object):
                         self.strategy_id, self.item_id, level
                     )
                 )
-                return False, []
+                return None
 
             # 默认兜底，trigger 配置当前所有告警级别默认一致
-            trigger_config = list(trigger_configs)[0]
+            return list(trigger_configs)[0]
 
+    def get_check_window(self, level, trigger_config):
+        """
+        获取某个级别的检测窗口
+        :return: 三元组：检测结果缓存key，窗口起始时间，窗口结束时间
+        """
         check_cache_key = CHECK_RESULT_CACHE_KEY.get_key(
             strategy_id=self.strategy_id,
             item_id=self.item_id,
@@ -195,9 +216,81 @@ class AnomalyChecker(object):
         )
         # 在对应的打点队列中取出打点信息。时间范围为source_time前后的一个窗口偏移量
         check_window_offset = trigger_config["check_window_size"] * self.check_window_unit - 1
-        check_results = CHECK_RESULT_CACHE_KEY.client.zrangebyscore(
-            name=check_cache_key, min=self.source_time - check_window_offset, max=self.source_time, withscores=True
+        return check_cache_key, self.source_time - check_window_offset, self.source_time
+
+    def get_check_results(self, check_cache_key, min_score, max_score):
+        """
+        获取检测窗口内的检测结果，优先使用批量预取的结果
+        """
+        if self.check_results_cache is not None and check_cache_key in self.check_results_cache:
+            scores, check_results = self.check_results_cache[check_cache_key]
+            start = bisect.bisect_left(scores, min_score)
+            end = bisect.bisect_right(scores, max_score)
+            return check_results[start:end]
+
+        return CHECK_RESULT_CACHE_KEY.client.zrangebyscore(
+            name=check_cache_key, min=min_score, max=max_score, withscores=True
         )
+
+    @classmethod
+    def prefetch_check_results(cls, checkers):
+        """
+        批量预取检测结果
+        按 CHECK_RESULT_CACHE_KEY 对所有异常点的检测窗口进行合并，每个key只查询一次窗口并集，
+        并通过pipeline批量拉取，后续各个异常点在内存中按窗口截取后计算 trigger_count
+        :param list[AnomalyChecker] checkers: 同一策略监控项下的异常点检测器
+        :return: {check_cache_key: (scores, check_results)}
+        """
+        windows = {}
+        for checker in checkers:
+            for level in checker.point["anomaly"]:
+                trigger_config = checker.get_trigger_config(str(level))
+                if trigger_config is None:
+                    continue
+                check_cache_key, min_score, max_score = checker.get_check_window(str(level), trigger_config)
+                if check_cache_key in windows:
+                    window = windows[check_cache_key]
+                    min_score, max_score = min(window[1], min_score), max(window[2], max_score)
+                    # 保留原始key对象，pipeline需要依赖key上的strategy_id进行路由
+                    check_cache_key = window[0]
+                windows[check_cache_key] = (check_cache_key, min_score, max_score)
+
+        check_results_cache = {}
+        windows = list(windows.values())
+        for index in range(0, len(windows), cls.PREFETCH_PIPELINE_SIZE):
+            chunk = windows[index : index + cls.PREFETCH_PIPELINE_SIZE]
+            pipeline = CHECK_RESULT_CACHE_KEY.client.pipeline(transaction=False)
+            for check_cache_key, min_score, max_score in chunk:
+                pipeline.zrangebyscore(name=check_cache_key, min=min_score, max=max_score, withscores=True)
+            for (check_cache_key, _, _), check_results in zip(chunk, pipeline.execute()):
+                check_results = check_results or []
+                check_results_cache[check_cache_key] = ([score for _, score in check_results], check_results)
+
+        for checker in checkers:
+            checker.check_results_cache = check_results_cache
+        return check_results_cache
+
+    def _check_anomaly_by_level(self, level):
+        """
+        检测某个级别的异常点是否满足触发条件
+        :param str level: 告警级别
+        :return: 二元组：是否被触发，异常次数
+        """
+        trigger_config = self.get_trigger_config(level)
+        if trigger_config is None:
+            return False, []
+
+        check_cache_key, min_score, max_score = self.get_check_window(level, trigger_config)
+        check_results = self.get_check_results(check_cache_key, min_score, max_score)
+        return self.count_anomaly(trigger_config, check_results)
+
+    def count_anomaly(self, trigger_config, check_results):
+        """
+        统计检测窗口内的异常点，判断是否满足触发条件
+        :param trigger_config: 触发配置
+        :param check_results: 检测窗口内的检测结果 [(label, score)]
+        :return: 二元组：是否被触发，异常次数
+        """
         # 统计包含异常标记的key的数量，并与trigger_count进行比较
         anomaly_timestamps = []
         for label, score in check_results:
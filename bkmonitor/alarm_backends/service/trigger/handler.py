@@ -12,10 +12,14 @@ specific language governing permissions and limitations under the License.
 
 import logging
 
+from django.conf import settings
+
 from alarm_backends.core.cache.key import ANOMALY_SIGNAL_KEY, SERVICE_LOCK_TRIGGER
 from alarm_backends.core.handlers import base
 from alarm_backends.core.lock.service_lock import service_lock
 from alarm_backends.service.trigger.processor import TriggerProcessor
+from alarm_backends.service.trigger.scheduler import get_trigger_batch_scheduler
+from alarm_backends.service.trigger.sink import get_anomaly_record_sink
 from core.errors.alarm_backends import LockError
 from core.prometheus import metrics
 
@@ -33,10 +37,29 @@ class TriggerHandler(base.BaseHandler):
             anomaly_key = ANOMALY_SIGNAL_KEY.client.rpop(ANOMALY_SIGNAL_KEY.get_key())
 
         if not anomaly_key:
+            # 空闲时也需要写出缓冲区中超时的异常记录
+            get_anomaly_record_sink().flush_if_due()
             return
         if self.DATA_FETCH_TIMEOUT:
             anomaly_key = anomaly_key[1]
 
+        if not settings.ENABLE_TRIGGER_ADAPTIVE_BATCH:
+            self.handle_signal(anomaly_key)
+            metrics.report_all()
+            return
+
+        # 自适应批量模式下，合并重复信号，并按时间片调度各策略的处理
+        scheduler = get_trigger_batch_scheduler()
+        scheduler.coalesce_signal(anomaly_key)
+        self.handle_signal(anomaly_key, scheduler)
+        metrics.report_all()
+
+    def handle_signal(self, anomaly_key, scheduler=None):
+        """
+        处理单个异常信号
+        :param anomaly_key: 异常信号，格式为 {strategy_id}.{item_id}
+        :param scheduler: 批量调度器，为空时一次性处理完整个队列
+        """
         try:
             strategy_id, item_id = anomaly_key.split(".")
         except Exception as e:
@@ -50,7 +73,10 @@ class TriggerHandler(base.BaseHandler):
             with service_lock(SERVICE_LOCK_TRIGGER, strategy_id=strategy_id, item_id=item_id):
                 with metrics.TRIGGER_PROCESS_TIME.labels(strategy_id=metrics.TOTAL_TAG).time():
                     processor = TriggerProcessor(strategy_id, item_id)
-                    processor.process()
+                    if scheduler is None:
+                        processor.process()
+                    else:
+                        scheduler.run(processor)
         except LockError:
             logger.info(
                 "[get service lock fail] strategy({}), item({}). will process later".format(strategy_id, item_id)
@@ -71,4 +97,3 @@ class TriggerHandler(base.BaseHandler):
         metrics.TRIGGER_PROCESS_COUNT.labels(
             strategy_id=metrics.TOTAL_TAG, status=metrics.StatusEnum.from_exc(exc), exception=exc
         ).inc()
-        metrics.report_all()
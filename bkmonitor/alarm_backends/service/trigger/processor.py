@@ -14,6 +14,7 @@ import logging
 import time
 
 import six.moves.cPickle
+from django.conf import settings
 
 from alarm_backends.core.alert.adapter import MonitorEventAdapter
 from alarm_backends.core.cache.key import (
@@ -23,6 +24,7 @@ from alarm_backends.core.cache.key import (
 )
 from alarm_backends.core.control.strategy import Strategy
 from alarm_backends.service.trigger.checker import AnomalyChecker
+from alarm_backends.service.trigger.sink import get_anomaly_record_sink
 from core.errors.alarm_backends import StrategyNotFound
 from core.prometheus import metrics
 
@@ -44,29 +46,41 @@ class TriggerProcessor(object):
         self._strategy_snapshots = {}
         self.strategy = Strategy(self.strategy_id)
 
-    def get_strategy_snapshot(self, key):
+    def get_snapshot(self, key):
         """
-        获取配置快照
+        获取配置快照对象
+        :rtype: StrategySnapshot
         """
         try:
             # 查询对应的key快照是否存在
             return self._strategy_snapshots[key]
         except KeyError:
-            # 如果查不到内存快照，则查询redis
-            snapshot = Strategy.get_strategy_snapshot_by_key(key, self.strategy_id)
+            # 如果查不到内存快照，则查询进程内共享缓存及redis
+            snapshot = Strategy.get_snapshot(key, self.strategy_id)
             if not snapshot:
                 raise StrategyNotFound({"key": key})
             self._strategy_snapshots[key] = snapshot
             return snapshot
 
-    def pull(self):
-        self.anomaly_points = ANOMALY_LIST_KEY.client.lrange(self.anomaly_list_key, -self.MAX_PROCESS_COUNT, -1)
+    def get_strategy_snapshot(self, key):
+        """
+        获取配置快照(只读)
+        """
+        return self.get_snapshot(key).config
+
+    def pull(self, count=None):
+        """
+        拉取异常点
+        :param count: 本次拉取数量，由调度器指定时不再自行补发信号
+        """
+        max_count = self.MAX_PROCESS_COUNT if count is None else count
+        self.anomaly_points = ANOMALY_LIST_KEY.client.lrange(self.anomaly_list_key, -max_count, -1)
         # 对列表做翻转，按数据从旧到新的顺序处理
         self.anomaly_points.reverse()
         if self.anomaly_points:
             metrics.TRIGGER_PROCESS_PULL_DATA_COUNT.labels(strategy_id=metrics.TOTAL_TAG).inc(len(self.anomaly_points))
             ANOMALY_LIST_KEY.client.ltrim(self.anomaly_list_key, 0, -len(self.anomaly_points) - 1)
-            if len(self.anomaly_points) == self.MAX_PROCESS_COUNT:
+            if count is None and len(self.anomaly_points) == self.MAX_PROCESS_COUNT:
                 # 拉取到的数量若等于最大数量，说明还没拉取完，下次需要再次拉取处理
                 signal_key = "{strategy_id}.{item_id}".format(strategy_id=self.strategy_id, item_id=self.item_id)
                 ANOMALY_SIGNAL_KEY.client.delay("rpush", ANOMALY_SIGNAL_KEY.get_key(), signal_key, delay=1)
@@ -149,16 +163,30 @@ class TriggerProcessor(object):
             )
             metrics.TRIGGER_PROCESS_PUSH_DATA_COUNT.labels(strategy_id=metrics.TOTAL_TAG).inc(len(self.event_records))
 
+        # 异常记录交由 sink 批量写出
+        sink = get_anomaly_record_sink()
+        sink.put(self.anomaly_records)
+        for record in self.event_records:
+            sink.put(record["anomaly_records"])
+        sink.flush_if_due()
+
         self.anomaly_points = []
         self.anomaly_records = []
         self.event_records = []
 
-    def process(self):
-        self.pull()
+    def process(self, count=None):
+        """
+        :param count: 本次拉取处理的异常点数量，默认按 MAX_PROCESS_COUNT
+        :return: 实际拉取的异常点数量
+        """
+        self.pull(count)
+        pulled_count = len(self.anomaly_points)
 
         in_alarm_time, message = self.strategy.in_alarm_time()
         if not in_alarm_time:
             logger.info("[trigger] strategy(%s) not in alarm time: %s, skipped", self.strategy_id, message)
+        elif settings.ENABLE_TRIGGER_BATCH_CHECK:
+            self.process_points_batch(self.anomaly_points)
         else:
             for point in self.anomaly_points:
                 try:
@@ -170,11 +198,54 @@ class TriggerProcessor(object):
                     logger.exception(error_message)
 
         self.push()
+        return pulled_count
 
-    def process_point(self, point):
+    def get_checker(self, point):
         point = json.loads(point)
-        strategy = self.get_strategy_snapshot(point["strategy_snapshot_key"])
-        checker = AnomalyChecker(point, strategy, self.item_id)
+        snapshot = self.get_snapshot(point["strategy_snapshot_key"])
+        return AnomalyChecker(point, snapshot.config, self.item_id, snapshot=snapshot)
+
+    def process_points_batch(self, points):
+        """
+        批量处理异常点
+        先构造所有异常点的检测器，再通过pipeline一次性拉取所有检测窗口，最后逐个在内存中判断是否触发
+        """
+        checkers = []
+        for point in points:
+            try:
+                checkers.append(self.get_checker(point))
+            except Exception as e:
+                error_message = "[process error] strategy({}), item({}) reason: {} \norigin data: {}".format(
+                    self.strategy_id, self.item_id, e, point
+                )
+                logger.exception(error_message)
+
+        if not checkers:
+            return
+
+        try:
+            AnomalyChecker.prefetch_check_results(checkers)
+        except Exception as e:
+            # 预取失败时，各异常点在检测时逐个拉取检测结果
+            logger.exception(
+                "[process error] strategy({}), item({}) prefetch check results failed: {}".format(
+                    self.strategy_id, self.item_id, e
+                )
+            )
+
+        for checker in checkers:
+            try:
+                self.process_checker(checker)
+            except Exception as e:
+                error_message = "[process error] strategy({}), item({}) reason: {} \norigin data: {}".format(
+                    self.strategy_id, self.item_id, e, checker.point
+                )
+                logger.exception(error_message)
+
+    def process_point(self, point):
+        self.process_checker(self.get_checker(point))
+
+    def process_checker(self, checker):
         anomaly_records, event_record = checker.check()
 
         # 暂存结果，最后批量保存
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+
+import logging
+import time
+
+from django.conf import settings
+
+from alarm_backends.core.cache.key import ANOMALY_LIST_KEY, ANOMALY_SIGNAL_KEY
+from alarm_backends.core.cache.local import MISSING, LRUCache
+from core.prometheus import metrics
+
+logger = logging.getLogger("trigger")
+
+
+class TriggerBatchScheduler(object):
+    """
+    trigger 自适应批量调度
+    1. 按队列长度及近期单点处理耗时计算每批次拉取的异常点数量
+    2. 单个策略监控项在一个时间片内循环处理，时间片用尽后将信号放回信号队列队尾，让出给其他策略
+    3. 合并信号队列中与当前信号重复的异常信号
+    """
+
+    # 单点处理耗时的指数平滑系数
+    COST_SMOOTHING = 0.3
+
+    def __init__(self):
+        # 各策略监控项的单点平均处理耗时，格式: {"{strategy_id}.{item_id}": seconds}
+        self._costs = LRUCache("trigger_batch_cost", maxsize=10000)
+
+    @property
+    def time_slice(self) -> float:
+        return settings.TRIGGER_BATCH_TIME_SLICE
+
+    def get_batch_size(self, signal_key: str, queue_length: int) -> int:
+        """
+        计算本批次拉取数量：按时间片内可处理的点数估算，并限制在配置的上下限内
+        """
+        min_size = max(int(settings.TRIGGER_BATCH_MIN_SIZE), 1)
+        max_size = max(int(settings.TRIGGER_BATCH_MAX_SIZE), min_size)
+
+        cost = self._costs.get(signal_key)
+        if cost is MISSING or cost <= 0:
+            batch_size = min_size
+        else:
+            batch_size = int(self.time_slice / cost)
+        batch_size = min(max(batch_size, min_size), max_size)
+        return min(batch_size, queue_length)
+
+    def record(self, signal_key: str, count: int, elapsed: float):
+        """
+        记录本批次处理耗时，更新单点平均处理耗时
+        """
+        if count <= 0:
+            return
+        cost = elapsed / count
+        last_cost = self._costs.get(signal_key)
+        if last_cost is not MISSING:
+            cost = self.COST_SMOOTHING * cost + (1 - self.COST_SMOOTHING) * last_cost
+        self._costs.set(signal_key, cost)
+
+    @staticmethod
+    def coalesce_signal(signal: str) -> int:
+        """
+        移除信号队列中与当前信号重复的信号(同一策略监控项)，当前信号处理时会一并处理其积压数据
+        其他策略的信号仍保留在队列中，不会因进程退出而丢失
+        :return: 合并的信号数量
+        """
+        coalesce_size = int(settings.TRIGGER_SIGNAL_COALESCE_SIZE)
+        if coalesce_size <= 0:
+            return 0
+        # 信号从右侧取出，从队尾开始移除，优先合并最早写入的重复信号
+        removed = ANOMALY_SIGNAL_KEY.client.lrem(ANOMALY_SIGNAL_KEY.get_key(), -coalesce_size, signal)
+        if removed:
+            metrics.TRIGGER_SIGNAL_COALESCED_COUNT.labels(strategy_id=metrics.TOTAL_TAG).inc(removed)
+        return removed
+
+    def run(self, processor):
+        """
+        在时间片内循环处理策略监控项的异常点队列
+        :param processor: TriggerProcessor
+        """
+        signal_key = "{strategy_id}.{item_id}".format(strategy_id=processor.strategy_id, item_id=processor.item_id)
+        deadline = time.time() + self.time_slice
+        while True:
+            queue_length = ANOMALY_LIST_KEY.client.llen(processor.anomaly_list_key)
+            metrics.TRIGGER_QUEUE_DEPTH.labels(strategy_id=metrics.TOTAL_TAG).observe(queue_length)
+            if not queue_length:
+                return
+
+            batch_size = self.get_batch_size(signal_key, queue_length)
+            metrics.TRIGGER_BATCH_SIZE.labels(strategy_id=metrics.TOTAL_TAG).observe(batch_size)
+
+            start = time.time()
+            count = processor.process(count=batch_size)
+            self.record(signal_key, count, time.time() - start)
+
+            if count >= queue_length:
+                # 已处理完当前积压，新写入的数据会有新的信号
+                return
+
+            if time.time() >= deadline:
+                # 时间片用尽，将信号放回信号队列队尾，优先处理其他策略
+                ANOMALY_SIGNAL_KEY.client.lpush(ANOMALY_SIGNAL_KEY.get_key(), signal_key)
+                logger.info(
+                    "[trigger scheduler] strategy({}), item({}) time slice exhausted, {} record left".format(
+                        processor.strategy_id, processor.item_id, queue_length - count
+                    )
+                )
+                return
+
+
+_scheduler = None
+
+
+def get_trigger_batch_scheduler():
+    """
+    获取进程内的 trigger 批量调度器
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = TriggerBatchScheduler()
+    return _scheduler
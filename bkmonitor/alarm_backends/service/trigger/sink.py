@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import atexit
+import json
+import logging
+import os
+import time
+
+from django.conf import settings
+
+from alarm_backends.core.storage.kafka import KafkaQueue
+from bkmonitor.models import AnomalyRecord
+from core.prometheus import metrics
+
+logger = logging.getLogger("trigger")
+
+
+class AnomalyRecordData(object):
+    """
+    轻量的异常记录，仅在写出到 MySQL 时才转换为 AnomalyRecord 模型实例
+    """
+
+    __slots__ = ("anomaly_id", "source_time", "strategy_id", "origin_alarm", "event_id")
+
+    def __init__(self, anomaly_id, source_time, strategy_id, origin_alarm, event_id=""):
+        self.anomaly_id = anomaly_id
+        self.source_time = source_time
+        self.strategy_id = strategy_id
+        self.origin_alarm = origin_alarm
+        self.event_id = event_id
+
+    def to_model(self):
+        return AnomalyRecord(
+            anomaly_id=self.anomaly_id,
+            source_time=self.source_time,
+            strategy_id=self.strategy_id,
+            origin_alarm=self.origin_alarm,
+            event_id=self.event_id,
+        )
+
+
+class AnomalyRecordSink(object):
+    """
+    异常记录批量写出
+    记录先进入进程内缓冲区，达到批量大小或缓冲时间超过最长停留时间时整批写出，
+    写出失败的批次直接丢弃，避免告警风暴时缓冲区无限增长
+    """
+
+    name = ""
+    topic = None
+
+    def __init__(self, batch_size, max_latency):
+        self.batch_size = max(int(batch_size), 1)
+        self.max_latency = max_latency
+        self.buffer = []
+        # 缓冲区中最早一条记录的进入时间
+        self.first_put_time = None
+
+    def put(self, records):
+        if not records:
+            return
+        if self.first_put_time is None:
+            self.first_put_time = time.time()
+        self.buffer.extend(records)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush_if_due(self):
+        """
+        缓冲时间超过最长停留时间则写出
+        """
+        if self.first_put_time is not None and time.time() - self.first_put_time >= self.max_latency:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+
+        records, first_put_time = self.buffer, self.first_put_time
+        self.buffer, self.first_put_time = [], None
+
+        exc = None
+        for offset in range(0, len(records), self.batch_size):
+            batch = records[offset : offset + self.batch_size]
+            metrics.TRIGGER_ANOMALY_SINK_BATCH_SIZE.labels(sink=self.name).observe(len(batch))
+            try:
+                self.write(batch)
+            except Exception as e:  # noqa
+                exc = e
+                logger.exception("[anomaly sink] write %s anomaly records to %s failed: %s", len(batch), self.name, e)
+
+        metrics.TRIGGER_ANOMALY_SINK_FLUSH_LATENCY.labels(
+            sink=self.name, status=metrics.StatusEnum.from_exc(exc)
+        ).observe(time.time() - first_put_time)
+
+    def write(self, records):
+        raise NotImplementedError
+
+
+class NullAnomalyRecordSink(AnomalyRecordSink):
+    """
+    不写出异常记录
+    """
+
+    name = "off"
+
+    def put(self, records):
+        return
+
+
+class MySQLAnomalyRecordSink(AnomalyRecordSink):
+    """
+    批量写入异常记录表，异常ID重复的记录直接忽略
+    """
+
+    name = "mysql"
+
+    def write(self, records):
+        AnomalyRecord.objects.bulk_create(
+            [record.to_model() for record in records], batch_size=self.batch_size, ignore_conflicts=True
+        )
+
+
+class KafkaAnomalyRecordSink(AnomalyRecordSink):
+    """
+    批量推送异常记录至 kafka
+    """
+
+    name = "kafka"
+
+    def __init__(self, batch_size, max_latency, topic):
+        super(KafkaAnomalyRecordSink, self).__init__(batch_size, max_latency)
+        self.topic = topic
+        self._kafka_queue = None
+
+    @property
+    def kafka_queue(self):
+        if self._kafka_queue is None:
+            self._kafka_queue = KafkaQueue.get_common_kafka_queue()
+            self._kafka_queue.set_topic(self.topic)
+        return self._kafka_queue
+
+    def write(self, records):
+        messages = []
+        for record in records:
+            message = {
+                "anomaly_id": record.anomaly_id,
+                "source_time": str(record.source_time),
+                "strategy_id": record.strategy_id,
+                "event_id": record.event_id,
+                "origin_alarm": record.origin_alarm,
+            }
+            messages.append(json.dumps(message).encode("utf-8"))
+        self.kafka_queue.put(value=messages)
+
+
+_sink = None
+
+
+def get_anomaly_record_sink():
+    """
+    获取进程内的异常记录写出器，写出方式配置变更时先写出旧缓冲区再重建
+    """
+    global _sink
+
+    sink_type = settings.TRIGGER_ANOMALY_SINK
+    batch_size = settings.TRIGGER_ANOMALY_SINK_BATCH_SIZE
+    max_latency = settings.TRIGGER_ANOMALY_SINK_MAX_LATENCY
+    topic = settings.TRIGGER_ANOMALY_SINK_KAFKA_TOPIC if sink_type == KafkaAnomalyRecordSink.name else None
+    if (
+        _sink is not None
+        and _sink.name == sink_type
+        and _sink.batch_size == max(int(batch_size), 1)
+        and _sink.max_latency == max_latency
+        and _sink.topic == topic
+    ):
+        return _sink
+
+    if _sink is not None:
+        _sink.flush()
+
+    if sink_type == MySQLAnomalyRecordSink.name:
+        _sink = MySQLAnomalyRecordSink(batch_size, max_latency)
+    elif sink_type == KafkaAnomalyRecordSink.name:
+        _sink = KafkaAnomalyRecordSink(batch_size, max_latency, topic)
+    else:
+        _sink = NullAnomalyRecordSink(batch_size, max_latency)
+    return _sink
+
+
+def flush_anomaly_record_sink():
+    """
+    进程退出时写出缓冲区中剩余的异常记录
+    """
+    if _sink is None:
+        return
+    try:
+        _sink.flush()
+    except Exception as e:  # noqa
+        logger.exception("[anomaly sink] flush on exit failed: %s", e)
+
+
+def reset_anomaly_record_sink():
+    """
+    fork 后的子进程丢弃继承自父进程的缓冲区，由父进程负责写出，避免重复写入
+    """
+    global _sink
+    _sink = None
+
+
+atexit.register(flush_anomaly_record_sink)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_anomaly_record_sink)
@@ -273,6 +273,7 @@ class TestHostManager(TestCMDBBaseTestCase):
         # 业务迁移
         # 清理本地缓存
         caches["locmem"].clear()
+        HostManager.clear_local_cache()
 
         self.assertEqual(2, HostManager.get(ip="10.0.0.3", bk_cloud_id=3).bk_biz_id)
         self.assertIsNone(HostManager.get(ip="10.0.0.2", bk_cloud_id=2))
@@ -287,6 +288,26 @@ class TestHostManager(TestCMDBBaseTestCase):
         # 业务拉取异常
         self.assertEqual(4, HostManager.get(ip="10.0.0.5", bk_cloud_id=5).bk_biz_id)
 
+    def test_local_cache(self):
+        HostManager.refresh()
+        host = HostManager.get(ip="10.0.0.1", bk_cloud_id=1)
+        # 命中本地缓存时返回同一对象
+        self.assertIs(host, HostManager.get(ip="10.0.0.1", bk_cloud_id=1))
+        self.assertIs(host, HostManager.multi_get(["10.0.0.1|1"])[0])
+        other_host = HostManager.get(ip="10.0.0.3", bk_cloud_id=3)
+
+        # 业务数据变化后递增该业务的版本号
+        version = HostManager.cache.hgetall(HostManager.get_version_key()).get("2")
+        new_host = Host(bk_host_innerip="10.0.0.1", bk_cloud_id=1, bk_host_id=1, bk_biz_id=3)
+        HostManager.cache_by_biz(2, {"10.0.0.1|1": new_host}, force=True)
+        self.assertNotEqual(version, HostManager.cache.hgetall(HostManager.get_version_key()).get("2"))
+
+        # 到达检查间隔前仍使用本地缓存，检查版本号后仅失效变化业务的本地缓存
+        self.assertEqual(2, HostManager.get(ip="10.0.0.1", bk_cloud_id=1).bk_biz_id)
+        HostManager.get_local_cache().last_check_time = 0
+        self.assertEqual(3, HostManager.get(ip="10.0.0.1", bk_cloud_id=1).bk_biz_id)
+        self.assertIs(other_host, HostManager.get(ip="10.0.0.3", bk_cloud_id=3))
+
     @mock.patch("alarm_backends.core.cache.cmdb.business.api.cmdb.get_business")
     def test_remove_biz(self, get_business):
         get_business.return_value = ALL_BUSINESS
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import json
+import time
+import zlib
+
+import pytest
+
+from alarm_backends.core.cache.delay_queue import DelayQueueManager
+from alarm_backends.core.storage.redis import Cache
+
+pytestmark = pytest.mark.django_db
+
+BACKEND = "service"
+TARGET_QUEUE = "test.delay_queue.target"
+
+
+@pytest.fixture
+def client():
+    client = Cache(BACKEND)
+    client.flushall()
+    yield client
+    client.flushall()
+
+
+class TestDelayQueueManager(object):
+    def test_enqueue(self, client):
+        client.delay("rpush", TARGET_QUEUE, 1, "a", delay=60, task_id="task1")
+
+        task_id, cmd, queue, values, score = json.loads(client.hget(DelayQueueManager.TASK_STORAGE_QUEUE, "task1"))
+        assert (task_id, cmd, queue, values) == ("task1", "rpush", TARGET_QUEUE, ["1", "a"])
+        assert client.zscore(DelayQueueManager.TASK_DELAY_QUEUE, "task1") == pytest.approx(score)
+        # 未分片时不登记分片队列
+        assert not client.smembers(DelayQueueManager.TASK_DELAY_QUEUE_SHARDS)
+
+    def test_shard_selection(self, client, settings):
+        settings.DELAY_QUEUE_SHARD_COUNT = 1
+        assert DelayQueueManager.get_delay_queue_key(TARGET_QUEUE) == DelayQueueManager.TASK_DELAY_QUEUE
+
+        settings.DELAY_QUEUE_SHARD_COUNT = 4
+        queues = ["queue{}".format(index) for index in range(20)]
+        for queue in queues:
+            shard = zlib.crc32(queue.encode("utf-8")) % 4
+            expected = DelayQueueManager.TASK_DELAY_QUEUE
+            if shard:
+                expected = "{}.{}".format(DelayQueueManager.TASK_DELAY_QUEUE, shard)
+            assert DelayQueueManager.get_delay_queue_key(queue) == expected
+            client.delay("rpush", queue, "value", delay=60)
+
+        # 非0号分片入队时登记分片
+        sharded_keys = {DelayQueueManager.get_delay_queue_key(queue) for queue in queues}
+        sharded_keys.discard(DelayQueueManager.TASK_DELAY_QUEUE)
+        assert set(client.smembers(DelayQueueManager.TASK_DELAY_QUEUE_SHARDS)) == sharded_keys
+
+    def test_dispatch(self, client, settings):
+        settings.DELAY_QUEUE_SHARD_COUNT = 4
+        settings.DELAY_QUEUE_DISPATCH_BATCH_SIZE = 100
+        client.delay("rpush", TARGET_QUEUE, "1", "2", task_id="task1")
+        client.delay("lpush", "{}.other".format(TARGET_QUEUE), "3", task_id="task2")
+        client.delay("rpush", TARGET_QUEUE, "4", delay=60, task_id="task3")
+
+        next_score = DelayQueueManager.refresh_single_db(BACKEND)
+
+        assert client.lrange(TARGET_QUEUE, 0, -1) == ["1", "2"]
+        assert client.lrange("{}.other".format(TARGET_QUEUE), 0, -1) == ["3"]
+        # 到期任务已领取，未到期任务保留
+        assert client.hkeys(DelayQueueManager.TASK_STORAGE_QUEUE) == ["task3"]
+        assert next_score == pytest.approx(time.time() + 60, abs=5)
+
+        # 重复投递不会重复推送
+        DelayQueueManager.refresh_single_db(BACKEND)
+        assert client.lrange(TARGET_QUEUE, 0, -1) == ["1", "2"]
+
+    def test_dispatch_batch(self, client, settings):
+        settings.DELAY_QUEUE_DISPATCH_BATCH_SIZE = 2
+        for index in range(5):
+            client.delay("rpush", TARGET_QUEUE, str(index))
+
+        # 单批次已满时返回当前时间，调用方立即进行下一轮投递
+        assert DelayQueueManager.refresh_single_db(BACKEND) <= time.time()
+        assert client.lrange(TARGET_QUEUE, 0, -1) == ["0", "1"]
+
+        DelayQueueManager.refresh_single_db(BACKEND)
+        DelayQueueManager.refresh_single_db(BACKEND)
+        assert client.lrange(TARGET_QUEUE, 0, -1) == ["0", "1", "2", "3", "4"]
+        assert client.zcard(DelayQueueManager.TASK_DELAY_QUEUE) == 0
+        assert DelayQueueManager.refresh_single_db(BACKEND) is None
+
+    def test_dispatch_invalid_task(self, client):
+        # 任务内容缺失时直接丢弃
+        client.zadd(DelayQueueManager.TASK_DELAY_QUEUE, {"missing": time.time() - 1})
+        client.delay("rpush", TARGET_QUEUE, "1")
+
+        DelayQueueManager.refresh_single_db(BACKEND)
+
+        assert client.lrange(TARGET_QUEUE, 0, -1) == ["1"]
+        assert client.zcard(DelayQueueManager.TASK_DELAY_QUEUE) == 0
@@ -9,6 +9,7 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import json
 
 import pytest
 
@@ -79,3 +80,71 @@ class TestStrategyGroup(object):
 
     def test_cache(self):
         pass
+
+    def test_merge_strategy_ids(self):
+        # 重新计算的策略先移除再加入，未变更的策略保持不变
+        assert StrategyCacheManager.merge_strategy_ids([1, 2, 3], [3, 4], {2, 3}) == [1, 3, 4]
+
+        old = {"system.cpu": {"2": [1, 2]}, "system.mem": {"3": [2]}}
+        new = {"system.cpu": {2: [5]}}
+        assert StrategyCacheManager.merge_strategy_ids(old, new, {2}) == {"system.cpu": {"2": [1, 5]}}
+
+    def test_merge_strategy_group(self):
+        group = {"1": [1], "2": [3], "bk_biz_id": 2, "interval_list": [60, 120]}
+        old_group = {2: [3], "bk_biz_id": 2, "interval_list": [120]}
+        new_group = {2: [3, 4], "bk_biz_id": 2, "interval_list": [60]}
+        assert StrategyCacheManager.merge_strategy_group(group, old_group, new_group, {2}) == {
+            "1": [1],
+            "2": [3, 4],
+            "bk_biz_id": 2,
+            "interval_list": [60, 60],
+        }
+
+        # 分组内的策略全部移除后，只剩下业务信息
+        group = {"2": [3], "bk_biz_id": 2, "interval_list": [120]}
+        assert StrategyCacheManager.merge_strategy_group(group, old_group, None, {2}) == {"bk_biz_id": 2}
+
+    def patch_strategy_builders(self, mocker):
+        for builder in [
+            "add_target_shield_condition",
+            "add_enabled_cluster_condition",
+            "build_strategy_groups",
+            "build_fta_alert_strategy_ids",
+            "build_real_time_strategy_ids",
+            "build_gse_alarm_strategy_ids",
+        ]:
+            mocker.patch.object(StrategyCacheManager, builder, return_value={})
+        mocker.patch.object(StrategyCacheManager, "build_nodata_strategy_ids", return_value=[])
+
+    def test_patch_strategies_prune_bk_biz_ids(self, mocker):
+        self.patch_strategy_builders(mocker)
+        cache = StrategyCacheManager.cache
+        cache.set(StrategyCacheManager.IDS_CACHE_KEY, json.dumps([1, 2, 3]))
+        cache.set(StrategyCacheManager.BK_BIZ_IDS_CACHE_KEY, json.dumps([2, 3, 4]))
+        values_list = mocker.patch("alarm_backends.core.cache.strategy.StrategyModel.objects.filter").return_value
+        values_list.values_list.return_value = [(3, 4)]
+
+        # 业务3的最后一个策略被删除，业务4仍有其他已缓存的策略
+        old_strategies = {2: {"id": 2, "bk_biz_id": 3}, 5: {"id": 5, "bk_biz_id": 4}}
+        StrategyCacheManager.patch_strategies(old_strategies, {})
+        assert json.loads(cache.get(StrategyCacheManager.IDS_CACHE_KEY)) == [1, 3]
+        assert json.loads(cache.get(StrategyCacheManager.BK_BIZ_IDS_CACHE_KEY)) == [2, 4]
+
+    def test_patch_strategies_retry_on_conflict(self, mocker):
+        self.patch_strategy_builders(mocker)
+        cache = StrategyCacheManager.cache
+        cache.set(StrategyCacheManager.IDS_CACHE_KEY, json.dumps([1]))
+        cache.set(StrategyCacheManager.BK_BIZ_IDS_CACHE_KEY, json.dumps([2]))
+
+        merge_strategy_ids = StrategyCacheManager.merge_strategy_ids
+        conflicts = [json.dumps([1, 7])]
+
+        def concurrent_merge(old, new, removed_ids):
+            # 第一次读取后，缓存被其他进程修改
+            if conflicts:
+                cache.set(StrategyCacheManager.IDS_CACHE_KEY, conflicts.pop())
+            return merge_strategy_ids(old, new, removed_ids)
+
+        mocker.patch.object(StrategyCacheManager, "merge_strategy_ids", side_effect=concurrent_merge)
+        StrategyCacheManager.patch_strategies({8: None}, {8: {"id": 8, "bk_biz_id": 2}})
+        assert json.loads(cache.get(StrategyCacheManager.IDS_CACHE_KEY)) == [1, 7, 8]
@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 import copy
+import json
 from datetime import datetime
 
 import mock
 from django.test import TestCase
 
-from alarm_backends.core.control.strategy import Strategy
+from alarm_backends.core.cache.local import MISSING, SizedLRUCache
+from alarm_backends.core.control.strategy import Strategy, StrategySnapshot
 
 STRATEGY = {
     "bk_biz_id": 2,
@@ -103,3 +105,44 @@ class TestStrategy(TestCase):
             [],
         ]
         self.assertFalse(strategy.in_alarm_time(datetime.strptime("2022-01-01 01:00:00", "%Y-%m-%d %H:%M:%S"))[0])
+
+
+class TestStrategySnapshot(TestCase):
+    def test_sized_lru_cache(self):
+        cache = SizedLRUCache("test", maxbytes=10)
+        cache.set("a", 1, size=4)
+        cache.set("b", 2, size=4)
+        self.assertEqual(cache.get("a"), 1)
+        # 超出容量时淘汰最久未使用的 b
+        cache.set("c", 3, size=4)
+        self.assertIs(cache.get("b"), MISSING)
+        self.assertEqual(cache.total_bytes, 8)
+        # 单个对象超过容量时不缓存
+        cache.set("d", 4, size=11)
+        self.assertIs(cache.get("d"), MISSING)
+        cache.delete("a")
+        self.assertEqual(cache.total_bytes, 4)
+
+    def test_get_snapshot(self):
+        strategy = copy.deepcopy(STRATEGY)
+        strategy["items"] = [{"id": 1, "no_data_config": {"is_enabled": True, "continuous": 5, "level": 2}}]
+        cache = SizedLRUCache("test", maxbytes=1024)
+        client = mock.MagicMock()
+        client.get.return_value = json.dumps(strategy)
+        with mock.patch("alarm_backends.core.control.strategy.get_snapshot_cache", return_value=cache), mock.patch(
+            "alarm_backends.core.control.strategy.key.STRATEGY_SNAPSHOT_KEY"
+        ) as snapshot_key:
+            snapshot_key.client = client
+            snapshot = Strategy.get_snapshot("snapshot_key")
+            self.assertIs(Strategy.get_snapshot("snapshot_key"), snapshot)
+            self.assertEqual(client.get.call_count, 1)
+
+            client.get.return_value = None
+            self.assertIsNone(Strategy.get_snapshot("non-exist"))
+            self.assertIs(cache.get("non-exist"), MISSING)
+
+        self.assertIsInstance(snapshot, StrategySnapshot)
+        self.assertEqual(snapshot.trigger_configs, Strategy.get_trigger_configs(snapshot.config))
+        no_data_configs = snapshot.get_no_data_configs(1)
+        no_data_configs.pop("level")
+        self.assertIn("level", snapshot.get_no_data_configs(1))
@@ -10,6 +10,7 @@ specific language governing permissions and limitations under the License.
 """
 
 
+from bkmonitor.utils.range import compile_condition_instance, load_condition_instance
 from bkmonitor.utils.range.conditions import (
     AndCondition,
     EqualCondition,
@@ -211,3 +212,28 @@ class TestCondition(object):
         and_condition.add(condition3)
         assert not and_condition.is_match({"key": "123"})
         assert and_condition.is_match({"key": "1234235678"})
+
+    def test_compiled_reuse(self):
+        field = DimensionField("key", [r"[", r"123\d+5678"])
+        condition = RegularCondition(field)
+        # 非法正则之后的条件不再参与匹配
+        assert not condition.is_match({"key": "1234235678"})
+        assert not condition.is_match({"key": "1234235678"})
+
+        condition = IncludeCondition(DimensionField("key", [" value "]))
+        assert condition.is_match({"key": "asdfvalueasdf"})
+        assert not condition.is_match({"key": "asdfalueasdf"})
+        assert condition.is_match({"key": "value"})
+
+    def test_compile_condition_instance(self):
+        conditions_config = [
+            [{"field": "ip", "method": "eq", "value": ["127.0.0.1"]}],
+            [{"field": "name", "method": "reg", "value": [r"^test\d+$"]}],
+        ]
+        condition = compile_condition_instance(conditions_config, False)
+        assert condition is compile_condition_instance(conditions_config, False)
+        assert condition is not compile_condition_instance(conditions_config)
+
+        origin_condition = load_condition_instance(conditions_config, False)
+        for data in [{"ip": "127.0.0.1"}, {"name": "test1"}, {"name": "test"}, {}]:
+            assert condition.is_match(data) == origin_condition.is_match(data)
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import pytest
+from django.test import TestCase
+
+from alarm_backends.core.cache.key import ALERT_DEDUPE_CONTENT_KEY
+from alarm_backends.core.storage.redis_cluster import get_node_by_strategy_id
+from bkmonitor.models import CacheNode
+
+pytestmark = pytest.mark.django_db
+
+
+class TestRedisProxy(TestCase):
+    databases = {"monitor_api", "default"}
+
+    def setUp(self):
+        get_node_by_strategy_id(0)
+        CacheNode.refresh_from_settings()
+        ALERT_DEDUPE_CONTENT_KEY.client.flushall()
+
+    def tearDown(self):
+        ALERT_DEDUPE_CONTENT_KEY.client.flushall()
+
+    def test_mget_by_node(self):
+        keys = [ALERT_DEDUPE_CONTENT_KEY.get_key(strategy_id=i % 3, dedupe_md5=str(i)) for i in range(10)]
+        for index, key in enumerate(keys):
+            if index % 2:
+                ALERT_DEDUPE_CONTENT_KEY.client.set(key, str(index))
+
+        result = ALERT_DEDUPE_CONTENT_KEY.client.mget_by_node(keys, chunk_size=3)
+        assert result == [str(index) if index % 2 else None for index in range(10)]
+        assert ALERT_DEDUPE_CONTENT_KEY.client.mget_by_node([]) == []
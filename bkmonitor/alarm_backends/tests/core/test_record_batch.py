@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import json
+
+import pytest
+
+from alarm_backends.core.record_batch import (
+    RecordBatch,
+    encode_record_batch,
+    is_record_batch,
+    iter_records,
+)
+
+RECORDS = [
+    {
+        "record_id": "342a08e0f85f169a7e099c18db3708ed.1569246480",
+        "value": 99,
+        "values": {"timestamp": 1569246480, "load5": 99},
+        "dimensions": {"ip": "127.0.0.1", "bk_cloud_id": 0},
+        "dimension_fields": ["ip", "bk_cloud_id"],
+        "time": 1569246480,
+        "access_time": 1569246485.1,
+    },
+    {
+        "record_id": "2a1850513fa6018c435f9b6359b3fa7d.1569246480",
+        "value": None,
+        "values": {"timestamp": 1569246480, "load5": None},
+        "dimensions": {"ip": "10.0.0.1"},
+        "dimension_fields": ["ip"],
+        "time": 1569246480,
+    },
+]
+
+
+class TestRecordBatch(object):
+    @pytest.mark.parametrize("compress", [True, False])
+    def test_encode_decode(self, compress):
+        raw = encode_record_batch(RECORDS, compress=compress)
+        assert is_record_batch(raw)
+        batch = RecordBatch(raw)
+        assert len(batch) == 2
+        assert list(batch) == RECORDS
+        # 维度key按schema共享
+        assert len(batch.columns["schemas"]) == 2
+
+    def test_iter_records_compatible(self):
+        raw = json.dumps(RECORDS[0])
+        assert not is_record_batch(raw)
+        assert list(iter_records(raw)) == [RECORDS[0]]
+
+    def test_invalid_batch(self):
+        with pytest.raises(ValueError):
+            list(iter_records(encode_record_batch(RECORDS)[:-10]))
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from hashlib import md5
+
+from alarm_backends.management.hashring import (
+    HashRing,
+    count_moved_keys,
+    get_hash_ring,
+    md5_hash,
+)
+
+HOSTS = ["127.0.0.{}".format(i) for i in range(1, 41)]
+
+
+def test_md5_hash_compatible():
+    # 与旧实现 int(md5(key).hexdigest(), 16) % 2 ** 32 保持一致，保证升级前后分配结果不变
+    for key in ["2", "127.0.0.1", "strategy_group_1"]:
+        assert md5_hash(key) == int(md5(key.encode("utf-8")).hexdigest(), 16) % (2 ** 32)
+
+
+def test_get_hash_ring_cached():
+    ring = get_hash_ring(HOSTS)
+    assert ring is get_hash_ring({host: 1 for host in reversed(HOSTS)})
+    assert ring is not get_hash_ring(HOSTS, hash_func="crc32")
+    assert ring is not get_hash_ring(HOSTS[:-1])
+
+
+def test_get_node():
+    targets = [str(i) for i in range(1000)]
+    for hash_func in ["md5", "crc32"]:
+        ring = HashRing({host: 1 for host in HOSTS}, hash_func=hash_func)
+        nodes = [ring.get_node(target) for target in targets]
+        # 查询缓存不影响结果
+        assert nodes == [ring.get_node(target) for target in targets]
+        assert set(nodes) <= set(HOSTS)
+
+
+def test_count_moved_keys():
+    targets = [str(i) for i in range(1000)]
+    old_ring = get_hash_ring(HOSTS)
+    new_ring = get_hash_ring(HOSTS[:-1])
+    moved_count, moved = count_moved_keys(old_ring, new_ring, targets)
+
+    # 下线节点上的对象全部迁移，其余对象仅少量迁移
+    removed = {target for target in targets if old_ring.get_node(target) == HOSTS[-1]}
+    assert removed <= set(moved)
+    assert moved_count < len(targets) // 10
+    assert all(new_node != HOSTS[-1] for _, new_node in moved.values())
+    assert count_moved_keys(old_ring, old_ring, targets)[0] == 0
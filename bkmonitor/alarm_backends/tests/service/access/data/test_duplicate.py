@@ -15,7 +15,10 @@ import copy
 import fakeredis
 import pytest
 
-from alarm_backends.service.access.data.duplicate import Duplicate
+from alarm_backends.service.access.data.duplicate import (
+    Duplicate,
+    FingerprintDuplicate,
+)
 
 from .config import STANDARD_DATA
 
@@ -65,3 +68,48 @@ class TestDuplicate(object):
         assert dup.is_duplicate(record_1) is True
         assert dup.is_duplicate(record_2) is True
         assert dup.is_duplicate(record) is False
+
+
+class TestFingerprintDuplicate(object):
+    def setup_method(self, method):
+        redis = fakeredis.FakeRedis(decode_responses=True)
+        redis.flushall()
+
+    def test_fingerprint_width(self):
+        assert FingerprintDuplicate.get_fingerprint_width(0.000001, 1000000) == 5
+        assert FingerprintDuplicate.get_fingerprint_width(0.1, 10) == 4
+        assert FingerprintDuplicate.get_fingerprint_width(1e-20, 1000000) == 8
+
+    def test_duplicate(self):
+        dup = FingerprintDuplicate("123456789")
+        record_1 = MockRecord(copy.deepcopy(STANDARD_DATA))
+        assert dup.is_duplicate(record_1) is False
+
+        dup.add_record(record_1)
+        assert dup.is_duplicate(record_1) is True
+
+    def test_refresh_cache(self):
+        strategy_group_key = "123456789"
+        dup = FingerprintDuplicate(strategy_group_key)
+        record = MockRecord(STANDARD_DATA)
+
+        record_1 = MockRecord(copy.deepcopy(STANDARD_DATA))
+        record_1.time += 60
+        dup.add_record(record_1)
+
+        record_2 = MockRecord(copy.deepcopy(STANDARD_DATA))
+        record_2.time += 120
+        record_2.record_id = "another.{}".format(record_2.time)
+        dup.add_record(record_2)
+
+        dup.refresh_cache()
+
+        # 追加写入，多次刷新不会覆盖已有指纹
+        dup = FingerprintDuplicate(strategy_group_key)
+        dup.add_record(record)
+        dup.refresh_cache()
+
+        dup = FingerprintDuplicate(strategy_group_key)
+        assert dup.is_duplicate(record_1) is True
+        assert dup.is_duplicate(record_2) is True
+        assert dup.is_duplicate(record) is True
@@ -18,8 +18,10 @@ from collections import defaultdict
 import mock
 import pytest
 from django.conf import settings
+from django.test import override_settings
 
 from alarm_backends.core.cache import key
+from alarm_backends.core.control.partition import get_partition, parse_detect_signal
 from alarm_backends.service.access.data import AccessBatchDataProcess, AccessDataProcess
 from bkmonitor.models import CacheNode
 from bkmonitor.utils.common_utils import count_md5
@@ -129,6 +131,47 @@ class TestAccessDataProcess(object):
         )
         assert len(result) == 1
 
+    @mock.patch(
+        "alarm_backends.core.cache.strategy.StrategyCacheManager.get_strategy_by_id", return_value=STRATEGY_CONFIG_V3
+    )
+    @mock.patch(
+        "alarm_backends.core.cache.strategy.StrategyCacheManager.get_strategy_group_detail", return_value={"1": [1]}
+    )
+    @mock.patch(
+        "alarm_backends.core.control.item.Item.query_record_pages",
+        return_value=iter([[RAW_DATA_ZERO, RAW_DATA_NONE], [RAW_DATA]]),
+    )
+    @mock.patch("alarm_backends.service.access.tasks.run_access_batch_data")
+    @override_settings(
+        ENABLE_ACCESS_STREAM_PULL=True, ACCESS_DATA_BATCH_PROCESS_THRESHOLD=2, ACCESS_DATA_BATCH_PROCESS_SIZE=1
+    )
+    def test_pull_stream(self, mock_batch, mock_pages, mock_strategy_group, mock_strategy):
+        strategy_group_key = "123456789"
+        acc_data = AccessDataProcess(strategy_group_key)
+
+        # 未标记为超量策略组时，使用全量拉取
+        assert acc_data.is_stream_pull() is False
+        stream_key = key.ACCESS_STREAM_PULL_KEY.get_key(strategy_group_key=strategy_group_key)
+        stream_key.strategy_id = 1
+        key.ACCESS_STREAM_PULL_KEY.client.set(stream_key, 3)
+        assert acc_data.is_stream_pull() is True
+
+        acc_data.pull()
+
+        # 同一时间点的数据在同一批次中，第一批原地处理，第二批下发异步任务
+        assert mock_pages.call_count == 1
+        assert mock_batch.delay.call_count == 1
+        assert acc_data.batch_count == 2
+        assert len(acc_data.record_list) == 1
+        assert acc_data.record_list[0].raw_data["_time_"] == 1569246420
+
+        data_key = key.ACCESS_BATCH_DATA_KEY.get_key(
+            strategy_group_key=strategy_group_key, sub_task_id=f"{acc_data.batch_timestamp}.2"
+        )
+        data = key.ACCESS_BATCH_DATA_KEY.client.get(data_key)
+        result = json.loads(gzip.decompress(base64.b64decode(data)).decode("utf-8"))
+        assert [point["_time_"] for point in result] == [1569246480]
+
     @mock.patch(
         "alarm_backends.core.cache.strategy.StrategyCacheManager.get_strategy_by_id", return_value=STRATEGY_CONFIG_V3
     )
@@ -168,6 +211,79 @@ class TestAccessDataProcess(object):
             noise_dimension_data_hash
         }
 
+    @mock.patch(
+        "alarm_backends.core.cache.strategy.StrategyCacheManager.get_strategy_by_id", return_value=STRATEGY_CONFIG_V3
+    )
+    @mock.patch(
+        "alarm_backends.core.cache.strategy.StrategyCacheManager.get_strategy_group_detail", return_value={"1": [1]}
+    )
+    def test_push_partition(self, mock_strategy, mock_strategy_group):
+        strategy_id = 1
+        item_id = 1
+        strategy_group_key = "123456789"
+        acc_data = AccessDataProcess(strategy_group_key)
+        record = MockRecord(STANDARD_DATA)
+        record.inhibitions = {item_id: False}
+        record.items = [acc_data.items[0]]
+        record.is_retains = {item_id: True}
+        acc_data.record_list = [record]
+
+        settings.DETECT_PARTITION_STRATEGIES = {str(strategy_id): 4}
+        acc_data.push()
+        settings.DETECT_PARTITION_STRATEGIES = {}
+
+        # 数据按维度写入分区队列，信号中携带分区号
+        partition = get_partition(STANDARD_DATA["record_id"], 4)
+        client = key.DATA_SIGNAL_KEY.client
+        assert client.rpop(key.DATA_SIGNAL_KEY.get_key()) == f"{strategy_id}|{partition}"
+        assert parse_detect_signal(f"{strategy_id}|{partition}") == (str(strategy_id), partition)
+
+        output_key = key.DATA_LIST_PARTITION_KEY.get_key(strategy_id=strategy_id, item_id=item_id, partition=partition)
+        assert key.DATA_LIST_PARTITION_KEY.client.rpop(output_key) == json.dumps(STANDARD_DATA)
+        assert not key.DATA_LIST_KEY.client.llen(key.DATA_LIST_KEY.get_key(strategy_id=strategy_id, item_id=item_id))
+        # 记录分区数，供关闭分区后拉取遗留的分区队列
+        partition_count_key = key.DATA_PARTITION_COUNT_KEY.get_key(strategy_id=strategy_id)
+        assert key.DATA_PARTITION_COUNT_KEY.client.get(partition_count_key) == "4"
+        key.DATA_PARTITION_COUNT_KEY.client.delete(partition_count_key)
+
+    nodata_strategy_dict = copy.deepcopy(STRATEGY_CONFIG_V3)
+    nodata_strategy_dict["items"][0]["no_data_config"]["is_enabled"] = True
+
+    @mock.patch(
+        "alarm_backends.core.cache.strategy.StrategyCacheManager.get_strategy_by_id", return_value=nodata_strategy_dict
+    )
+    @mock.patch(
+        "alarm_backends.core.cache.strategy.StrategyCacheManager.get_strategy_group_detail", return_value={"1": [1]}
+    )
+    def test_push_nodata_presence(self, mock_strategy_group, mock_strategy, settings):
+        strategy_id = 1
+        item_id = 1
+        strategy_group_key = "123456789"
+        acc_data = AccessDataProcess(strategy_group_key)
+        records = []
+        for _ in range(3):
+            record = MockRecord(STANDARD_DATA)
+            record.items = [acc_data.items[0]]
+            record.is_retains = {item_id: True}
+            records.append(record)
+        acc_data.record_list = records
+
+        settings.ENABLE_NODATA_PRESENCE_INDEX = True
+        acc_data.push()
+
+        # 同一周期同一维度只记录一次，且不再写入完整数据副本队列
+        periods_key = key.NO_DATA_PRESENCE_PERIODS_KEY.get_key(strategy_id=strategy_id, item_id=item_id)
+        assert key.NO_DATA_PRESENCE_PERIODS_KEY.client.zrange(periods_key, 0, -1) == [str(STANDARD_DATA["time"])]
+        presence_key = key.NO_DATA_PRESENCE_KEY.get_key(
+            strategy_id=strategy_id, item_id=item_id, timestamp=STANDARD_DATA["time"]
+        )
+        assert key.NO_DATA_PRESENCE_KEY.client.hgetall(presence_key) == {
+            count_md5(STANDARD_DATA["dimensions"]): json.dumps(STANDARD_DATA["dimensions"])
+        }
+        assert not key.NO_DATA_LIST_KEY.client.llen(
+            key.NO_DATA_LIST_KEY.get_key(strategy_id=strategy_id, item_id=item_id)
+        )
+
     strategy_dict = copy.deepcopy(STRATEGY_CONFIG_V3)
     strategy_dict["notice"]["options"].pop("noise_reduce_config", None)
 
@@ -8,3 +8,69 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+
+from collections import defaultdict
+
+import mock
+
+from alarm_backends.service.access.event.qos import QoSMixin
+
+
+class MockEventRecord(object):
+    def __init__(self, ip, items):
+        self.bk_biz_id = 2
+        self.level = 2
+        self.data = {"data": {"dimensions": {"bk_target_ip": ip}}}
+        self.items = items
+        self.is_retains = defaultdict(lambda: True)
+        self.inhibitions = defaultdict(lambda: False)
+
+
+class MockProcess(QoSMixin):
+    def __init__(self, record_list):
+        self.record_list = record_list
+
+
+class TestQoS(object):
+    def setup_method(self):
+        item = mock.MagicMock(id=1)
+        item.strategy.id = 1
+        self.item = item
+
+    def test_check_qos_disabled(self):
+        client = mock.MagicMock()
+        client.exists.return_value = False
+        process = MockProcess([MockEventRecord("127.0.0.1", [self.item])])
+        assert process.check_qos(client) is False
+        assert len(process.record_list) == 1
+        client.pipeline.assert_not_called()
+
+    @mock.patch("alarm_backends.service.access.event.qos.settings")
+    def test_check_qos_batch(self, mock_settings):
+        mock_settings.QOS_DROP_ALARM_THREADHOLD = 3
+        records = [MockEventRecord("127.0.0.1", [self.item]) for _ in range(3)]
+        records.append(MockEventRecord("127.0.0.2", [self.item]))
+
+        client = mock.MagicMock()
+        client.exists.return_value = True
+        pipeline = client.pipeline.return_value
+        # 127.0.0.1 此前已计数 1 次，批量累加 3 次后为 4；127.0.0.2 首次计数
+        pipeline.execute.return_value = [4, 1]
+
+        process = MockProcess(records)
+        assert process.check_qos(client) is True
+
+        # 每个维度只累加一次
+        assert pipeline.hincrby.call_count == 2
+        assert [c[0][2] for c in pipeline.hincrby.call_args_list] == [3, 1]
+        # 127.0.0.1 的第 3 条记录超过阈值被丢弃
+        assert process.record_list == [records[0], records[1], records[3]]
+
+    def test_check_qos_error(self):
+        client = mock.MagicMock()
+        client.exists.return_value = True
+        client.pipeline.return_value.execute.side_effect = Exception("redis error")
+        records = [MockEventRecord("127.0.0.1", [self.item]) for _ in range(2)]
+        process = MockProcess(records)
+        assert process.check_qos(client) is True
+        assert process.record_list == records
@@ -10,6 +10,7 @@ specific language governing permissions and limitations under the License.
 """
 import copy
 import time
+from datetime import datetime, timedelta, timezone
 from typing import Dict
 
 import mock
@@ -21,6 +22,7 @@ from alarm_backends.core.cache.cmdb import HostIPManager, HostManager
 from alarm_backends.core.cache.cmdb.host import HostAgentIDManager
 from alarm_backends.core.storage.redis_cluster import get_node_by_strategy_id
 from alarm_backends.service.alert.enricher import KubernetesCMDBEnricher
+from alarm_backends.service.converge.shield.shield_index import AlertShieldIndex
 from alarm_backends.service.converge.shield.shielder.saas_config import HostShielder
 from alarm_backends.tests.utils.cmdb_data import ALL_HOSTS, TOPO_TREE
 from api.cmdb.define import Business, Host
@@ -326,3 +328,45 @@ class TestHostShielder:
 
         assert shielder.is_matched()
         mock_get_host_without_biz_v2.assert_not_called()
+
+
+def get_shield_config(shield_id, category, scope_type, dimension_config, begin_hours=0):
+    begin_time = datetime.now(tz=timezone.utc) + timedelta(hours=begin_hours)
+    return {
+        "id": shield_id,
+        "bk_biz_id": BK_BIZ_ID,
+        "category": category,
+        "scope_type": scope_type,
+        "begin_time": begin_time,
+        "end_time": begin_time + timedelta(hours=1),
+        "dimension_config": dimension_config,
+        "cycle_config": {"type": 1, "week_list": [], "day_list": [], "begin_time": "", "end_time": ""},
+        "description": "",
+    }
+
+
+class TestAlertShieldIndex:
+    def test_index(self):
+        shield_index = AlertShieldIndex(
+            [
+                get_shield_config(1, "strategy", "biz", {"strategy_id": [1], "level": [1, 2]}),
+                get_shield_config(2, "scope", "instance", {"bk_host_id": [100, 200]}),
+                get_shield_config(
+                    3,
+                    "dimension",
+                    "biz",
+                    {"dimension_conditions": [{"key": "device_name", "value": ["eth0"], "method": "neq"}]},
+                ),
+                get_shield_config(4, "scope", "instance", {"bk_host_id": [100]}, begin_hours=2),
+            ]
+        )
+        # 无等值条件的屏蔽配置不进入索引
+        assert shield_index.unindexed_positions == {2}
+
+        # 未到生效时间的屏蔽配置
+        assert shield_index.get_active_positions(time.time()) == {0, 1, 2}
+        assert shield_index.get_active_positions(time.time() + 7800) == {3}
+
+        assert shield_index.get_candidate_positions({"strategy_id": 1, "bk_host_id": 300}) == {0, 2}
+        assert shield_index.get_candidate_positions({"strategy_id": 2, "bk_host_id": 100}) == {1, 2, 3}
+        assert shield_index.shield_objs_by_id["2"].dimension_check.is_match({"bk_host_id": 100})
@@ -14,6 +14,7 @@ import mock
 import pytest
 
 from alarm_backends.core.storage.redis_cluster import get_node_by_strategy_id
+from alarm_backends.service.detect.strategy import get_history_local_cache
 from alarm_backends.service.detect.strategy.advanced_ring_ratio import AdvancedRingRatio
 from alarm_backends.tests.service.detect import DataPoint
 from alarm_backends.tests.service.detect.test_threshold import mock_datapoint_with_value
@@ -115,6 +116,34 @@ class TestAdvancedRingRatio(object):
         assert len(anomaly_result) == 1
         assert anomaly_result[0].anomaly_message == "avg(测试指标)较前3个时间点的瞬间值(101%)下降超过100.0%, 当前值-1%"
 
+    def test_query_history_points_cached(self):
+        from .test_threshold import mock_datapoint_with_value, mocked_item
+
+        get_node_by_strategy_id(0)
+        CacheNode.refresh_from_settings()
+        get_history_local_cache().clear()
+
+        algorithms_config = {"floor": 100, "ceil": 100, "ceil_interval": 3, "floor_interval": 3, "fetch_type": "last"}
+        _datapoint500 = mock_datapoint_with_value(500)
+        mocked_item.query_record.reset_mock()
+
+        detect_engine = AdvancedRingRatio(config=algorithms_config, unit="percent")
+        detect_engine.query_history_points([_datapoint500])
+        assert mocked_item.query_record.call_count == 1
+        assert len(detect_engine._local_history_storage) == 3
+        # 查询结果直接作为本地历史数据使用
+        history_points = detect_engine.history_point_fetcher(_datapoint500, cycles=3)
+        assert [point.value for point in history_points] == [99, 1, 101]
+
+        # 历史数据已写入redis及进程内缓存，其他检测器无需再查询数据源
+        detect_engine = AdvancedRingRatio(config=algorithms_config, unit="percent")
+        detect_engine.query_history_points([_datapoint500])
+        assert mocked_item.query_record.call_count == 1
+        history_points = detect_engine.history_point_fetcher(_datapoint500, cycles=3)
+        assert [point.value for point in history_points] == [99, 1, 101]
+
+        get_history_local_cache().clear()
+
     def test_detect_with_invalid_datapoint(self):
         algorithms_config = {"floor": 101, "ceil": 100, "ceil_interval": 3, "floor_interval": 3}
         with pytest.raises(InvalidDataPoint):
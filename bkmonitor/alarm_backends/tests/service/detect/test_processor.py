@@ -18,9 +18,11 @@ from six.moves import map
 
 from alarm_backends.constants import LATEST_POINT_WITH_ALL_KEY
 from alarm_backends.core.detect_result import ANOMALY_LABEL, CheckResult
+from alarm_backends.core.record_batch import encode_record_batch
 from alarm_backends.core.storage.redis_cluster import get_node_by_strategy_id
 from alarm_backends.service.detect.process import DetectProcess
 from bkmonitor.models import CacheNode
+from core.errors.alarm_backends import LockError
 
 pytestmark = pytest.mark.django_db
 
@@ -254,6 +256,103 @@ class TestProcessorViews(TestCase):
                         assert score == records[1]["time"]
                         assert label == f"{records[1]['time']}|{records[1]['value']}"
 
+    def test_pull_data_by_record_count(self):
+        with mock.patch(
+            "alarm_backends.core.cache.strategy.StrategyCacheManager.get_strategy_by_id",
+            return_value=copy.deepcopy(strategy_config),
+        ):
+            records = [
+                {
+                    "record_id": "342a08e0f85f169a7e099c18db3708ed.{}".format(1569246480 + index),
+                    "value": 99,
+                    "values": {"timestamp": 1569246480 + index, "load5": 99},
+                    "dimensions": {"ip": "127.0.0.1"},
+                    "time": 1569246480 + index,
+                }
+                for index in range(6)
+            ]
+
+            from alarm_backends.core.cache import key
+
+            redis_client = key.DATA_LIST_KEY.client
+            data_channel = key.DATA_LIST_KEY.get_key(strategy_id=1, item_id=2)
+            redis_client.delete(data_channel)
+            # 队列左进右出: 一个包含3条记录的数据块、一个无法解码的数据块、3条逐条json记录
+            redis_client.lpush(data_channel, encode_record_batch(records[:3]))
+            redis_client.lpush(data_channel, "#RB1zinvalid")
+            redis_client.lpush(data_channel, *map(json.dumps, records[3:]))
+
+            processor = DetectProcess("1")
+            item = processor.strategy.items[0]
+            with self.settings(SQL_MAX_LIMIT=4):
+                processor.pull_data(item)
+
+            # 按记录数限制拉取量，已读取的元素立即从队列中删除，无法解码的数据块不会重复投递
+            assert [data_point.record_id for data_point in processor.inputs[item.id]] == [
+                record["record_id"] for record in records[:4]
+            ]
+            assert processor.is_busy
+            assert redis_client.llen(data_channel) == 2
+
+            processor = DetectProcess("1")
+            processor.pull_data(item)
+            assert len(processor.inputs[item.id]) == 2
+            assert not processor.is_busy
+            assert redis_client.llen(data_channel) == 0
+
+    def test_pull_data_drain_partition(self):
+        with mock.patch(
+            "alarm_backends.core.cache.strategy.StrategyCacheManager.get_strategy_by_id",
+            return_value=copy.deepcopy(strategy_config),
+        ):
+            record = {
+                "record_id": "342a08e0f85f169a7e099c18db3708ed.1569246480",
+                "value": 99,
+                "values": {"timestamp": 1569246480, "load5": 99},
+                "dimensions": {"ip": "127.0.0.1"},
+                "time": 1569246480,
+            }
+
+            from alarm_backends.core.cache import key
+
+            # 关闭分区前，分区队列中遗留了待检测数据
+            partition_client = key.DATA_LIST_PARTITION_KEY.client
+            partition_channel = key.DATA_LIST_PARTITION_KEY.get_key(strategy_id=1, item_id=2, partition=1)
+            partition_client.delete(partition_channel)
+            partition_client.lpush(partition_channel, json.dumps(record))
+            key.DATA_PARTITION_COUNT_KEY.client.set(key.DATA_PARTITION_COUNT_KEY.get_key(strategy_id=1), 2)
+
+            processor = DetectProcess("1")
+            item = processor.strategy.items[0]
+            processor.pull_data(item)
+            assert [data_point.record_id for data_point in processor.inputs[item.id]] == [record["record_id"]]
+            assert partition_client.llen(partition_channel) == 0
+            key.DATA_PARTITION_COUNT_KEY.client.delete(key.DATA_PARTITION_COUNT_KEY.get_key(strategy_id=1))
+
+    def test_partition_lock(self):
+        from alarm_backends.core.cache import key
+
+        with mock.patch(
+            "alarm_backends.core.cache.strategy.StrategyCacheManager.get_strategy_by_id",
+            return_value=copy.deepcopy(strategy_config),
+        ):
+            key.DATA_PARTITION_COUNT_KEY.client.set(key.DATA_PARTITION_COUNT_KEY.get_key(strategy_id=1), 2)
+
+            # 非分区处理进行中，分区处理无法获取锁
+            with DetectProcess("1").get_lock():
+                with pytest.raises(LockError):
+                    with DetectProcess("1", partition=0).get_lock():
+                        pass
+
+            # 分区处理进行中，非分区处理无法获取锁，其他分区可并行处理
+            with DetectProcess("1", partition=0).get_lock():
+                with pytest.raises(LockError):
+                    with DetectProcess("1").get_lock():
+                        pass
+                with DetectProcess("1", partition=1).get_lock():
+                    pass
+            key.DATA_PARTITION_COUNT_KEY.client.delete(key.DATA_PARTITION_COUNT_KEY.get_key(strategy_id=1))
+
     def test_check_result_pipeline(self):
         redis_pipeline = CheckResult(strategy_id=1, item_id=2, dimensions_md5="md5_str", level="1").pipeline()
         assert redis_pipeline is CheckResult(strategy_id=1, item_id=2, dimensions_md5="md5_str", level="1").CHECK_RESULT
@@ -259,3 +259,58 @@ class TestThreshold(object):
 
         anomaly_records = detect_engine.detect_records([datapoint], 1)
         assert anomaly_records[0].anomaly_message == "avg(测试指标) >= 1.0KiB, 当前值1.000977KiB"
+
+    def test_filter_candidates(self, settings):
+        settings.ENABLE_DETECT_BATCH_PREFILTER = True
+        data_points = [datapoint99, datapoint50, datapoint6, datapoint_example]
+        configs = [
+            ([[{"threshold": 50.0, "method": "gte"}]], [datapoint99, datapoint50]),
+            ([[{"threshold": 50.0, "method": "lt"}]], [datapoint6, datapoint_example]),
+            ([[{"threshold": 6, "method": "gt"}, {"threshold": 99, "method": "lte"}]], [datapoint99, datapoint50]),
+            ([[{"threshold": 99, "method": "gte"}], [{"threshold": 6, "method": "eq"}]], [datapoint99, datapoint6]),
+            # 不支持预筛选的比较方法，全部走表达式检测
+            ([[{"threshold": 50.0, "method": "neq"}]], data_points),
+        ]
+        for algorithms_config, candidates in configs:
+            detect_engine = Threshold(config=algorithms_config)
+            assert detect_engine.filter_candidates(data_points) == candidates
+            # 预筛选后的检测结果与逐点检测一致
+            expected = [dp for dp in data_points if detect_engine.detect(dp)]
+            assert [ap.data_point for ap in detect_engine.detect_records(data_points, 1)] == expected
+
+    def test_filter_candidates_disabled(self, settings):
+        settings.ENABLE_DETECT_BATCH_PREFILTER = False
+        data_points = [datapoint99, datapoint50, datapoint6, datapoint_example]
+        detect_engine = Threshold(config=[[{"threshold": 50.0, "method": "gte"}]])
+        assert detect_engine.filter_candidates(data_points) == data_points
+
+    def test_filter_candidates_mixed_unit(self, settings):
+        settings.ENABLE_DETECT_BATCH_PREFILTER = True
+        bytes_item = Item(
+            1,
+            Strategy(1, "os"),
+            "bytes",
+            [mocked_data_source],
+            ["system.cpu_summary"],
+            item_config["query_configs"],
+            mock_unify_query,
+        )
+        data_points = [
+            DataPoint(
+                {
+                    "record_id": "342a08e0f85f169a7e099c18db3708ed",
+                    "value": value,
+                    "values": {"timestamp": 1569246480, "load5": value},
+                    "dimensions": {"ip": "127.0.0.1"},
+                    "time": 1569246480,
+                },
+                item,
+            )
+            for value, item in [(1025, bytes_item), (2, mocked_item), (1023, bytes_item)]
+        ]
+
+        # 每个数据点按各自的单位换算后再与阈值比较
+        detect_engine = Threshold(config=[[{"threshold": 1, "method": "gte"}]], unit="Ki")
+        candidates = detect_engine.filter_candidates(data_points)
+        assert candidates == [dp for dp in data_points if detect_engine.detect(dp)]
+        assert data_points[0] in candidates and data_points[2] not in candidates
@@ -34,6 +34,7 @@ pytestmark = pytest.mark.django_db
 from alarm_backends.core.cache.assign import AssignCacheManager
 from alarm_backends.service.fta_action.tasks.alert_assign import (
     AlertAssigneeManager,
+    AssignRuleIndex,
     AssignRuleMatch,
     BackendAssignMatchManager,
 )
@@ -664,6 +665,38 @@ class TestAlertAssignRule:
         snap_rule["user_groups"] = [1]
         assert AssignRuleMatch(rule, assign_rule_snap=snap_rule).is_changed
 
+    def test_rule_index(self):
+        rules = [
+            {"id": 1, "conditions": [{"field": "ip", "value": ["127.0.0.1"], "method": "eq"}]},
+            {
+                "id": 2,
+                "conditions": [
+                    {"field": "alert.name", "value": ["CPU"], "method": "include"},
+                    {"field": "bk_biz_id", "value": ["2"], "method": "eq", "condition": "and"},
+                    {"field": "tags.env", "value": ["prod"], "method": "eq", "condition": "or"},
+                ],
+            },
+            {"id": 3, "conditions": [{"field": "alert.name", "value": ["CPU"], "method": "reg"}]},
+            {
+                "id": 4,
+                "conditions": [{"field": "ip", "value": [{"ip": "127.0.0.1", "bk_cloud_id": 0}], "method": "eq"}],
+            },
+        ]
+        rule_index = AssignRuleIndex(rules)
+        # 正则条件及ip字典配置无法索引，需线性匹配
+        assert set(rule_index.indexed_conditions) == {1, 2}
+
+        candidates = rule_index.get_candidates({"ip": " 127.0.0.1 ", "bk_biz_id": 3})
+        assert [rule["id"] for rule in rules if rule_index.is_candidate(rule, candidates)] == [1, 3, 4]
+
+        candidates = rule_index.get_candidates({"tags.env": "prod"})
+        assert [rule["id"] for rule in rules if rule_index.is_candidate(rule, candidates)] == [2, 3, 4]
+
+        # 规则条件在建立索引后发生变化，需重新匹配
+        changed_rule = copy.deepcopy(rules[0])
+        changed_rule["conditions"][0]["value"] = ["127.0.0.2"]
+        assert rule_index.is_candidate(changed_rule, set())
+
     def test_is_upgrade(self, alert):
         rule = {
             "id": 1,
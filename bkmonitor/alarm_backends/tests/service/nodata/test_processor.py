@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import json
+
+import mock
+import pytest
+
+from alarm_backends.core.cache import key
+from alarm_backends.service.nodata.processor import CheckProcessor
+from bkmonitor.utils.common_utils import count_md5
+
+STRATEGY_ID = 1
+ITEM_ID = 1
+CHECK_TIMESTAMP = 120
+
+
+def push_presence(timestamp, dimensions_list):
+    presence_key = key.NO_DATA_PRESENCE_KEY.get_key(strategy_id=STRATEGY_ID, item_id=ITEM_ID, timestamp=timestamp)
+    periods_key = key.NO_DATA_PRESENCE_PERIODS_KEY.get_key(strategy_id=STRATEGY_ID, item_id=ITEM_ID)
+    key.NO_DATA_PRESENCE_KEY.client.hmset(
+        presence_key, {count_md5(dimensions): json.dumps(dimensions) for dimensions in dimensions_list}
+    )
+    key.NO_DATA_PRESENCE_PERIODS_KEY.client.zadd(periods_key, {str(timestamp): timestamp})
+
+
+def push_queue(timestamp, dimensions):
+    record = {
+        "record_id": "{}.{}".format(count_md5(dimensions), timestamp),
+        "value": 1,
+        "values": {"value": 1},
+        "dimensions": dimensions,
+        "time": timestamp,
+    }
+    data_channel = key.NO_DATA_LIST_KEY.get_key(strategy_id=STRATEGY_ID, item_id=ITEM_ID)
+    key.NO_DATA_LIST_KEY.client.lpush(data_channel, json.dumps(record))
+
+
+def pending_periods():
+    periods_key = key.NO_DATA_PRESENCE_PERIODS_KEY.get_key(strategy_id=STRATEGY_ID, item_id=ITEM_ID)
+    return [int(period) for period in key.NO_DATA_PRESENCE_PERIODS_KEY.client.zrange(periods_key, 0, -1)]
+
+
+class TestPullPresenceData(object):
+    @pytest.fixture(autouse=True)
+    def init_data(self, settings):
+        settings.ENABLE_NODATA_PRESENCE_INDEX = True
+        periods_key = key.NO_DATA_PRESENCE_PERIODS_KEY.get_key(strategy_id=STRATEGY_ID, item_id=ITEM_ID)
+        for timestamp in key.NO_DATA_PRESENCE_PERIODS_KEY.client.zrange(periods_key, 0, -1):
+            key.NO_DATA_PRESENCE_KEY.client.delete(
+                key.NO_DATA_PRESENCE_KEY.get_key(strategy_id=STRATEGY_ID, item_id=ITEM_ID, timestamp=timestamp)
+            )
+        key.NO_DATA_PRESENCE_PERIODS_KEY.client.delete(periods_key)
+        key.NO_DATA_LIST_KEY.client.delete(key.NO_DATA_LIST_KEY.get_key(strategy_id=STRATEGY_ID, item_id=ITEM_ID))
+
+        self.item = mock.MagicMock(id=ITEM_ID)
+        self.processor = CheckProcessor.__new__(CheckProcessor)
+        self.processor.strategy_id = STRATEGY_ID
+        self.processor.inputs = {}
+
+    def pull(self):
+        self.processor.pull_data(self.item, CHECK_TIMESTAMP)
+        return sorted((point.timestamp, point.dimensions["ip"]) for point in self.processor.inputs[ITEM_ID])
+
+    def test_pull_past_periods(self):
+        push_presence(60, [{"ip": "127.0.0.1"}, {"ip": "127.0.0.2"}])
+        push_presence(120, [{"ip": "127.0.0.1"}])
+        push_presence(240, [{"ip": "127.0.0.1"}])
+
+        assert self.pull() == [(60, "127.0.0.1"), (60, "127.0.0.2"), (120, "127.0.0.1")]
+        # 未来周期保留，已消费的维度集合被删除
+        assert pending_periods() == [240]
+        presence_key = key.NO_DATA_PRESENCE_KEY.get_key(strategy_id=STRATEGY_ID, item_id=ITEM_ID, timestamp=60)
+        assert not key.NO_DATA_PRESENCE_KEY.client.exists(presence_key)
+
+    def test_pull_earliest_future_period(self):
+        push_presence(240, [{"ip": "127.0.0.1"}])
+        push_presence(300, [{"ip": "127.0.0.2"}])
+
+        assert self.pull() == [(240, "127.0.0.1")]
+        assert pending_periods() == [300]
+
+    def test_merge_queue_same_future_period(self):
+        # 切换期间队列中遗留未来周期数据，只合并维度索引中同一周期的数据
+        push_queue(300, {"ip": "127.0.0.1"})
+        push_presence(300, [{"ip": "127.0.0.2"}])
+        push_presence(360, [{"ip": "127.0.0.3"}])
+
+        assert self.pull() == [(300, "127.0.0.1"), (300, "127.0.0.2")]
+        assert pending_periods() == [360]
+
+    def test_queue_past_skip_future_period(self):
+        push_queue(60, {"ip": "127.0.0.1"})
+        push_presence(240, [{"ip": "127.0.0.2"}])
+
+        assert self.pull() == [(60, "127.0.0.1")]
+        assert pending_periods() == [240]
+
+    def test_no_data(self):
+        assert self.pull() == []
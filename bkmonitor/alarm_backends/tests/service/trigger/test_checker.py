@@ -473,3 +473,22 @@ class TestChecker(TestCase):
         anomaly_records, event_record = checker.check()
         self.assertEqual(len(anomaly_records), 3)
         self.assertEqual(event_record["trigger"]["level"], "2")
+
+    def test_prefetch_check_results(self):
+        for anomaly_count in CHECK_RESULT_SETS:
+            self.clear_check_result()
+            self.insert_check_result(anomaly_count)
+
+            point = copy.deepcopy(POINT)
+            earlier_point = copy.deepcopy(POINT)
+            earlier_point["data"]["time"] = 1569246360
+            for level, anomaly in earlier_point["anomaly"].items():
+                anomaly["anomaly_id"] = "55a76cf628e46c04a052f4e19bdb9dbf.1569246360.1.1.{}".format(level)
+
+            expected = [AnomalyChecker(p, STRATEGY, 1).check_anomaly() for p in [point, earlier_point]]
+
+            checkers = [AnomalyChecker(p, STRATEGY, 1) for p in [point, earlier_point]]
+            check_results_cache = AnomalyChecker.prefetch_check_results(checkers)
+            # 同一维度同一级别的窗口只查询一次
+            self.assertEqual(len(check_results_cache), 3)
+            self.assertListEqual([checker.check_anomaly() for checker in checkers], expected)
@@ -23,6 +23,7 @@ from alarm_backends.core.cache.key import (
     ANOMALY_SIGNAL_KEY,
     TRIGGER_EVENT_LIST_KEY,
 )
+from alarm_backends.core.control.strategy import StrategySnapshot
 from alarm_backends.core.storage.redis_cluster import get_node_by_strategy_id
 from alarm_backends.service.trigger.processor import TriggerProcessor
 from bkmonitor.models import AnomalyRecord, CacheNode, time_tools
@@ -123,7 +124,7 @@ class TestProcessor(TestCase):
     def setUpClass(cls):
         cls.Strategy = mock.patch("alarm_backends.service.trigger.processor.Strategy")
         mock_strategy = cls.Strategy.start()
-        mock_strategy.get_strategy_snapshot_by_key.side_effect = lambda key, _: STRATEGY if key == "xxx" else None
+        mock_strategy.get_snapshot.side_effect = lambda key, _: StrategySnapshot(STRATEGY) if key == "xxx" else None
 
         cls.check_func = mock.patch("alarm_backends.service.trigger.processor.AnomalyChecker.check")
         mock_check = cls.check_func.start()
@@ -199,6 +200,15 @@ class TestProcessor(TestCase):
         processor.process_point(json.dumps(POINT))
         self.assertEqual(len(processor.event_records), 1)
 
+    def test_process_points_batch_prefetch_error(self):
+        processor = TriggerProcessor(1, 1)
+        with mock.patch(
+            "alarm_backends.service.trigger.processor.AnomalyChecker.prefetch_check_results",
+            side_effect=Exception("redis error"),
+        ):
+            processor.process_points_batch([json.dumps(POINT), json.dumps(POINT)])
+        self.assertEqual(len(processor.event_records), 2)
+
     def test_process(self):
         processor = TriggerProcessor(1, 1)
         setattr(processor.strategy, "in_alarm_time", lambda: (True, None))
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import mock
+from django.test import TestCase, override_settings
+
+from alarm_backends.service.trigger.scheduler import TriggerBatchScheduler
+
+
+@override_settings(TRIGGER_BATCH_MIN_SIZE=10, TRIGGER_BATCH_MAX_SIZE=1000, TRIGGER_BATCH_TIME_SLICE=2)
+class TestTriggerBatchScheduler(TestCase):
+    def test_get_batch_size(self):
+        scheduler = TriggerBatchScheduler()
+        # 没有历史耗时时按下限拉取
+        self.assertEqual(scheduler.get_batch_size("1.1", 5000), 10)
+        self.assertEqual(scheduler.get_batch_size("1.1", 3), 3)
+
+        # 单点耗时 10ms，时间片内可处理 200 个
+        scheduler.record("1.1", 10, 0.1)
+        self.assertEqual(scheduler.get_batch_size("1.1", 5000), 200)
+
+        # 处理很快时不超过上限
+        scheduler.record("1.2", 1000, 0.001)
+        self.assertEqual(scheduler.get_batch_size("1.2", 5000), 1000)
+
+    def test_record_smoothing(self):
+        scheduler = TriggerBatchScheduler()
+        scheduler.record("1.1", 10, 0.1)
+        scheduler.record("1.1", 10, 0.2)
+        self.assertAlmostEqual(scheduler._costs.get("1.1"), 0.3 * 0.02 + 0.7 * 0.01)
+
+    def test_run_time_slice(self):
+        scheduler = TriggerBatchScheduler()
+        processor = mock.MagicMock(strategy_id=1, item_id=1, anomaly_list_key="detect.anomaly.list.1.1")
+        processor.process.side_effect = lambda count: count
+
+        with mock.patch("alarm_backends.service.trigger.scheduler.ANOMALY_LIST_KEY") as list_key, mock.patch(
+            "alarm_backends.service.trigger.scheduler.ANOMALY_SIGNAL_KEY"
+        ) as signal_key, mock.patch("alarm_backends.service.trigger.scheduler.time") as mock_time:
+            list_key.client.llen.side_effect = [50, 40]
+            mock_time.time.side_effect = [0, 0, 1, 1, 1, 3, 3]
+            scheduler.run(processor)
+
+        # 第二批次处理后时间片耗尽，信号放回队尾
+        self.assertEqual(processor.process.call_count, 2)
+        signal_key.client.lpush.assert_called_once_with(signal_key.get_key(), "1.1")
+
+    @override_settings(TRIGGER_SIGNAL_COALESCE_SIZE=10)
+    def test_coalesce_signal(self):
+        from alarm_backends.core.cache.key import ANOMALY_SIGNAL_KEY
+
+        signal_key = ANOMALY_SIGNAL_KEY.get_key()
+        ANOMALY_SIGNAL_KEY.client.delete(signal_key)
+        ANOMALY_SIGNAL_KEY.client.lpush(signal_key, "1.1", "2.1", "1.1", "3.1")
+
+        self.assertEqual(TriggerBatchScheduler.coalesce_signal("1.1"), 2)
+        # 只移除重复信号，其他策略的信号保留在队列中且顺序不变
+        self.assertEqual(ANOMALY_SIGNAL_KEY.client.lrange(signal_key, 0, -1), ["3.1", "2.1"])
+        self.assertEqual(TriggerBatchScheduler.coalesce_signal("1.1"), 0)
+        ANOMALY_SIGNAL_KEY.client.delete(signal_key)
+
+    @override_settings(TRIGGER_SIGNAL_COALESCE_SIZE=0)
+    def test_coalesce_signal_disabled(self):
+        with mock.patch("alarm_backends.service.trigger.scheduler.ANOMALY_SIGNAL_KEY") as signal_key:
+            self.assertEqual(TriggerBatchScheduler.coalesce_signal("1.1"), 0)
+        signal_key.client.lrem.assert_not_called()
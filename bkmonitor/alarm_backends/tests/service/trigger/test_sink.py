@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import json
+
+import mock
+from django.test import TestCase
+
+from alarm_backends.service.trigger import sink as sink_module
+from alarm_backends.service.trigger.sink import (
+    AnomalyRecordData,
+    AnomalyRecordSink,
+    KafkaAnomalyRecordSink,
+    MySQLAnomalyRecordSink,
+    NullAnomalyRecordSink,
+    get_anomaly_record_sink,
+)
+from bkmonitor.models import AnomalyRecord
+
+ORIGIN_ALARM = {"data": {"record_id": "55a76cf628e46c04a052f4e19bdb9dbf.1569246480"}, "anomaly": {}}
+
+
+def make_records(count, origin_alarm=ORIGIN_ALARM):
+    return [
+        AnomalyRecordData(
+            anomaly_id="55a76cf628e46c04a052f4e19bdb9dbf.1569246480.1.1.{}".format(i),
+            source_time="2019-09-23 13:48:00",
+            strategy_id=1,
+            origin_alarm=origin_alarm,
+        )
+        for i in range(count)
+    ]
+
+
+class RecordingSink(AnomalyRecordSink):
+    name = "recording"
+
+    def __init__(self, *args, **kwargs):
+        super(RecordingSink, self).__init__(*args, **kwargs)
+        self.batches = []
+
+    def write(self, records):
+        self.batches.append(records)
+
+
+class TestAnomalyRecordSink(TestCase):
+    def tearDown(self):
+        AnomalyRecord.objects.all().delete()
+        sink_module._sink = None
+
+    def test_flush_by_batch_size(self):
+        sink = RecordingSink(batch_size=3, max_latency=60)
+        sink.put(make_records(2))
+        self.assertEqual(sink.batches, [])
+        sink.put(make_records(5))
+        # 达到批量大小后整批写出，超出部分按批量大小切分
+        self.assertEqual([len(batch) for batch in sink.batches], [3, 3, 1])
+        self.assertEqual(sink.buffer, [])
+
+    def test_flush_by_latency(self):
+        sink = RecordingSink(batch_size=100, max_latency=5)
+        with mock.patch("alarm_backends.service.trigger.sink.time.time", return_value=100):
+            sink.put(make_records(2))
+        with mock.patch("alarm_backends.service.trigger.sink.time.time", return_value=104):
+            sink.flush_if_due()
+        self.assertEqual(sink.batches, [])
+        with mock.patch("alarm_backends.service.trigger.sink.time.time", return_value=105):
+            sink.flush_if_due()
+        self.assertEqual([len(batch) for batch in sink.batches], [2])
+
+    def test_write_error(self):
+        sink = RecordingSink(batch_size=2, max_latency=5)
+        with mock.patch.object(sink, "write", side_effect=Exception("error")):
+            sink.put(make_records(2))
+        # 写出失败的批次被丢弃
+        self.assertEqual(sink.buffer, [])
+
+    def test_null_sink(self):
+        sink = NullAnomalyRecordSink(batch_size=1, max_latency=0)
+        sink.put(make_records(2))
+        self.assertEqual(sink.buffer, [])
+
+    def test_mysql_sink(self):
+        sink = MySQLAnomalyRecordSink(batch_size=10, max_latency=5)
+        sink.put(make_records(3))
+        sink.flush()
+        # 重复的异常ID被忽略
+        sink.put(make_records(4))
+        sink.flush()
+        self.assertEqual(AnomalyRecord.objects.count(), 4)
+
+    def test_kafka_sink(self):
+        sink = KafkaAnomalyRecordSink(batch_size=10, max_latency=5, topic="test")
+        sink._kafka_queue = mock.MagicMock()
+        records = make_records(2)
+        sink.put(records)
+        sink.flush()
+        messages = sink._kafka_queue.put.call_args[1]["value"]
+        self.assertEqual(len(messages), 2)
+        message = json.loads(messages[0].decode("utf-8"))
+        self.assertEqual(message["anomaly_id"], records[0].anomaly_id)
+        self.assertEqual(message["origin_alarm"], ORIGIN_ALARM)
+
+    def test_get_anomaly_record_sink(self):
+        with self.settings(TRIGGER_ANOMALY_SINK="off"):
+            self.assertIsInstance(get_anomaly_record_sink(), NullAnomalyRecordSink)
+            self.assertIs(get_anomaly_record_sink(), get_anomaly_record_sink())
+        with self.settings(TRIGGER_ANOMALY_SINK="mysql"):
+            self.assertIsInstance(get_anomaly_record_sink(), MySQLAnomalyRecordSink)
+
+    def test_get_anomaly_record_sink_topic_changed(self):
+        with self.settings(TRIGGER_ANOMALY_SINK="kafka", TRIGGER_ANOMALY_SINK_KAFKA_TOPIC="topic1"):
+            sink = get_anomaly_record_sink()
+            self.assertEqual(sink.topic, "topic1")
+            sink._kafka_queue = mock.MagicMock()
+            sink.put(make_records(1))
+        # topic 变更后先写出旧缓冲区，再按新 topic 重建
+        with self.settings(TRIGGER_ANOMALY_SINK="kafka", TRIGGER_ANOMALY_SINK_KAFKA_TOPIC="topic2"):
+            new_sink = get_anomaly_record_sink()
+            self.assertIsNot(new_sink, sink)
+            self.assertEqual(new_sink.topic, "topic2")
+        sink._kafka_queue.put.assert_called_once()
+
+    def test_flush_on_exit(self):
+        sink = RecordingSink(batch_size=100, max_latency=60)
+        sink.put(make_records(2))
+        sink_module._sink = sink
+        sink_module.flush_anomaly_record_sink()
+        self.assertEqual([len(batch) for batch in sink.batches], [2])
+
+        # 写出失败不影响进程退出
+        sink_module._sink = mock.MagicMock(flush=mock.MagicMock(side_effect=Exception("error")))
+        sink_module.flush_anomaly_record_sink()
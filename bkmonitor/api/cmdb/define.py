@@ -63,6 +63,13 @@ class BaseNode:
     def __setitem__(self, key, value):
         setattr(self, key, value)
 
+    def __copy__(self):
+        # 浅拷贝时同时复制扩展属性，避免修改副本影响原对象
+        obj = self.__class__.__new__(self.__class__)
+        obj.__dict__.update(self.__dict__)
+        super(BaseNode, obj).__setattr__("_extra_attr", dict(self._extra_attr))
+        return obj
+
 
 class TopoNode(object):
     """
@@ -625,6 +625,9 @@ class FetchK8sClusterListResource(CacheResource):
     """获得BCS集群列表 ."""
 
     cache_type = CacheType.BCS
+    # 集群列表变化不频繁，过期后短时间内可返回旧数据并后台刷新
+    cache_single_flight = True
+    cache_stale_ttl = 60
 
     class RequestSerializer(serializers.Serializer):
         bk_biz_id = serializers.IntegerField(required=False, allow_null=True, label="业务ID")
@@ -773,6 +776,8 @@ class FetchK8sClusterListResource(CacheResource):
 
 class FetchK8sServiceListByClusterResource(CacheResource):
     cache_type = CacheType.BCS
+    # 集群资源列表查询耗时较长，缓存未命中时只允许一个进程查询
+    cache_single_flight = True
 
     class RequestSerializer(serializers.Serializer):
         bcs_cluster_id = serializers.CharField(required=True, label="集群ID")
@@ -1065,6 +1070,8 @@ class FetchK8sPodMonitorListByClusterResource(CacheResource):
 
 class FetchK8sEndpointListByClusterResource(CacheResource):
     cache_type = CacheType.BCS
+    # 集群资源列表查询耗时较长，缓存未命中时只允许一个进程查询
+    cache_single_flight = True
 
     class RequestSerializer(serializers.Serializer):
         bcs_cluster_id = serializers.CharField(required=True, label="集群ID")
@@ -1142,6 +1149,8 @@ class FetchK8sContainerListByClusterResource(CacheResource):
 
 class FetchK8sNodeListByClusterResource(CacheResource):
     cache_type = CacheType.BCS
+    # 集群资源列表查询耗时较长，缓存未命中时只允许一个进程查询
+    cache_single_flight = True
 
     class RequestSerializer(serializers.Serializer):
         bcs_cluster_id = serializers.CharField(required=True, label="集群ID")
@@ -1281,6 +1290,8 @@ class FetchK8sWorkloadTypeListResource(Resource):
 
 class FetchK8sWorkloadListByClusterResource(CacheResource):
     cache_type = CacheType.BCS
+    # 集群资源列表查询耗时较长，缓存未命中时只允许一个进程查询
+    cache_single_flight = True
 
     class RequestSerializer(serializers.Serializer):
         bcs_cluster_id = serializers.CharField(required=True, label="集群ID")
@@ -18,7 +18,13 @@ from django.utils.translation import ugettext as _
 
 from bkmonitor.documents import AlertDocument, AlertLog
 from bkmonitor.utils.common_utils import count_md5
-from bkmonitor.utils.range import load_condition_instance
+from bkmonitor.utils.range import (
+    CONDITION_CLASS_MAP,
+    DEFAULT_DIMENSION_FIELD_CLASS,
+    DIMENSION_FIELD_CLASS_MAP,
+    compile_condition_instance,
+    fields,
+)
 from constants.action import ActionPluginType, AssignMode, UserGroupType
 from constants.alert import EVENT_SEVERITY_DICT
 
@@ -90,16 +96,24 @@ class AssignRuleMatch:
         根据配置的条件信息获取
         :return:
         """
+        or_cond = self.split_conditions(self.assign_rule["conditions"])
+        self.dimension_check = compile_condition_instance(or_cond, False)
+
+    @staticmethod
+    def split_conditions(conditions):
+        """
+        将规则条件按 or 拆分为多组 and 条件
+        """
         or_cond = []
         and_cond = []
-        for condition in self.assign_rule["conditions"]:
+        for condition in conditions:
             if condition.get("condition") == "or" and and_cond:
                 or_cond.append(and_cond)
                 and_cond = []
             and_cond.append(condition)
         if and_cond:
             or_cond.append(and_cond)
-        self.dimension_check = load_condition_instance(or_cond, False)
+        return or_cond
 
     def assign_group(self):
         return {"group_id": self.assign_rule["assign_group_id"]}
@@ -250,6 +264,93 @@ class AssignRuleMatch:
         return self.assign_rule.get("user_type", UserGroupType.MAIN)
 
 
+class AssignRuleIndex:
+    """
+    分派规则倒排索引
+    以规则中 eq 条件的维度值为索引，告警仅需与维度值命中的候选规则进行完整匹配
+    每组 and 条件中至少有一个可索引的 eq 条件时，规则才会进入索引，否则始终作为候选规则(线性匹配)
+    """
+
+    # 维度取值方式与默认字段一致的字段类型(配置值中不包含字典时)
+    INDEXABLE_FIELD_CLASSES = (fields.IpDimensionField, fields.BkTargetIpDimensionField)
+
+    def __init__(self, rules):
+        # {field: {value: {rule_id}}}
+        self.index = defaultdict(lambda: defaultdict(set))
+        self.field_classes = {}
+        # 已索引规则的条件配置，用于判断规则是否在索引建立后发生了变化
+        self.indexed_conditions = {}
+        for rule in rules:
+            self.add_rule(rule)
+
+    @classmethod
+    def get_index_condition(cls, condition):
+        """
+        获取条件的索引字段及值，不可索引时返回None
+        与 load_condition_instance 保持一致的方法转换及无效条件过滤逻辑
+        """
+        field_name = condition.get("field")
+        method = condition.get("method", "eq")
+        if method not in CONDITION_CLASS_MAP:
+            method = condition.get("_origin_method", "eq")
+        field_value = condition.get("value")
+        if method != "eq" or not all([field_name, method, field_value]):
+            return
+
+        field_class = DIMENSION_FIELD_CLASS_MAP.get(field_name, DEFAULT_DIMENSION_FIELD_CLASS)
+        values = field_value if isinstance(field_value, (list, tuple)) else [field_value]
+        if field_class is not DEFAULT_DIMENSION_FIELD_CLASS:
+            if field_class not in cls.INDEXABLE_FIELD_CLASSES or any(isinstance(v, dict) for v in values):
+                return
+        return field_name, field_class, field_class.value_to_str_list(field_value)
+
+    def add_rule(self, rule):
+        index_conditions = []
+        for and_cond in AssignRuleMatch.split_conditions(rule.get("conditions") or []):
+            for condition in and_cond:
+                index_condition = self.get_index_condition(condition)
+                if index_condition:
+                    index_conditions.append(index_condition)
+                    break
+            else:
+                # 存在无法索引的条件组，该规则需要线性匹配
+                return
+
+        if not index_conditions:
+            return
+
+        rule_id = rule["id"]
+        for field_name, field_class, values in index_conditions:
+            self.field_classes[field_name] = field_class
+            for value in values:
+                self.index[field_name][value].add(rule_id)
+        self.indexed_conditions[rule_id] = rule["conditions"]
+
+    def get_candidates(self, dimensions):
+        """
+        获取维度值命中索引的规则ID
+        """
+        candidates = set()
+        for field_name, value_index in self.index.items():
+            if field_name not in dimensions:
+                continue
+            for value in self.field_classes[field_name].value_to_str_list(dimensions[field_name]):
+                rule_ids = value_index.get(value)
+                if rule_ids:
+                    candidates.update(rule_ids)
+        return candidates
+
+    def is_candidate(self, rule, candidates):
+        """
+        判断规则是否需要进行完整匹配
+        未索引或条件已变化的规则均需要匹配
+        """
+        rule_id = rule["id"]
+        if rule_id not in self.indexed_conditions or self.indexed_conditions[rule_id] != rule["conditions"]:
+            return True
+        return rule_id in candidates
+
+
 class AlertAssignMatchManager:
     """
     告警分派管理
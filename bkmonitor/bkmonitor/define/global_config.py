@@ -300,6 +300,8 @@ ADVANCED_OPTIONS = OrderedDict(
         ("DEFAULT_VM_DATA_LINK_NAMESPACE", slz.CharField(label="创建计算平台链路资源所属的命名空间", default="bkmonitor")),
         ("ACCESS_DATA_BATCH_PROCESS_THRESHOLD", slz.IntegerField(label="access数据批量处理触发阈值(0为不触发)", default=0)),
         ("ACCESS_DATA_BATCH_PROCESS_SIZE", slz.IntegerField(label="access数据批量处理单次处理量", default=50000)),
+        ("ENABLE_ACCESS_STREAM_PULL", slz.BooleanField(label="access超量策略组是否按时间分页拉取", default=False)),
+        ("ACCESS_DATA_STREAM_PAGE_PERIODS", slz.IntegerField(label="access分页拉取每页聚合周期数", default=1)),
         ("BASE64_ENCODE_TRIGGER_CHARS", slz.ListField(label="需要base64编码的特殊字符", default=[])),
         ("BK_DATA_RECORD_RULE_PROJECT_ID", slz.IntegerField(label="监控使用计算平台的预计算流程的公共项目ID", default=1)),
         ("ENABLE_DATA_LABEL_EXPORT", slz.BooleanField(label="grafana和策略导出是否支持data_label转换", default=True)),
@@ -307,6 +309,63 @@ ADVANCED_OPTIONS = OrderedDict(
         ("SKIP_INFLUXDB_TABLE_ID_LIST", slz.BooleanField(label="跳过写入influxdb的结果表列表", default=[])),
         ("ENABLE_UPTIMECHECK_TEST", slz.BooleanField(label="是否开启拨测联通性测试", default=True)),
         ("CHECK_RESULT_TTL_HOURS", slz.CharField(label="检测结果缓存 TTL(小时)", default=1)),
+        ("ENABLE_TRIGGER_BATCH_CHECK", slz.BooleanField(label="是否启用trigger批量检测", default=False)),
+        ("ENABLE_ACCESS_RECORD_BATCH", slz.BooleanField(label="是否启用access待检测数据列式批量格式", default=False)),
+        ("ACCESS_RECORD_BATCH_COMPRESS", slz.BooleanField(label="access待检测数据列式批量格式是否压缩", default=True)),
+        ("ENABLE_DETECT_BATCH_PREFILTER", slz.BooleanField(label="是否启用detect静态阈值算法批量预筛选", default=False)),
+        ("CMDB_LOCAL_CACHE_SIZE", slz.IntegerField(label="CMDB对象进程内LRU缓存容量", default=10000)),
+        ("CMDB_LOCAL_CACHE_CHECK_INTERVAL", slz.IntegerField(label="CMDB对象进程内缓存版本检查间隔(秒)", default=10)),
+        (
+            "ACCESS_DUPLICATE_MODE",
+            slz.ChoiceField(label="access数据去重模式", default="set", choices=("set", "fingerprint")),
+        ),
+        ("ACCESS_DUPLICATE_FALSE_POSITIVE_RATE", slz.FloatField(label="access指纹去重误判率预算", default=0.000001)),
+        ("ACCESS_DUPLICATE_CAPACITY", slz.IntegerField(label="access指纹去重单时间点预估记录数", default=1000000)),
+        (
+            "DISPATCH_HASH_RING_FUNC",
+            slz.ChoiceField(label="任务分配哈希环算法", default="md5", choices=("md5", "crc32")),
+        ),
+        (
+            "DETECT_HISTORY_LOCAL_CACHE_BYTES",
+            slz.IntegerField(label="detect历史数据进程内缓存最大字节数", default=64 * 1024 * 1024),
+        ),
+        ("DETECT_HISTORY_LOCAL_CACHE_MIN_AGE", slz.IntegerField(label="detect历史数据进程内缓存最小时长(秒)", default=600)),
+        ("DETECT_HISTORY_LOCAL_CACHE_TTL", slz.IntegerField(label="detect历史数据进程内缓存过期时间(秒)", default=300)),
+        ("DETECT_PARTITION_STRATEGIES", slz.JSONField(label="detect分区处理的策略及分区数", default={})),
+        ("DELAY_QUEUE_SHARD_COUNT", slz.IntegerField(label="延时队列分片数", default=1)),
+        ("DELAY_QUEUE_DISPATCH_BATCH_SIZE", slz.IntegerField(label="延时队列单批投递任务数", default=1000)),
+        ("DELAY_QUEUE_POLL_INTERVAL", slz.FloatField(label="延时队列最长轮询间隔(秒)", default=1)),
+        ("ENABLE_NODATA_PRESENCE_INDEX", slz.BooleanField(label="是否启用无数据检测维度存在索引", default=False)),
+        (
+            "TRIGGER_ANOMALY_SINK",
+            slz.ChoiceField(label="trigger异常记录写出方式", default="off", choices=("off", "mysql", "kafka")),
+        ),
+        ("TRIGGER_ANOMALY_SINK_BATCH_SIZE", slz.IntegerField(label="trigger异常记录单批次最大条数", default=500)),
+        ("TRIGGER_ANOMALY_SINK_MAX_LATENCY", slz.IntegerField(label="trigger异常记录缓冲最长停留时间(秒)", default=5)),
+        ("ENABLE_STRATEGY_CACHE_INCREMENTAL_REFRESH", slz.BooleanField(label="是否启用策略缓存增量刷新", default=False)),
+        (
+            "STRATEGY_SNAPSHOT_LOCAL_CACHE_BYTES",
+            slz.IntegerField(label="进程内策略快照缓存最大字节数", default=64 * 1024 * 1024),
+        ),
+        ("ENABLE_TRIGGER_ADAPTIVE_BATCH", slz.BooleanField(label="是否启用trigger自适应批量调度", default=False)),
+        ("TRIGGER_BATCH_MIN_SIZE", slz.IntegerField(label="trigger单批次拉取异常点数量下限", default=100)),
+        ("TRIGGER_BATCH_MAX_SIZE", slz.IntegerField(label="trigger单批次拉取异常点数量上限", default=5000)),
+        ("TRIGGER_BATCH_TIME_SLICE", slz.FloatField(label="trigger单个策略单次调度时间片(秒)", default=2)),
+        ("TRIGGER_SIGNAL_COALESCE_SIZE", slz.IntegerField(label="trigger单次最多合并重复异常信号数量", default=100)),
+        ("METRIC_PUSH_INTERVAL", slz.IntegerField(label="指标后台合并上报间隔(秒)", default=0)),
+        ("API_HTTP_POOL_MAXSIZE", slz.IntegerField(label="API调用共享连接池每个上游地址的最大连接数", default=20)),
+        ("API_HTTP_MAX_RETRIES", slz.IntegerField(label="API调用建立连接失败时的重试次数", default=1)),
+        ("API_HTTP_CONNECT_TIMEOUT", slz.IntegerField(label="API调用建立连接超时时间(秒)", default=0)),
+        ("ENABLE_API_SINGLE_FLIGHT", slz.BooleanField(label="是否合并并发的相同API GET请求", default=False)),
+        (
+            "ENABLE_TIME_SERIES_METRIC_INCREMENTAL_SYNC",
+            slz.BooleanField(label="是否启用自定义指标增量同步", default=False),
+        ),
+        (
+            "TIME_SERIES_METRIC_FULL_SYNC_INTERVAL",
+            slz.IntegerField(label="自定义指标全量同步兜底间隔(秒)", default=6 * 3600),
+        ),
+        ("ENABLE_SPACE_ROUTER_DIFF_PUSH", slz.BooleanField(label="是否启用空间路由批量差异推送", default=False)),
         ("ENABLE_V2_VM_DATA_LINK_CLUSTER_ID_LIST", slz.ListField(label="启用新链路的集群ID列表", default=[])),
         ("K8S_PLUGIN_COLLECT_CLUSTER_ID", slz.CharField(label="默认K8S插件采集集群ID", default="")),
         ("TENCENT_CLOUD_METRIC_PLUGIN_CONFIG", slz.JSONField(label="腾讯云监控插件配置", default={})),
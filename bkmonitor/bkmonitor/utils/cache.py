@@ -13,6 +13,7 @@ specific language governing permissions and limitations under the License.
 import functools
 import json
 import logging
+import random
 import time
 import zlib
 
@@ -34,10 +35,41 @@ except Exception:
     mem_cache = cache
 
 
+def report_cache_result(cache_type, result):
+    """
+    上报缓存命中情况
+    :param result: hit/miss/stale
+    """
+    from core.prometheus import metrics
+
+    try:
+        metrics.USING_CACHE_REQUEST_COUNT.labels(cache_type=cache_type.key if cache_type else "", result=result).inc()
+    except Exception:  # pylint: disable=broad-except
+        pass
+
+
+# 仅当锁的值仍为当前持有者的token时删除
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
 class UsingCache(object):
     min_length = 15
     preset = 6
     key_prefix = "web_cache"
+    # 单飞模式下计算锁的超时时间(秒)
+    lock_timeout = 60
+    # 单飞模式下等待其他进程计算结果的最长时间(秒)及轮询间隔
+    wait_timeout = 5
+    wait_interval = 0.1
+    # 开启过期数据可用时，缓存值中记录数据过期时间的字段
+    fresh_until_field = "__fresh_until__"
+    # 开启过期数据可用时的缓存key前缀，与普通缓存的数据格式不同，使用独立的key
+    stale_key_prefix = "web_cache_stale"
 
     def __init__(
         self,
@@ -47,6 +79,8 @@ class UsingCache(object):
         compress=True,
         is_cache_func=lambda res: True,
         func_key_generator=lambda func: "{}.{}".format(func.__module__, func.__name__),
+        single_flight=None,
+        stale_ttl=None,
     ):
         """
         :param cache_type: 缓存类型
@@ -54,6 +88,8 @@ class UsingCache(object):
         :param compress: 是否进行压缩
         :param is_cache_func: 缓存函数，当函数返回true时，则进行缓存
         :param func_key_generator: 函数标识key的生成逻辑
+        :param single_flight: 缓存未命中时，是否只允许一个进程计算，其余进程等待结果，默认取缓存类型的配置
+        :param stale_ttl: 缓存过期后仍可使用旧数据的时长(秒)，期间由一个进程在后台刷新，默认取缓存类型的配置
         """
         self.cache_type = cache_type
         self.backend_cache_type = backend_cache_type
@@ -73,6 +109,13 @@ class UsingCache(object):
         self.using_cache_type = self._get_using_cache_type()
         self.local_cache_enable = settings.ROLE == "web"
 
+        if single_flight is None:
+            single_flight = getattr(self.using_cache_type, "single_flight", False)
+        if stale_ttl is None:
+            stale_ttl = getattr(self.using_cache_type, "stale_ttl", 0)
+        self.single_flight = single_flight
+        self.stale_ttl = stale_ttl
+
     def _get_username(self):
         username = "backend"
         if self.user_related:
@@ -96,7 +139,7 @@ class UsingCache(object):
         lang = "en" if translation.get_language() == "en" else "zh-hans"
         if self.using_cache_type:
             return "{}:{}:{}:{},{}[{}]{}".format(
-                self.key_prefix,
+                self.stale_key_prefix if self.stale_ttl else self.key_prefix,
                 self.using_cache_type.key,
                 self.func_key_generator(task_definition),
                 count_md5(args),
@@ -171,14 +214,140 @@ class UsingCache(object):
         else:
             cache_key = self._cache_key(task_definition, args, kwargs)
         if cache_key:
-            return_value = self.get_value(cache_key, default=None)
+            return_value, fresh_until = self._unpack_value(self.get_value(cache_key, default=None))
 
             if return_value is None:
-                return_value = self._refresh(task_definition, args, kwargs)
+                report_cache_result(self.using_cache_type, "miss")
+                if self.single_flight:
+                    return_value = self._refresh_single_flight(task_definition, args, kwargs, cache_key)
+                else:
+                    return_value = self._refresh(task_definition, args, kwargs)
+            elif self.stale_ttl and fresh_until is not None and fresh_until <= time.time():
+                # 数据已过期但仍在可用期内，先返回旧数据，由一个进程在后台刷新
+                report_cache_result(self.using_cache_type, "stale")
+                self._revalidate(task_definition, args, kwargs, cache_key)
+            else:
+                report_cache_result(self.using_cache_type, "hit")
         else:
             return_value = self._cacheless(task_definition, args, kwargs)
         return return_value
 
+    @staticmethod
+    def _lock_key(cache_key):
+        return "{}:lock".format(cache_key)
+
+    def _acquire_lock(self, lock_key):
+        """
+        获取分布式锁，锁的值为持有者的随机token
+        token使用整数，redis缓存后端对整数不做序列化，释放锁时可直接比较
+        :return: 获取成功时返回token，否则返回None
+        """
+        token = random.getrandbits(62)
+        if cache.add(lock_key, token, self.lock_timeout):
+            return token
+        return None
+
+    @staticmethod
+    def _release_lock(lock_key, token):
+        """
+        释放分布式锁，仅当锁仍由当前持有者持有时删除，避免执行超时后误删其他进程获取的锁
+        """
+        try:
+            from django_redis.cache import RedisCache
+        except ImportError:
+            RedisCache = None
+
+        try:
+            if RedisCache is not None and isinstance(cache, RedisCache):
+                # redis 缓存后端通过 lua 脚本原子地比较并删除
+                client = cache.client.get_client(write=True)
+                client.eval(RELEASE_LOCK_SCRIPT, 1, cache.make_key(lock_key), token)
+            elif cache.get(lock_key) == token:
+                cache.delete(lock_key)
+        except Exception as e:
+            logger.exception("[Cache]释放锁[key:{}]时报错：{}".format(lock_key, e))
+
+    def _unpack_value(self, value):
+        """
+        拆分缓存值及其过期时间
+        :return: (value, fresh_until) 未记录过期时间时 fresh_until 为 None
+        """
+        if isinstance(value, dict) and self.fresh_until_field in value and "value" in value:
+            return value["value"], value[self.fresh_until_field]
+        return value, None
+
+    def _set_cache(self, cache_key, value):
+        """
+        回写缓存，开启过期数据可用时，数据多保留 stale_ttl，并在缓存值中记录数据的过期时间，
+        读取时无需额外查询即可判断数据是否过期
+        """
+        timeout = self.using_cache_type.timeout
+        if not self.stale_ttl:
+            self.set_value(cache_key, value, timeout)
+            return
+
+        value = {self.fresh_until_field: time.time() + timeout, "value": value}
+        self.set_value(cache_key, value, timeout + self.stale_ttl)
+
+    def _refresh_single_flight(self, task_definition, args, kwargs, cache_key):
+        """
+        【单飞刷新模式】
+        通过分布式锁保证同一个key只有一个进程执行函数，其余进程等待并读取其写入的缓存
+        """
+        lock_key = self._lock_key(cache_key)
+        try:
+            token = self._acquire_lock(lock_key)
+            acquired = token is not None
+        except Exception:
+            token, acquired = None, True
+
+        if acquired:
+            try:
+                return self._refresh(task_definition, args, kwargs)
+            finally:
+                if token is not None:
+                    self._release_lock(lock_key, token)
+
+        deadline = time.time() + self.wait_timeout
+        while time.time() < deadline:
+            time.sleep(self.wait_interval)
+            return_value, _ = self._unpack_value(self.get_value(cache_key, default=None))
+            if return_value is not None:
+                return return_value
+            # 锁已释放但没有写入缓存(如结果不需要缓存或执行失败)，则自行执行
+            if not cache.get(lock_key):
+                break
+
+        return self._refresh(task_definition, args, kwargs)
+
+    def _revalidate(self, task_definition, args, kwargs, cache_key):
+        """
+        后台刷新过期数据，通过分布式锁保证只有一个进程执行
+        """
+        lock_key = self._lock_key(cache_key)
+        try:
+            token = self._acquire_lock(lock_key)
+        except Exception:
+            return
+        if token is None:
+            return
+
+        def revalidate():
+            try:
+                return_value = self._cacheless(task_definition, args, kwargs)
+                if self.is_cache_func(return_value):
+                    self._set_cache(cache_key, return_value)
+            except Exception as e:
+                logger.exception("[Cache]后台刷新缓存[key:{}]时报错：{}".format(cache_key, e))
+            finally:
+                self._release_lock(lock_key, token)
+
+        from bkmonitor.utils.thread_backend import InheritParentThread
+
+        thread = InheritParentThread(target=revalidate)
+        thread.daemon = True
+        thread.start()
+
     def _refresh(self, task_definition, args, kwargs):
         """
         【强制刷新模式】
@@ -192,7 +361,7 @@ class UsingCache(object):
         # 或者不缓存空数据且数据为空时
         # 需要进行缓存
         if self.is_cache_func(return_value):
-            self.set_value(cache_key, return_value, self.using_cache_type.timeout)
+            self._set_cache(cache_key, return_value)
 
         return return_value
 
@@ -237,20 +406,24 @@ class CacheTypeItem(object):
     缓存类型定义
     """
 
-    def __init__(self, key, timeout, user_related=None, label=""):
+    def __init__(self, key, timeout, user_related=None, label="", single_flight=False, stale_ttl=0):
         """
         :param key: 缓存名称
         :param timeout: 缓存超时，单位：s
         :param user_related: 是否用户相关
         :param label: 详细说明
+        :param single_flight: 缓存未命中时是否只允许一个进程执行计算
+        :param stale_ttl: 缓存过期后仍可返回旧数据并后台刷新的时长，单位：s，0表示不启用
         """
         self.key = key
         self.timeout = timeout
         self.label = label
         self.user_related = user_related
+        self.single_flight = single_flight
+        self.stale_ttl = stale_ttl
 
     def __call__(self, timeout):
-        return CacheTypeItem(self.key, timeout, self.user_related, self.label)
+        return CacheTypeItem(self.key, timeout, self.user_related, self.label, self.single_flight, self.stale_ttl)
 
 
 class CacheType(object):
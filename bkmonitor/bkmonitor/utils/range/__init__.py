@@ -8,12 +8,17 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import json
+import threading
+from collections import OrderedDict
+
 from constants.common import DutyType
 
 from . import conditions, fields, period
 
 __all__ = [
     "load_condition_instance",
+    "compile_condition_instance",
     "TIME_MATCH_CLASS_MAP",
     "load_field_instance",
     "load_agg_condition_instance",
@@ -122,3 +127,37 @@ def load_condition_instance(conditions_config, default_value_if_not_exists=True)
 
         or_cond_obj.add(and_cond_obj)
     return or_cond_obj
+
+
+# 编译后的条件对象缓存，相同配置复用同一个条件对象(及其预处理的集合、正则、数值边界)
+COMPILED_CONDITION_CACHE_SIZE = 4096
+_compiled_conditions = OrderedDict()
+_compiled_conditions_lock = threading.Lock()
+
+
+def compile_condition_instance(conditions_config, default_value_if_not_exists=True):
+    """
+    获取可复用的条件对象，参数及匹配结果与 load_condition_instance 一致
+    返回的对象在进程内共享，调用方不应再对其进行修改(add/remove)
+    :param conditions_config:
+            [[{"field":"ip", "method":"eq", "value":"111"}, {}], []]
+    :return: condition object
+    """
+    try:
+        cache_key = (json.dumps(conditions_config, sort_keys=True), default_value_if_not_exists)
+    except (TypeError, ValueError):
+        # 无法序列化的配置不做缓存
+        return load_condition_instance(conditions_config, default_value_if_not_exists)
+
+    with _compiled_conditions_lock:
+        condition = _compiled_conditions.get(cache_key)
+        if condition is not None:
+            _compiled_conditions.move_to_end(cache_key)
+            return condition
+
+    condition = load_condition_instance(conditions_config, default_value_if_not_exists)
+    with _compiled_conditions_lock:
+        _compiled_conditions[cache_key] = condition
+        while len(_compiled_conditions) > COMPILED_CONDITION_CACHE_SIZE:
+            _compiled_conditions.popitem(last=False)
+    return condition
@@ -25,23 +25,48 @@ class SimpleCondition(Condition):
     def __init__(self, cond_field, default_value_if_not_exists=False):
         self.cond_field = cond_field
         self.default_value_if_not_exists = default_value_if_not_exists
+        # 条件值预处理结果(集合、正则、数值边界等)，首次匹配时生成，之后复用
+        self._compiled = None
+        self._is_compiled = False
 
     def is_match(self, data):
-        existed, data_field = self.get_field(data)
+        existed, data_value = self.cond_field.get_value_from_data(data)
         if not existed:
             return self.default_value_if_not_exists
 
-        return self._is_match(data_field)
+        return self._match_value(data_value)
 
     def _is_match(self, data_field):
+        return self._match_value(data_field.value)
+
+    def _match_value(self, data_value):
         raise NotImplementedError("You should inherit me and implement this.")
 
+    def _compile(self):
+        """
+        预处理条件值
+        """
+        return self.cond_field.to_str_list()
+
+    @property
+    def compiled(self):
+        if not self._is_compiled:
+            self._compiled = self._compile()
+            self._is_compiled = True
+        return self._compiled
+
     def get_field(self, data):
         is_exists, data_value = self.cond_field.get_value_from_data(data)
         if is_exists:
             return True, self.cond_field.__class__(self.cond_field.name, data_value)
         return False, None
 
+    def to_str_list(self, data_value):
+        return self.cond_field.value_to_str_list(data_value)
+
+    def to_float_list(self, data_value):
+        return self.cond_field.value_to_float_list(data_value)
+
 
 class CompositeCondition(Condition):
     """AND / OR"""
@@ -82,84 +107,97 @@ class AndCondition(CompositeCondition):
 
 
 class EqualCondition(SimpleCondition):
-    def _is_match(self, data_field):
-        data_value = data_field.to_str_list()
-        cond_value = self.cond_field.to_str_list()
-        return bool(set(data_value) & set(cond_value))
+    def _compile(self):
+        return frozenset(self.cond_field.to_str_list())
+
+    def _match_value(self, data_value):
+        return not self.compiled.isdisjoint(self.to_str_list(data_value))
 
 
 class NotEqualCondition(EqualCondition):
-    def _is_match(self, data_field):
-        return not super(NotEqualCondition, self)._is_match(data_field)
+    def _match_value(self, data_value):
+        return not super(NotEqualCondition, self)._match_value(data_value)
 
 
 class IncludeCondition(SimpleCondition):
-    def _is_match(self, data_field):
-        data_value = data_field.to_str_list()
+    def _match_value(self, data_value):
+        data_value = self.to_str_list(data_value)
         if not data_value:
             return False
         data_value = data_value[0]
-        cond_value = self.cond_field.to_str_list()
-        for v in cond_value:
+        for v in self.compiled:
             if v in data_value:
                 return True
         return False
 
 
 class ExcludeCondition(IncludeCondition):
-    def _is_match(self, data_field):
-        return not super(ExcludeCondition, self)._is_match(data_field)
+    def _match_value(self, data_value):
+        return not super(ExcludeCondition, self)._match_value(data_value)
 
 
 class GreaterCondition(SimpleCondition):
-    def _is_match(self, data_field):
-        data_value = min(data_field.to_float_list())
-        cond_value = max(self.cond_field.to_float_list())
-        return data_value > cond_value
+    def _compile(self):
+        return max(self.cond_field.to_float_list())
+
+    def _match_value(self, data_value):
+        return min(self.to_float_list(data_value)) > self.compiled
 
 
 class LesserOrEqualCondition(GreaterCondition):
-    def _is_match(self, data_field):
-        return not super(LesserOrEqualCondition, self)._is_match(data_field)
+    def _match_value(self, data_value):
+        return not super(LesserOrEqualCondition, self)._match_value(data_value)
 
 
 class LesserCondition(SimpleCondition):
-    def _is_match(self, data_field):
-        data_value = max(data_field.to_float_list())
-        cond_value = min(self.cond_field.to_float_list())
-        return data_value < cond_value
+    def _compile(self):
+        return min(self.cond_field.to_float_list())
+
+    def _match_value(self, data_value):
+        return max(self.to_float_list(data_value)) < self.compiled
 
 
 class GreaterOrEqualCondition(LesserCondition):
-    def _is_match(self, data_field):
-        return not super(GreaterOrEqualCondition, self)._is_match(data_field)
+    def _match_value(self, data_value):
+        return not super(GreaterOrEqualCondition, self)._match_value(data_value)
 
 
 class RegularCondition(SimpleCondition):
-    def _is_match(self, data_field):
-        data_value = data_field.to_str_list()
+    def _compile(self):
+        """
+        预编译正则，遇到非法正则时以None占位，匹配到该位置时返回False
+        """
+        regs = []
+        for v in self.cond_field.to_str_list():
+            try:
+                regs.append(re.compile(r"%s" % v))
+            except sre_constants.error:
+                regs.append(None)
+                break
+        return regs
+
+    def _match_value(self, data_value):
+        data_value = self.to_str_list(data_value)
         if not data_value:
             return False
         data_value = data_value[0]
-        cond_value = self.cond_field.to_str_list()
-        for v in cond_value:
-            try:
-                reg = re.compile(r"%s" % v)
-            except sre_constants.error:
+        for reg in self.compiled:
+            if reg is None:
                 return False
 
-            if reg.findall(data_value):
+            if reg.search(data_value):
                 return True
         return False
 
 
 class NotRegularCondition(RegularCondition):
-    def _is_match(self, data_field):
-        return not super(NotRegularCondition, self)._is_match(data_field)
+    def _match_value(self, data_value):
+        return not super(NotRegularCondition, self)._match_value(data_value)
 
 
 class IsSuperSetCondition(SimpleCondition):
-    def _is_match(self, data_field):
-        data_value = data_field.to_str_list()
-        cond_value = self.cond_field.to_str_list()
-        return set(data_value).issuperset(set(cond_value))
+    def _compile(self):
+        return frozenset(self.cond_field.to_str_list())
+
+    def _match_value(self, data_value):
+        return self.compiled.issubset(self.to_str_list(data_value))
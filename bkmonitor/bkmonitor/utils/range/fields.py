@@ -26,18 +26,29 @@ class DimensionField(object):
 
     def to_str_list(self):
         """trans self.value to str list"""
-        val_list = self.value
-        if not isinstance(val_list, (list, tuple)):
-            val_list = [val_list]
-        return [self.strip_str(v) for v in val_list]
+        return self.value_to_str_list(self.value)
 
     def to_float_list(self):
         """trans self.value to float list"""
-        val_list = self.value
-        if not isinstance(val_list, (list, tuple)):
-            val_list = [val_list]
+        return self.value_to_float_list(self.value)
 
-        return list(map(safe_float, val_list))
+    @classmethod
+    def value_to_str_list(cls, value):
+        """
+        将任意值转换为字符串列表，条件匹配时直接转换数据值，避免为每条数据创建字段对象
+        """
+        if isinstance(value, str):
+            return [value.strip()]
+        if not isinstance(value, (list, tuple)):
+            value = [value]
+        return [cls.strip_str(v) for v in value]
+
+    @classmethod
+    def value_to_float_list(cls, value):
+        if not isinstance(value, (list, tuple)):
+            value = [value]
+
+        return list(map(safe_float, value))
 
     @staticmethod
     def strip_str(value) -> str:
@@ -74,8 +85,9 @@ class IpDimensionField(DimensionField):
 
         return is_exists, ip_value
 
-    def to_str_list(self):
-        val_list = self.value
+    @classmethod
+    def value_to_str_list(cls, value):
+        val_list = value
         if not isinstance(val_list, (list, tuple)):
             val_list = [val_list]
 
@@ -84,7 +96,7 @@ class IpDimensionField(DimensionField):
             if isinstance(v, dict):
                 v = to_host_id(v)
             else:
-                v = self.strip_str(v)
+                v = cls.strip_str(v)
             ret.append(v)
 
         return ret
@@ -118,8 +130,9 @@ class BkTargetIpDimensionField(DimensionField):
 
         return is_exists, ip_value
 
-    def to_str_list(self):
-        val_list = self.value
+    @classmethod
+    def value_to_str_list(cls, value):
+        val_list = value
         if not isinstance(val_list, (list, tuple)):
             val_list = [val_list]
 
@@ -128,7 +141,7 @@ class BkTargetIpDimensionField(DimensionField):
             if isinstance(v, dict):
                 v = f"{v['bk_target_ip']}|{v.get('bk_target_cloud_id', '0')}"
             else:
-                v = self.strip_str(v)
+                v = cls.strip_str(v)
             ret.append(v)
 
         return ret
@@ -165,8 +178,9 @@ class TopoNodeDimensionField(DimensionField):
             return True, [{"bk_obj_id": data["bk_obj_id"], "bk_inst_id": data["bk_inst_id"]}]
         return is_exists, topo_node_value
 
-    def to_str_list(self):
-        val_list = self.value
+    @classmethod
+    def value_to_str_list(cls, value):
+        val_list = value
         if not isinstance(val_list, (list, tuple)):
             val_list = [val_list]
 
@@ -175,7 +189,7 @@ class TopoNodeDimensionField(DimensionField):
             if isinstance(v, dict):
                 v = f"{v.get('bk_obj_id')}|{v.get('bk_inst_id')}"
             else:
-                v = self.strip_str(v)
+                v = cls.strip_str(v)
             ret.append(v)
 
         return ret
@@ -678,6 +678,17 @@ FTA_MIGRATE_BIZS = []
 DEFAULT_METRIC_PUSH_JOB = "SLI"
 # 运营指标上报任务标志
 OPERATION_STATISTICS_METRIC_PUSH_JOB = "Operation"
+# 指标后台合并上报间隔(秒)，0表示每次调用 report_all 时同步上报
+METRIC_PUSH_INTERVAL = 0
+
+# API 调用共享连接池中每个上游地址的最大连接数
+API_HTTP_POOL_MAXSIZE = 20
+# API 调用建立连接失败时的重试次数
+API_HTTP_MAX_RETRIES = 1
+# API 调用建立连接的超时时间(秒)，0表示与读取超时一致
+API_HTTP_CONNECT_TIMEOUT = 0
+# 是否合并并发执行的相同 API GET 请求
+ENABLE_API_SINGLE_FLIGHT = False
 
 # 是否启用计算平台处理influxdb降精度流程
 ENABLE_METADATA_DOWNSAMPLE_BY_BKDATA = False
@@ -1337,6 +1348,13 @@ IS_ENABLE_METADATA_FUNCTION_CONTROLLER = True
 # 自定义指标过期时间
 TIME_SERIES_METRIC_EXPIRED_SECONDS = 30 * 24 * 3600
 
+# 是否启用自定义指标增量同步(只拉取上次同步水位之后有上报的指标)
+ENABLE_TIME_SERIES_METRIC_INCREMENTAL_SYNC = False
+# 自定义指标增量同步时，全量同步兜底的间隔时间
+TIME_SERIES_METRIC_FULL_SYNC_INTERVAL = 6 * 3600
+# 是否启用空间路由批量差异推送(预加载公共数据，仅写入和通知路由有变化的空间)
+ENABLE_SPACE_ROUTER_DIFF_PUSH = False
+
 # 是否启用 influxdb 写入，默认 True
 ENABLE_INFLUXDB_STORAGE = True
 
@@ -1409,6 +1427,10 @@ ENABLE_DATA_LABEL_EXPORT = True
 ENABLED_ACCESS_DATA_BATCH_PROCESS = False
 ACCESS_DATA_BATCH_PROCESS_SIZE = 50000
 ACCESS_DATA_BATCH_PROCESS_THRESHOLD = 0
+# 是否对超过分批阈值的策略组按时间分页拉取(边拉取边下发分批任务)
+ENABLE_ACCESS_STREAM_PULL = False
+# 分页拉取时每页包含的聚合周期数
+ACCESS_DATA_STREAM_PAGE_PERIODS = 1
 
 # metadata请求es超时配置, 单位为秒，默认10秒
 # 格式: {default: 10, 集群域名: 20}
@@ -1429,6 +1451,74 @@ ENABLE_UPTIMECHECK_TEST = True
 # 检测结果缓存 TTL(小时)
 CHECK_RESULT_TTL_HOURS = 1
 
+# 是否启用trigger批量检测(批量拉取检测窗口)
+ENABLE_TRIGGER_BATCH_CHECK = False
+
+# 是否启用access推送待检测数据的列式批量格式(需先确保detect已升级至支持该格式的版本)
+ENABLE_ACCESS_RECORD_BATCH = False
+# 列式批量格式是否压缩
+ACCESS_RECORD_BATCH_COMPRESS = True
+
+# 是否启用detect静态阈值算法的批量预筛选，默认关闭
+ENABLE_DETECT_BATCH_PREFILTER = False
+
+# CMDB对象进程内LRU缓存容量(每类对象)，0表示关闭
+CMDB_LOCAL_CACHE_SIZE = 10000
+# CMDB对象进程内缓存版本号检查间隔(秒)
+CMDB_LOCAL_CACHE_CHECK_INTERVAL = 10
+
+# access数据去重模式: set(记录ID集合) / fingerprint(定长哈希指纹)
+ACCESS_DUPLICATE_MODE = "set"
+# 指纹去重模式下单个时间点的误判率预算及预估最大记录数，用于计算指纹长度
+ACCESS_DUPLICATE_FALSE_POSITIVE_RATE = 0.000001
+ACCESS_DUPLICATE_CAPACITY = 1000000
+
+# 任务分配哈希环使用的哈希算法: md5 / crc32，切换时需所有节点同时变更
+DISPATCH_HASH_RING_FUNC = "md5"
+
+# detect历史数据进程内缓存最大字节数，0表示关闭
+DETECT_HISTORY_LOCAL_CACHE_BYTES = 64 * 1024 * 1024
+# 早于该时长(秒)的历史数据才使用进程内缓存，近期数据可能仍有写入
+DETECT_HISTORY_LOCAL_CACHE_MIN_AGE = 600
+# detect历史数据进程内缓存过期时间(秒)
+DETECT_HISTORY_LOCAL_CACHE_TTL = 300
+
+# detect分区处理的策略及分区数，格式: {"策略ID": 分区数}，分区策略的待检测数据按维度写入多个队列并行检测
+DETECT_PARTITION_STRATEGIES = {}
+
+# 延时队列分片数、单批投递任务数及最长轮询间隔(秒)
+DELAY_QUEUE_SHARD_COUNT = 1
+DELAY_QUEUE_DISPATCH_BATCH_SIZE = 1000
+DELAY_QUEUE_POLL_INTERVAL = 1
+
+# 是否启用无数据检测维度存在索引(access按周期写入维度集合，替代完整数据副本队列)
+ENABLE_NODATA_PRESENCE_INDEX = False
+
+# trigger异常记录写出方式: off(不写出)/mysql(批量入库)/kafka(批量推送)
+TRIGGER_ANOMALY_SINK = "off"
+# trigger异常记录单批次最大条数
+TRIGGER_ANOMALY_SINK_BATCH_SIZE = 500
+# trigger异常记录在缓冲区中的最长停留时间(秒)
+TRIGGER_ANOMALY_SINK_MAX_LATENCY = 5
+# trigger异常记录写出的kafka topic
+TRIGGER_ANOMALY_SINK_KAFKA_TOPIC = os.getenv("BK_MONITOR_ANOMALY_RECORD_KAFKA_TOPIC", "0bkmonitor_anomaly_record")
+
+# 是否启用基于策略变更记录的策略缓存增量刷新(只重算变更策略及其同分组策略)
+ENABLE_STRATEGY_CACHE_INCREMENTAL_REFRESH = False
+
+# 进程内策略快照缓存的最大占用字节数(按快照原始json长度估算)，0表示不缓存
+STRATEGY_SNAPSHOT_LOCAL_CACHE_BYTES = 64 * 1024 * 1024
+
+# 是否启用 trigger 自适应批量调度(按队列长度及处理耗时确定批次大小，按时间片轮转处理各策略)
+ENABLE_TRIGGER_ADAPTIVE_BATCH = False
+# trigger 单批次拉取异常点数量的下限及上限
+TRIGGER_BATCH_MIN_SIZE = 100
+TRIGGER_BATCH_MAX_SIZE = 5000
+# trigger 单个策略监控项单次调度的时间片(秒)
+TRIGGER_BATCH_TIME_SLICE = 2
+# trigger 单次最多合并的重复异常信号数量，0表示不合并
+TRIGGER_SIGNAL_COALESCE_SIZE = 100
+
 # LLM 接口地址
 BK_MONITOR_AI_API_URL = os.environ.get("BK_MONITOR_AI_API_URL", "")
 
@@ -12,6 +12,7 @@ specific language governing permissions and limitations under the License.
 
 import abc
 import logging
+import os
 
 import six
 from django.db import models
@@ -240,7 +241,8 @@ class Resource(six.with_metaclass(abc.ABCMeta, object)):
         if not isinstance(request_data_iterable, (list, tuple)):
             raise TypeError("'request_data_iterable' object is not iterable")
 
-        pool = ThreadPool()
+        # 请求数较少时按请求数创建线程，避免每次调用都创建 cpu_count 个线程
+        pool = ThreadPool(processes=max(min(len(request_data_iterable), os.cpu_count() or 1), 1))
         futures = []
         for request_data in request_data_iterable:
             futures.append(pool.apply_async(self.request, args=(request_data,)))
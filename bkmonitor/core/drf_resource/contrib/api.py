@@ -13,7 +13,6 @@ import abc
 import json
 import logging
 
-import requests
 import six
 from blueapps.account.conf import ConfFixture
 from blueapps.account.utils import load_backend
@@ -25,6 +24,7 @@ from requests.exceptions import HTTPError, ReadTimeout
 
 from bkmonitor.utils.request import get_request
 from bkmonitor.utils.user import make_userinfo
+from core.drf_resource.contrib import transport
 from core.drf_resource.contrib.cache import CacheResource
 from core.errors.api import BKAPIError
 from core.errors.iam import APIPermissionDeniedError
@@ -121,7 +121,6 @@ class APIResource(six.with_metaclass(abc.ABCMeta, CacheResource)):
         super(APIResource, self).__init__(*args, **kwargs)
         assert self.method.upper() in ["GET", "POST", "PUT", "DELETE", "PATCH"], _("method仅支持GET或POST或PUT或DELETE或PATCH")
         self.method = self.method.upper()
-        self.session = requests.session()
 
     def request(self, request_data=None, **kwargs):
         request_data = request_data or kwargs
@@ -167,6 +166,15 @@ class APIResource(six.with_metaclass(abc.ABCMeta, CacheResource)):
 
         return headers
 
+    def get_timeout(self, validated_request_data):
+        """
+        请求超时时间，配置了 API_HTTP_CONNECT_TIMEOUT 时单独限制建立连接的耗时
+        """
+        read_timeout = validated_request_data.get("timeout") or self.TIMEOUT
+        if settings.API_HTTP_CONNECT_TIMEOUT:
+            return settings.API_HTTP_CONNECT_TIMEOUT, read_timeout
+        return read_timeout
+
     def perform_request(self, validated_request_data):
         """
         发起http请求
@@ -183,7 +191,7 @@ class APIResource(six.with_metaclass(abc.ABCMeta, CacheResource)):
             kwargs = {
                 "method": self.method,
                 "url": request_url,
-                "timeout": validated_request_data.get("timeout") or self.TIMEOUT,
+                "timeout": self.get_timeout(validated_request_data),
                 "headers": headers,
                 "verify": False,
             }
@@ -193,12 +201,13 @@ class APIResource(six.with_metaclass(abc.ABCMeta, CacheResource)):
                 if "method" in kwargs:
                     del kwargs["method"]
 
-                result = self.session.get(
-                    url=request_url,
+                result = transport.request(
+                    "GET",
+                    request_url,
                     params=validated_request_data,
                     headers=headers,
                     verify=False,
-                    timeout=validated_request_data.get("timeout") or self.TIMEOUT,
+                    timeout=self.get_timeout(validated_request_data),
                 )
             else:
                 non_file_data, file_data = self.split_request_data(validated_request_data)
@@ -212,7 +221,7 @@ class APIResource(six.with_metaclass(abc.ABCMeta, CacheResource)):
                     kwargs["data"] = non_file_data
 
                 kwargs = self.before_request(kwargs)
-                result = self.session.request(**kwargs)
+                result = transport.request(**kwargs)
         except ReadTimeout as error:
             # 上报API调用失败统计指标
             self.report_api_failure_metric(error_code=getattr(error, 'code', 0), exception_type=type(error).__name__)
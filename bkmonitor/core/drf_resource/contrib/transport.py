@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from core.prometheus import metrics
+
+logger = logging.getLogger(__name__)
+
+__doc__ = """
+    进程内共享的 HTTP 传输层
+    1. 按上游地址(scheme + host)复用连接池，保持长连接，避免每次请求重新建立 TCP/TLS 连接
+    2. 相同的 GET 请求并发执行时只向上游发送一次，其余调用方等待并共享结果(single-flight)
+"""
+
+
+def get_upstream(url: str) -> str:
+    parts = urlsplit(url)
+    return "{}://{}".format(parts.scheme, parts.netloc)
+
+
+class SessionPool(object):
+    """
+    按上游地址维护的共享 Session
+    fork 后的子进程不能复用父进程的连接，通过 pid 判断并重建
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._pid = os.getpid()
+
+    @staticmethod
+    def create_session() -> requests.Session:
+        session = requests.Session()
+        # 共享 Session 不保存响应中的 cookie，避免不同调用方之间的登录态互相影响
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        # 仅对连接失败进行重试，读超时不重试，避免放大上游压力
+        retries = Retry(total=settings.API_HTTP_MAX_RETRIES, read=0, status=0, backoff_factor=0.1)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.API_HTTP_POOL_MAXSIZE, max_retries=retries)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def get(self, url: str) -> requests.Session:
+        upstream = get_upstream(url)
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._sessions = {}
+            self._pid = os.getpid()
+
+        session = self._sessions.get(upstream)
+        if session is not None:
+            return session
+
+        with self._lock:
+            session = self._sessions.get(upstream)
+            if session is None:
+                session = self._sessions[upstream] = self.create_session()
+        return session
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class _Call(object):
+    __slots__ = ("event", "result", "exception")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.exception = None
+
+
+class SingleFlight(object):
+    """
+    合并相同 key 的并发调用，只有第一个调用方真正执行，其余调用方等待其结果
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        :return: (result, shared) shared 为 True 表示结果来自其他调用方
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                leader = False
+            else:
+                leader = True
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.exception is not None:
+                raise call.exception
+            return call.result, True
+
+        try:
+            call.result = func(*args, **kwargs)
+        except Exception as e:
+            call.exception = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result, False
+
+
+SESSION_POOL = SessionPool()
+GET_SINGLE_FLIGHT = SingleFlight()
+
+
+def _send(session: requests.Session, method: str, url: str, **kwargs) -> requests.Response:
+    upstream = get_upstream(url)
+    start_time = time.time()
+    status = "error"
+    try:
+        response = session.request(method, url, **kwargs)
+        # 提前读取响应内容，保证共享给其他调用方时内容已就绪
+        response.content
+        status = response.status_code
+        return response
+    finally:
+        metrics.API_HTTP_REQUEST_LATENCY.labels(upstream=upstream, method=method, status=status).observe(
+            time.time() - start_time
+        )
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    通过共享连接池发送请求，GET 请求在开启 ENABLE_API_SINGLE_FLIGHT 时合并相同的并发请求
+    """
+    method = method.upper()
+    session = SESSION_POOL.get(url)
+    metrics.API_HTTP_POOL_COUNT.set(len(SESSION_POOL))
+    if method != "GET" or not settings.ENABLE_API_SINGLE_FLIGHT:
+        return _send(session, method, url, **kwargs)
+
+    key = json.dumps(
+        [url, kwargs.get("params"), kwargs.get("headers"), str(kwargs.get("timeout"))], sort_keys=True, default=str
+    )
+    response, shared = GET_SINGLE_FLIGHT.do(key, _send, session, method, url, **kwargs)
+    if shared:
+        metrics.API_HTTP_REQUEST_COALESCED_COUNT.labels(upstream=get_upstream(url)).inc()
+    return response
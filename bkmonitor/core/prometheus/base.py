@@ -12,11 +12,54 @@ from prometheus_client.utils import INF, floatToGoString
 CollectorRegistry.is_empty = lambda self: False
 
 
+class RegistrySnapshot(object):
+    """
+    registry 中被取出待上报的指标数据，可直接作为 push_to_gateway 的 registry 参数
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self._drained = []
+
+    def collect(self):
+        return iter(self.metrics)
+
+    def add(self, collector, labelvalues, child, state):
+        samples = child._drained_samples(state)
+        if samples:
+            metric = collector._get_metric()
+            series_labels = list(zip(collector._labelnames, labelvalues))
+            for suffix, sample_labels, value, timestamp, exemplar in samples:
+                metric.add_sample(
+                    collector._name + suffix,
+                    dict(series_labels + list(sample_labels.items())),
+                    value,
+                    timestamp,
+                    exemplar,
+                )
+            self.metrics.append(metric)
+        self._drained.append((child, state))
+        return bool(samples)
+
+    def restore(self):
+        """
+        上报失败时将取出的数据加回 registry，留待下次上报
+        """
+        for child, state in self._drained:
+            child._undrain(state)
+        self._drained = []
+
+
 class BkCollectorRegistry(CollectorRegistry):
     """
     适配蓝鲸监控聚合网关的采集器
     """
 
+    def __init__(self, *args, **kwargs):
+        super(BkCollectorRegistry, self).__init__(*args, **kwargs)
+        # 上次取出时已无数据的子指标，格式: {(id(collector), labelvalues)}
+        self._idle_children = set()
+
     def is_empty(self):
         empty = True
         for collector in self._collector_to_names:
@@ -48,6 +91,45 @@ class BkCollectorRegistry(CollectorRegistry):
                     collector._metrics = {}
             collector._metric_init()
 
+    def drain(self) -> RegistrySnapshot:
+        """
+        取出当前指标数据用于上报，取代先序列化后 clear_data 的方式，避免上报期间其他线程写入的数据丢失
+        - Counter/Histogram 从存量中扣减已取出的值，取出后的新增量（包括通过已持有的子指标对象写入的）保留到下次上报；
+          连续两次取出时均无数据的子指标从 registry 移除，避免标签组合无限增长
+        - Gauge 与 clear_data 一致，取出后移除
+        """
+        snapshot = RegistrySnapshot()
+        with self._lock:
+            collectors = copy.copy(self._collector_to_names)
+
+        idle_children = set()
+        for collector in collectors:
+            if not hasattr(collector, "_drain"):
+                continue
+            is_gauge = isinstance(collector, Gauge)
+            if not collector._is_parent():
+                snapshot.add(collector, (), collector, collector._drain())
+                if is_gauge:
+                    collector._metric_init()
+                continue
+
+            with collector._lock:
+                children = list(collector._metrics.items())
+                if is_gauge:
+                    collector._metrics = {}
+            for labelvalues, child in children:
+                if snapshot.add(collector, labelvalues, child, child._drain()) or is_gauge:
+                    continue
+                child_key = (id(collector), labelvalues)
+                if child_key not in self._idle_children:
+                    idle_children.add(child_key)
+                    continue
+                with collector._lock:
+                    if collector._metrics.get(labelvalues) is child and not child._child_samples():
+                        del collector._metrics[labelvalues]
+        self._idle_children = idle_children
+        return snapshot
+
 
 # SLI Registry
 REGISTRY = BkCollectorRegistry()
@@ -91,6 +173,37 @@ class Histogram(LabelHandleMixin, BaseHistogram):
             samples.append(("_sum", {}, self._sum.get(), None, None))
         return tuple(samples) if tobe_sampled else ()
 
+    def _drain(self):
+        buckets = [bucket.get() for bucket in self._buckets]
+        total = self._sum.get()
+        for bucket, value in zip(self._buckets, buckets):
+            if value:
+                bucket.inc(-value)
+        if total:
+            self._sum.inc(-total)
+        return buckets, total
+
+    def _undrain(self, state):
+        buckets, total = state
+        for bucket, value in zip(self._buckets, buckets):
+            if value:
+                bucket.inc(value)
+        if total:
+            self._sum.inc(total)
+
+    def _drained_samples(self, state):
+        buckets, total = state
+        if not any(buckets):
+            return ()
+        samples = []
+        acc = 0
+        for bound, value in zip(self._upper_bounds, buckets):
+            acc += value
+            samples.append(("_bucket", {"le": floatToGoString(bound)}, acc, None, None))
+        samples.append(("_count", {}, acc, None, None))
+        samples.append(("_sum", {}, total, None, None))
+        return tuple(samples)
+
 
 class Counter(LabelHandleMixin, BaseCounter):
     def __init__(self, *args, registry=REGISTRY, **kwargs):
@@ -104,6 +217,19 @@ class Counter(LabelHandleMixin, BaseCounter):
             return ()
         return (("_total", {}, self._value.get(), None, None),)
 
+    def _drain(self):
+        value = self._value.get()
+        if value:
+            self._value.inc(-value)
+        return value
+
+    def _undrain(self, value):
+        if value:
+            self._value.inc(value)
+
+    def _drained_samples(self, value):
+        return (("_total", {}, value, None, None),) if value else ()
+
 
 class Gauge(LabelHandleMixin, BaseGauge):
     def __init__(self, *args, registry=REGISTRY, **kwargs):
@@ -111,3 +237,13 @@ class Gauge(LabelHandleMixin, BaseGauge):
 
     def labels(self, *labelvalues, **labelkwargs) -> BaseGauge:
         return super(Gauge, self).labels(*labelvalues, **labelkwargs)
+
+    def _drain(self):
+        return self._value.get()
+
+    def _undrain(self, value):
+        # Gauge 为瞬时值，上报失败时不回写，由下次写入覆盖
+        pass
+
+    def _drained_samples(self, value):
+        return (("", {}, value, None, None),)
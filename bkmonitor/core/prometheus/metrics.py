@@ -10,7 +10,10 @@ specific language governing permissions and limitations under the License.
 """
 
 # 数据源
+import atexit
 import logging
+import os
+import threading
 
 from django.conf import settings
 from prometheus_client.exposition import push_to_gateway
@@ -47,9 +50,9 @@ def refresh_deployment():
         return ""
 
 
-def report_all(job: str = settings.DEFAULT_METRIC_PUSH_JOB, registry: BkCollectorRegistry = REGISTRY):
+def push_all(job: str = settings.DEFAULT_METRIC_PUSH_JOB, registry: BkCollectorRegistry = REGISTRY):
     """
-    批量上报指标
+    立即上报指标，已上报的数据从 registry 中取出
     """
     global DEPLOYMENT
     if registry.is_empty():
@@ -59,14 +62,100 @@ def report_all(job: str = settings.DEFAULT_METRIC_PUSH_JOB, registry: BkCollecto
     if not get_metric_agg_gateway_url():
         return
     METRIC_PUSH_COUNT.labels(deployment=DEPLOYMENT).inc()
+    # 先取出数据再发送，发送期间其他线程写入的数据保留到下次上报
+    snapshot = registry.drain()
     try:
         # 发送消息
-        push_to_gateway(gateway="", job=job, registry=registry, handler=udp_handler)
+        push_to_gateway(gateway="", job=job, registry=snapshot, handler=udp_handler)
     except Exception:
         # 失败不处理，handler已经打了日志了，这里只是为了防止上报过程出现任何异常导致正常逻辑无法走下去
-        return
+        # 取出的数据加回 registry，留待下次上报
+        snapshot.restore()
+
+
+class MetricFlusher(object):
+    """
+    进程内的后台指标上报线程
+    report_all 仅登记需要上报的 registry，由后台线程按 METRIC_PUSH_INTERVAL 合并上报，
+    避免在请求/任务线程中同步序列化及发送数据
+    """
 
-    registry.clear_data()
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 待上报的 registry，格式: {(job, id(registry)): (job, registry)}
+        self._targets = {}
+        self._thread = None
+        self._pid = None
+        self._stopped = threading.Event()
+
+    def add(self, job: str, registry: BkCollectorRegistry):
+        target_key = (job, id(registry))
+        if target_key not in self._targets:
+            with self._lock:
+                self._targets[target_key] = (job, registry)
+        self._ensure_started()
+
+    def _is_running(self):
+        return self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+
+    def _ensure_started(self):
+        if self._is_running():
+            return
+        with self._lock:
+            if self._is_running():
+                return
+            self._pid = os.getpid()
+            self._stopped = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._stopped,), name="metric-flusher")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _run(self, stopped: threading.Event):
+        while not stopped.wait(settings.METRIC_PUSH_INTERVAL or 1):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            targets = list(self._targets.values())
+        for job, registry in targets:
+            try:
+                push_all(job, registry)
+            except Exception:
+                logger.exception("[metric flusher] failed to report data to gateway, job(%s)", job)
+
+    def stop(self):
+        """
+        停止后台线程并强制上报剩余数据
+        """
+        self._stopped.set()
+        self.flush()
+
+    def reset_after_fork(self):
+        """
+        子进程不会继承后台线程，且 fork 时锁可能正被父进程的上报线程持有，因此在子进程中重建状态，
+        后台线程在子进程首次上报时再启动
+        """
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stopped = threading.Event()
+
+
+METRIC_FLUSHER = MetricFlusher()
+atexit.register(METRIC_FLUSHER.stop)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=METRIC_FLUSHER.reset_after_fork)
+
+
+def report_all(job: str = settings.DEFAULT_METRIC_PUSH_JOB, registry: BkCollectorRegistry = REGISTRY):
+    """
+    批量上报指标
+    配置了 METRIC_PUSH_INTERVAL 时交由后台线程合并上报，否则同步上报
+    """
+    if settings.METRIC_PUSH_INTERVAL > 0:
+        METRIC_FLUSHER.add(job, registry)
+        return
+    push_all(job, registry)
 
 
 def safe_push_to_gateway(job: str = settings.DEFAULT_METRIC_PUSH_JOB, registry: BkCollectorRegistry = REGISTRY):
@@ -76,6 +165,7 @@ def safe_push_to_gateway(job: str = settings.DEFAULT_METRIC_PUSH_JOB, registry:
     #    而如果我们改用多进程模式，push gateway 反而不合适了
     #    https://github.com/prometheus/client_python#multiprocess-mode-eg-gunicorn
     #    可以理解为 pushgateway 充当一个远端的分布式共享内存，所以这里可以直推
+    #    配置 METRIC_PUSH_INTERVAL 后，这里只登记 registry，由进程内后台线程定期合并上报
     try:
         report_all(job, registry)
     except Exception:
@@ -212,6 +302,12 @@ DETECT_PROCESS_DATA_COUNT = Counter(
     labelnames=("strategy_id", "type"),
 )
 
+DETECT_HISTORY_POINT_COUNT = Counter(
+    name="bkmonitor_detect_history_point_count",
+    documentation="detect 模块历史数据获取次数(按时间点)",
+    labelnames=("strategy_id", "source"),
+)
+
 # trigger
 TRIGGER_PROCESS_TIME = Histogram(
     name="bkmonitor_trigger_process_time",
@@ -237,6 +333,26 @@ TRIGGER_PROCESS_PUSH_DATA_COUNT = Counter(
     labelnames=("strategy_id",),
 )
 
+TRIGGER_QUEUE_DEPTH = Histogram(
+    name="bkmonitor_trigger_queue_depth",
+    documentation="trigger 模块每批次拉取前的异常点队列长度",
+    labelnames=("strategy_id",),
+    buckets=(0, 10, 100, 500, 1000, 5000, 10000, 50000, 100000, INF),
+)
+
+TRIGGER_BATCH_SIZE = Histogram(
+    name="bkmonitor_trigger_batch_size",
+    documentation="trigger 模块每批次拉取的异常点数量",
+    labelnames=("strategy_id",),
+    buckets=(1, 10, 50, 100, 200, 500, 1000, 2000, 5000, 10000, INF),
+)
+
+TRIGGER_SIGNAL_COALESCED_COUNT = Counter(
+    name="bkmonitor_trigger_signal_coalesced_count",
+    documentation="trigger 模块合并的重复异常信号数量",
+    labelnames=("strategy_id",),
+)
+
 # nodata
 NODATA_PROCESS_TIME = Histogram(
     name="bkmonitor_nodata_process_time",
@@ -331,6 +447,20 @@ TRIGGER_PROCESS_LATENCY = Histogram(
     buckets=(1, 2, 3, 5, 10, 15, 20, 30, 60, 180, 300, INF),
 )
 
+TRIGGER_ANOMALY_SINK_BATCH_SIZE = Histogram(
+    name="bkmonitor_trigger_anomaly_sink_batch_size",
+    documentation="trigger 异常记录批量写出条数",
+    labelnames=("sink",),
+    buckets=(1, 10, 50, 100, 200, 500, 1000, 2000, 5000, INF),
+)
+
+TRIGGER_ANOMALY_SINK_FLUSH_LATENCY = Histogram(
+    name="bkmonitor_trigger_anomaly_sink_flush_latency",
+    documentation="trigger 异常记录从进入缓冲区到写出完成的延迟",
+    labelnames=("sink", "status"),
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, INF),
+)
+
 ALERT_PROCESS_LATENCY = Histogram(
     name="bkmonitor_alert_process_latency",
     documentation="告警从 trigger 到 builder 模块的整体处理延迟",
@@ -482,6 +612,31 @@ ALARM_CACHE_TASK_TIME = Histogram(
     buckets=(1, 3, 5, 10, 30, 60, 300, INF),
 )
 
+STRATEGY_CACHE_REFRESH_CHANGED_COUNT = Counter(
+    name="bkmonitor_strategy_cache_refresh_changed_count",
+    documentation="策略缓存增量刷新变更条目数",
+    labelnames=("type",),
+)
+
+ALARM_LOCAL_CACHE_COUNT = Counter(
+    name="bkmonitor_alarm_local_cache_count",
+    documentation="进程内缓存访问次数",
+    labelnames=("type", "result"),
+)
+
+DELAY_QUEUE_DISPATCH_COUNT = Counter(
+    name="bkmonitor_delay_queue_dispatch_count",
+    documentation="延时队列到期任务投递数量",
+    labelnames=("backend",),
+)
+
+DELAY_QUEUE_DISPATCH_LAG = Histogram(
+    name="bkmonitor_delay_queue_dispatch_lag",
+    documentation="延时队列任务到期至投递的延迟(秒)",
+    labelnames=("backend",),
+    buckets=(0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 30, 60, INF),
+)
+
 # mail report
 MAIL_REPORT_SEND_LATENCY = Histogram(
     name="bkmonitor_mail_report_send_latency",
@@ -1107,6 +1262,30 @@ API_FAILED_REQUESTS_TOTAL = Counter(
     labelnames=("action", "module", "code", "role", "exception", "user_name"),
 )
 
+USING_CACHE_REQUEST_COUNT = Counter(
+    name="bkmonitor_using_cache_request_count",
+    documentation="接口缓存访问次数",
+    labelnames=("cache_type", "result"),
+)
+
+API_HTTP_REQUEST_LATENCY = Histogram(
+    name="bkmonitor_api_http_request_latency",
+    documentation="API调用上游的请求耗时",
+    labelnames=("upstream", "method", "status"),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, INF),
+)
+
+API_HTTP_REQUEST_COALESCED_COUNT = Counter(
+    name="bkmonitor_api_http_request_coalesced_count",
+    documentation="API调用中被合并的相同GET请求数量",
+    labelnames=("upstream",),
+)
+
+API_HTTP_POOL_COUNT = Gauge(
+    name="bkmonitor_api_http_pool_count",
+    documentation="API调用共享连接池(上游地址)数量",
+)
+
 AIOPS_ACCESS_TASK_COUNT = Gauge(
     name="bkmonitor_aiops_access_task_count",
     documentation="智能监控接入任务执行",
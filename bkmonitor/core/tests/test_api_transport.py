@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import threading
+import time
+from http.client import HTTPMessage
+
+import mock
+import pytest
+import requests
+from requests.cookies import extract_cookies_to_jar
+
+from core.drf_resource.contrib import transport
+from core.drf_resource.contrib.transport import SessionPool, SingleFlight
+
+
+class TestSingleFlight(object):
+    def test_coalesce(self):
+        single_flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def func(value):
+            calls.append(value)
+            started.set()
+            release.wait(5)
+            return value
+
+        results = []
+
+        def run():
+            results.append(single_flight.do("key", func, 1))
+
+        leader = threading.Thread(target=run)
+        leader.start()
+        assert started.wait(5)
+        followers = [threading.Thread(target=run) for _ in range(5)]
+        for follower in followers:
+            follower.start()
+        # 等待其他调用方进入等待状态
+        time.sleep(0.2)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+
+        assert calls == [1]
+        assert sorted(results) == [(1, False)] + [(1, True)] * 5
+        # 调用结束后不再合并
+        assert single_flight.do("key", func, 2) == (2, False)
+
+    def test_exception(self):
+        single_flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        errors = []
+
+        def func():
+            started.set()
+            release.wait(5)
+            raise ValueError("upstream error")
+
+        def run():
+            try:
+                single_flight.do("key", func)
+            except ValueError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run)]
+        threads[0].start()
+        assert started.wait(5)
+        threads.append(threading.Thread(target=run))
+        threads[1].start()
+        time.sleep(0.2)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        # 等待方同样收到异常
+        assert len(errors) == 2
+        assert not single_flight._calls
+
+
+class TestSessionPool(object):
+    def test_share_by_upstream(self, settings):
+        settings.API_HTTP_MAX_RETRIES = 1
+        settings.API_HTTP_POOL_MAXSIZE = 10
+        pool = SessionPool()
+        session = pool.get("http://example.com/api/v1/")
+        assert pool.get("http://example.com/api/v2/?a=1") is session
+        assert pool.get("https://example.com/api/v1/") is not session
+        assert len(pool) == 2
+
+        adapter = session.get_adapter("http://example.com/")
+        assert adapter._pool_maxsize == 10
+        assert adapter.max_retries.total == 1
+        assert adapter.max_retries.read == 0
+
+    def test_reset_after_fork(self, settings):
+        settings.API_HTTP_MAX_RETRIES = 1
+        settings.API_HTTP_POOL_MAXSIZE = 10
+        pool = SessionPool()
+        session = pool.get("http://example.com/")
+
+        with mock.patch.object(transport.os, "getpid", return_value=pool._pid + 1):
+            # 子进程中重建连接池，不复用父进程的连接
+            new_session = pool.get("http://example.com/")
+            assert new_session is not session
+            assert len(pool) == 1
+            assert pool.get("http://example.com/") is new_session
+
+    def test_cookie_policy(self, settings):
+        settings.API_HTTP_MAX_RETRIES = 1
+        settings.API_HTTP_POOL_MAXSIZE = 10
+        request = requests.Request("GET", "http://example.com/").prepare()
+        message = HTTPMessage()
+        message["Set-Cookie"] = "bk_token=abc; Path=/"
+        response = mock.Mock(_original_response=mock.Mock(msg=message))
+
+        # 普通 Session 会保存响应中的 cookie
+        plain_session = requests.Session()
+        extract_cookies_to_jar(plain_session.cookies, request, response)
+        assert len(plain_session.cookies) == 1
+
+        # 共享 Session 不保存 cookie
+        session = SessionPool.create_session()
+        extract_cookies_to_jar(session.cookies, request, response)
+        assert len(session.cookies) == 0
+
+
+class TestRequest(object):
+    @pytest.fixture
+    def session(self, mocker):
+        session = mock.MagicMock()
+        session.request.return_value = mock.MagicMock(status_code=200)
+        mocker.patch.object(transport.SESSION_POOL, "get", return_value=session)
+        return session
+
+    def test_post_not_coalesced(self, settings, session, mocker):
+        settings.ENABLE_API_SINGLE_FLIGHT = True
+        do = mocker.patch.object(transport.GET_SINGLE_FLIGHT, "do")
+        transport.request("post", "http://example.com/", json={"a": 1})
+        session.request.assert_called_once_with("POST", "http://example.com/", json={"a": 1})
+        do.assert_not_called()
+
+    def test_get_single_flight(self, settings, session, mocker):
+        settings.ENABLE_API_SINGLE_FLIGHT = True
+        do = mocker.patch.object(transport.GET_SINGLE_FLIGHT, "do", return_value=(session.request.return_value, True))
+        kwargs = {"params": {"b": 2, "a": 1}, "headers": {"X": "1"}, "timeout": (3, 60)}
+        assert transport.request("GET", "http://example.com/", **kwargs) is session.request.return_value
+
+        key = do.call_args[0][0]
+        # 参数顺序不同的相同请求使用同一个 key
+        transport.request("GET", "http://example.com/", params={"a": 1, "b": 2}, headers={"X": "1"}, timeout=(3, 60))
+        assert do.call_args[0][0] == key
+        # 超时时间不同时不合并
+        transport.request("GET", "http://example.com/", params={"a": 1, "b": 2}, headers={"X": "1"}, timeout=60)
+        assert do.call_args[0][0] != key
+
+
+class TestGetTimeout(object):
+    def test_get_timeout(self, settings):
+        from core.drf_resource.contrib.api import APIResource
+
+        resource = mock.Mock(TIMEOUT=60)
+        settings.API_HTTP_CONNECT_TIMEOUT = 0
+        assert APIResource.get_timeout(resource, {}) == 60
+        assert APIResource.get_timeout(resource, {"timeout": 10}) == 10
+
+        # 单独配置建立连接的超时时间
+        settings.API_HTTP_CONNECT_TIMEOUT = 3
+        assert APIResource.get_timeout(resource, {}) == (3, 60)
+        assert APIResource.get_timeout(resource, {"timeout": 10}) == (3, 10)
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import threading
+import time
+
+import pytest
+
+from core.prometheus import metrics
+from core.prometheus.base import BkCollectorRegistry, Counter, Gauge, Histogram
+
+
+@pytest.fixture
+def pushed(mocker):
+    """
+    替换上报网关，记录每次上报的样本
+    """
+    pushed = []
+
+    def push_to_gateway(gateway, job, registry, handler):
+        pushed.extend(sample for metric in registry.collect() for sample in metric.samples)
+
+    mocker.patch("core.prometheus.metrics.get_metric_agg_gateway_url", return_value="127.0.0.1:10206")
+    mocker.patch("core.prometheus.metrics.push_to_gateway", side_effect=push_to_gateway)
+    return pushed
+
+
+def sum_samples(samples, name):
+    return sum(sample.value for sample in samples if sample.name == name)
+
+
+class TestRegistryDrain(object):
+    def test_push_all(self, pushed):
+        registry = BkCollectorRegistry()
+        counter = Counter("test_counter", "", labelnames=("status",), registry=registry)
+        histogram = Histogram("test_histogram", "", registry=registry)
+        gauge = Gauge("test_gauge", "", labelnames=("name",), registry=registry)
+
+        counter.labels(status="ok").inc(3)
+        histogram.observe(0.2)
+        gauge.labels(name="a").set(5)
+        metrics.push_all("test", registry)
+
+        assert sum_samples(pushed, "test_counter_total") == 3
+        assert sum_samples(pushed, "test_histogram_count") == 1
+        assert sum_samples(pushed, "test_gauge") == 5
+        assert registry.is_empty()
+
+        # 已上报的数据不会重复上报
+        pushed.clear()
+        counter.labels(status="ok").inc(2)
+        metrics.push_all("test", registry)
+        assert sum_samples(pushed, "test_counter_total") == 2
+        assert sum_samples(pushed, "test_histogram_count") == 0
+
+    def test_push_failed(self, pushed, mocker):
+        registry = BkCollectorRegistry()
+        counter = Counter("test_counter", "", labelnames=("status",), registry=registry)
+        counter.labels(status="ok").inc(3)
+
+        mocker.patch("core.prometheus.metrics.push_to_gateway", side_effect=Exception)
+        metrics.push_all("test", registry)
+
+        # 上报失败时数据保留到下次上报
+        assert counter.labels(status="ok")._value.get() == 3
+
+    def test_inc_during_flush(self, pushed):
+        registry = BkCollectorRegistry()
+        counter = Counter("test_counter", "", labelnames=("status",), registry=registry)
+        thread_count, inc_count = 4, 5000
+        finished = threading.Event()
+
+        def worker():
+            # 持有子指标对象的写入同样不能丢失
+            child = counter.labels(status="held")
+            for _ in range(inc_count):
+                child.inc()
+                counter.labels(status="fetched").inc()
+
+        threads = [threading.Thread(target=worker) for _ in range(thread_count)]
+        for thread in threads:
+            thread.start()
+
+        def wait():
+            for thread in threads:
+                thread.join()
+            finished.set()
+
+        threading.Thread(target=wait).start()
+        while not finished.is_set():
+            metrics.push_all("test", registry)
+        metrics.push_all("test", registry)
+
+        total = sum_samples(pushed, "test_counter_total")
+        assert total == thread_count * inc_count * 2
+
+    def test_prune_idle_children(self, pushed):
+        registry = BkCollectorRegistry()
+        counter = Counter("test_counter", "", labelnames=("status",), registry=registry)
+        counter.labels(status="ok").inc()
+
+        metrics.push_all("test", registry)
+        assert ("ok",) in counter._metrics
+        # 连续两次取出均无数据时移除
+        registry.drain()
+        assert ("ok",) in counter._metrics
+        registry.drain()
+        assert ("ok",) not in counter._metrics
+
+
+class TestMetricFlusher(object):
+    def wait_for(self, condition, timeout=5):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if condition():
+                return True
+            time.sleep(0.01)
+        return False
+
+    def test_lifecycle(self, pushed, settings):
+        settings.METRIC_PUSH_INTERVAL = 0.05
+        registry = BkCollectorRegistry()
+        counter = Counter("test_counter", "", registry=registry)
+        flusher = metrics.MetricFlusher()
+
+        counter.inc(2)
+        flusher.add("test", registry)
+        thread = flusher._thread
+        assert thread.is_alive() and thread.daemon
+        assert self.wait_for(lambda: sum_samples(pushed, "test_counter_total") == 2)
+
+        # 重复登记不会启动新线程
+        flusher.add("test", registry)
+        assert flusher._thread is thread
+
+        # 停止时强制上报剩余数据
+        counter.inc(3)
+        flusher.stop()
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+        assert sum_samples(pushed, "test_counter_total") == 5
+
+    def test_restart_after_fork(self, pushed, settings):
+        settings.METRIC_PUSH_INTERVAL = 0.05
+        registry = BkCollectorRegistry()
+        flusher = metrics.MetricFlusher()
+        flusher.add("test", registry)
+        parent_thread, parent_stopped = flusher._thread, flusher._stopped
+
+        # 模拟 fork 后的子进程: 后台线程不被继承，首次上报时重新启动
+        flusher.reset_after_fork()
+        assert flusher._thread is None
+        flusher.add("test", registry)
+        assert flusher._thread is not parent_thread and flusher._thread.is_alive()
+
+        # 进程号变化时同样重新启动
+        flusher._pid = -1
+        child_thread, child_stopped = flusher._thread, flusher._stopped
+        flusher.add("test", registry)
+        assert flusher._thread is not child_thread
+
+        for stopped in (parent_stopped, child_stopped):
+            stopped.set()
+        flusher.stop()
+
+    def test_report_all(self, mocker, settings):
+        registry = BkCollectorRegistry()
+        add = mocker.patch.object(metrics.METRIC_FLUSHER, "add")
+        push_all = mocker.patch("core.prometheus.metrics.push_all")
+
+        settings.METRIC_PUSH_INTERVAL = 0
+        metrics.report_all("test", registry)
+        push_all.assert_called_once_with("test", registry)
+        add.assert_not_called()
+
+        settings.METRIC_PUSH_INTERVAL = 10
+        metrics.report_all("test", registry)
+        add.assert_called_once_with("test", registry)
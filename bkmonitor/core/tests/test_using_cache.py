@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import mock
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+
+from bkmonitor.utils.cache import CacheType, CacheTypeItem, UsingCache
+
+
+class SyncThread(object):
+    """同步执行的线程，便于校验后台刷新的结果"""
+
+    def __init__(self, target):
+        self.target = target
+        self.daemon = False
+
+    def start(self):
+        self.target()
+
+
+@pytest.fixture
+def backend_cache(settings, mocker):
+    settings.ENVIRONMENT = "production"
+    settings.ROLE = "worker"
+    local_cache = LocMemCache("using_cache_test", {})
+    local_cache.clear()
+    backend = mock.MagicMock(wraps=local_cache)
+    mocker.patch("bkmonitor.utils.cache.cache", backend)
+    mocker.patch("bkmonitor.utils.cache.mem_cache", backend)
+    mocker.patch("bkmonitor.utils.thread_backend.InheritParentThread", SyncThread)
+    return backend
+
+
+def query(value):
+    return value
+
+
+class TestStaleWhileRevalidate(object):
+    def test_stale(self, backend_cache, mocker):
+        mock_time = mocker.patch("bkmonitor.utils.cache.time")
+        mock_time.time.return_value = 1000
+        func = mock.Mock(side_effect=["v1", "v2"], __name__="query", __module__=__name__)
+        using_cache = UsingCache(CacheTypeItem(key="test", timeout=60, user_related=False), stale_ttl=30)
+        cached_func = using_cache(func)
+
+        assert cached_func() == "v1"
+        assert func.call_count == 1
+
+        # 未过期时直接命中，只读取一次缓存
+        mock_time.time.return_value = 1059
+        backend_cache.get.reset_mock()
+        assert cached_func() == "v1"
+        assert backend_cache.get.call_count == 1
+        assert func.call_count == 1
+
+        # 已过期时先返回旧数据，并在后台刷新
+        mock_time.time.return_value = 1061
+        assert cached_func() == "v1"
+        assert func.call_count == 2
+        assert cached_func() == "v2"
+        assert func.call_count == 2
+
+    def test_stale_locked(self, backend_cache, mocker):
+        mock_time = mocker.patch("bkmonitor.utils.cache.time")
+        mock_time.time.return_value = 1000
+        func = mock.Mock(side_effect=["v1", "v2"], __name__="query", __module__=__name__)
+        using_cache = UsingCache(CacheTypeItem(key="test", timeout=60, user_related=False), stale_ttl=30)
+        cached_func = using_cache(func)
+        assert cached_func() == "v1"
+
+        # 其他进程正在刷新时，直接返回旧数据
+        mock_time.time.return_value = 1061
+        cache_key = using_cache._cache_key(func, (), {})
+        backend_cache.add(using_cache._lock_key(cache_key), 1, 60)
+        assert cached_func() == "v1"
+        assert func.call_count == 1
+
+    def test_without_stale_ttl(self, backend_cache):
+        using_cache = UsingCache(CacheTypeItem(key="test", timeout=60, user_related=False))
+        cached_func = using_cache(query)
+        assert cached_func("v1") == "v1"
+        # 未开启时缓存原始数据，不记录过期时间
+        cache_key = using_cache._cache_key(query, ("v1",), {})
+        assert using_cache.get_value(cache_key) == "v1"
+
+
+class TestSingleFlight(object):
+    def test_leader(self, backend_cache):
+        using_cache = UsingCache(CacheTypeItem(key="test", timeout=60, user_related=False), single_flight=True)
+        func = mock.Mock(return_value="v1", __name__="query", __module__=__name__)
+        assert using_cache(func)() == "v1"
+        assert func.call_count == 1
+        # 执行完成后释放锁
+        cache_key = using_cache._cache_key(func, (), {})
+        assert backend_cache.get(using_cache._lock_key(cache_key)) is None
+
+    def test_wait_for_other(self, backend_cache, mocker):
+        using_cache = UsingCache(
+            CacheTypeItem(key="test", timeout=60, user_related=False), single_flight=True, stale_ttl=30
+        )
+        func = mock.Mock(return_value="v1", __name__="query", __module__=__name__)
+        cache_key = using_cache._cache_key(func, (), {})
+        backend_cache.add(using_cache._lock_key(cache_key), 1, 60)
+
+        # 其他进程在等待期间写入了缓存
+        mock_sleep = mocker.patch(
+            "bkmonitor.utils.cache.time.sleep", side_effect=lambda _: using_cache._set_cache(cache_key, "other")
+        )
+        assert using_cache(func)() == "other"
+        assert mock_sleep.call_count == 1
+        func.assert_not_called()
+
+    def test_lock_released_without_value(self, backend_cache, mocker):
+        using_cache = UsingCache(CacheTypeItem(key="test", timeout=60, user_related=False), single_flight=True)
+        func = mock.Mock(return_value="v1", __name__="query", __module__=__name__)
+        cache_key = using_cache._cache_key(func, (), {})
+        lock_key = using_cache._lock_key(cache_key)
+        backend_cache.add(lock_key, 1, 60)
+
+        # 其他进程执行失败，释放了锁但没有写入缓存，则自行执行
+        mocker.patch("bkmonitor.utils.cache.time.sleep", side_effect=lambda _: backend_cache.delete(lock_key))
+        assert using_cache(func)() == "v1"
+        assert func.call_count == 1
+
+    def test_keep_lock_of_other(self, backend_cache):
+        using_cache = UsingCache(CacheTypeItem(key="test", timeout=60, user_related=False), single_flight=True)
+        lock_key = using_cache._lock_key(using_cache._cache_key(query, ("v1",), {}))
+
+        # 执行超时导致锁过期，并被其他进程重新获取
+        def slow_query(value):
+            backend_cache.set(lock_key, 1, 60)
+            return value
+
+        slow_query.__name__, slow_query.__module__ = query.__name__, query.__module__
+        assert using_cache(slow_query)("v1") == "v1"
+        # 只删除自己持有的锁，不影响其他进程的锁
+        assert backend_cache.get(lock_key) == 1
+
+
+class TestCacheKey(object):
+    def test_stale_key_prefix(self, backend_cache):
+        cache_type = CacheTypeItem(key="test", timeout=60, user_related=False)
+        normal_key = UsingCache(cache_type)._cache_key(query, (), {})
+        stale_key = UsingCache(cache_type, stale_ttl=30)._cache_key(query, (), {})
+        # 开启过期数据可用时数据格式不同，使用独立的key，避免与普通缓存互相读取
+        assert normal_key.startswith(UsingCache.key_prefix + ":")
+        assert stale_key.startswith(UsingCache.stale_key_prefix + ":")
+
+    def test_bcs_defaults(self):
+        assert not CacheType.BCS.single_flight
+        assert not CacheType.BCS.stale_ttl
@@ -119,3 +119,5 @@ KAFKA_SASL_PROTOCOL = "SASL_PLAINTEXT"
 VM_STORAGE_TYPE = "vm"
 # metadata 结果表白名单 key
 METADATA_RESULT_TABLE_WHITE_LIST = "metadata:query_metric:table_id_list"
+# 自定义时序指标增量同步状态 key，field 为 time_series_group_id，value 为同步水位及上次全量同步时间
+TS_METRIC_SYNC_STATE_KEY = "metadata:ts_metric_sync:state"
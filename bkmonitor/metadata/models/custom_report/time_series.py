@@ -11,7 +11,6 @@ specific language governing permissions and limitations under the License.
 import datetime
 import json
 import logging
-import math
 import time
 from typing import Dict, List, Optional, Set, Tuple, Union
 
@@ -494,10 +493,18 @@ class TimeSeriesGroup(CustomGroupBase):
             ret_data.append(item)
         return ret_data
 
-    def get_metrics_from_redis(self, expired_time: Optional[int] = settings.TIME_SERIES_METRIC_EXPIRED_SECONDS):
+    def get_metrics_from_redis(
+        self,
+        expired_time: Optional[int] = settings.TIME_SERIES_METRIC_EXPIRED_SECONDS,
+        begin_ts: Optional[float] = None,
+        raise_exception: bool = False,
+    ):
         """从 redis 中获取数据
 
         其中，redis 中数据有 transfer 上报
+        :param expired_time: 获取最近多长时间内有上报的指标
+        :param begin_ts: 只获取该时间(含)之后有上报的指标，早于有效期开始时间时以有效期为准
+        :param raise_exception: 某一批数据获取失败时是否抛出异常，默认记录日志后返回已获取的数据
         """
         # 从 bkdata 获取指标数据
         data = RedisTools.get_list(config.METADATA_RESULT_TABLE_WHITE_LIST)
@@ -511,66 +518,159 @@ class TimeSeriesGroup(CustomGroupBase):
         metric_dimensions_key = f"{settings.METRIC_DIMENSIONS_KEY_PREFIX}{self.bk_data_id}"
 
         now_time = tz_now()
-        fetch_step = settings.MAX_METRICS_FETCH_STEP
+        fetch_step = int(settings.MAX_METRICS_FETCH_STEP)
         valid_begin_ts = (now_time - datetime.timedelta(seconds=expired_time)).timestamp()
-        metrics_filter_params = {"name": custom_metrics_key, "min": valid_begin_ts, "max": now_time.timestamp()}
+        if begin_ts is not None:
+            valid_begin_ts = max(valid_begin_ts, begin_ts)
+        max_ts = now_time.timestamp()
 
         metrics_info = []
-        # 分批拉取 redis 数据，防止大批量数据拖垮
-        for i in range(math.ceil(client.zcount(**metrics_filter_params) / fetch_step)):
+        # 按 score 游标分批拉取 redis 数据，防止大批量数据拖垮
+        # 下一批从上一批最后的 score 开始，仅跳过与其 score 相同且已拉取过的成员，避免 offset 翻页时从头扫描
+        cursor_score, cursor_offset = valid_begin_ts, 0
+        while True:
+            metrics_filter_params = {"name": custom_metrics_key, "min": cursor_score, "max": max_ts}
             try:
-                # 0. 首先获取有效期内的所有 metrics
+                # 0. 首先获取有效期内的一批 metrics
                 metrics_with_scores: List[Tuple[bytes, float]] = client.zrangebyscore(
-                    **metrics_filter_params, start=fetch_step * i, num=fetch_step, withscores=True
+                    **metrics_filter_params, start=cursor_offset, num=fetch_step, withscores=True
                 )
             except Exception:
                 logger.exception("failed to get metrics from storage, filter params: %s", metrics_filter_params)
-                # metrics 可能存在大批量内容，可容忍某一步出错
+                if raise_exception:
+                    raise
+                break
+            if not metrics_with_scores:
+                break
+
+            # 更新游标
+            last_score = metrics_with_scores[-1][1]
+            same_score_count = 0
+            for _, score in reversed(metrics_with_scores):
+                if score != last_score:
+                    break
+                same_score_count += 1
+            if last_score == cursor_score:
+                cursor_offset += same_score_count
+            else:
+                cursor_score, cursor_offset = last_score, same_score_count
+
+            metrics_info.extend(
+                self._parse_metrics_with_dimensions(
+                    client, metric_dimensions_key, metrics_with_scores, raise_exception=raise_exception
+                )
+            )
+
+            if len(metrics_with_scores) < fetch_step:
+                break
+        return metrics_info
+
+    def _parse_metrics_with_dimensions(
+        self,
+        client,
+        metric_dimensions_key: str,
+        metrics_with_scores: List[Tuple[bytes, float]],
+        raise_exception: bool = False,
+    ) -> List[Dict]:
+        """获取一批 metrics 的 dimensions 信息，并组装为指标信息"""
+        # 1. 获取当前这批 metrics 的 dimensions 信息
+        try:
+            dimensions_list: List[bytes] = client.hmget(metric_dimensions_key, [x[0] for x in metrics_with_scores])
+        except Exception:
+            logger.exception("failed to get dimensions from metrics")
+            if raise_exception:
+                raise
+            return []
+
+        metrics_info = []
+        # 2. 尝试更新 metrics 和对应 dimensions(tags)
+        for j, metric_with_score in enumerate(metrics_with_scores):
+            # 理论上 metrics 和 dimensions 列表一一对应
+            dimensions_info = dimensions_list[j]
+            if not dimensions_info:
                 continue
 
-            # 1. 获取当前这批 metrics 的 dimensions 信息
             try:
-                dimensions_list: List[bytes] = client.hmget(metric_dimensions_key, [x[0] for x in metrics_with_scores])
+                dimensions = json.loads(dimensions_info)["dimensions"]
             except Exception:
-                logger.exception("failed to get dimensions from metrics")
+                logger.exception("failed to parse dimension from dimensions info: %s", dimensions_info)
                 continue
 
-            # 2. 尝试更新 metrics 和对应 dimensions(tags)
-            for j, metric_with_score in enumerate(metrics_with_scores):
-                # 理论上 metrics 和 dimensions 列表一一对应
-                dimensions_info = dimensions_list[j]
-                if not dimensions_info:
-                    continue
+            # 因为获取到的为bytes类型，避免后续更新`table id`时，组装格式错误，转换为字符串
+            field_name = metric_with_score[0]
+            if type(field_name) == bytes:
+                field_name = field_name.decode("utf-8")
+            metrics_info.append(
+                {
+                    "field_name": field_name,
+                    "tag_value_list": dimensions,
+                    "last_modify_time": metric_with_score[1],
+                }
+            )
+        return metrics_info
 
-                try:
-                    dimensions = json.loads(dimensions_info)["dimensions"]
-                except Exception:
-                    logger.exception("failed to parse dimension from dimensions info: %s", dimensions_info)
-                    continue
+    def get_metric_sync_state(self) -> Dict:
+        """获取指标增量同步的状态，包括同步水位及上次全量同步时间"""
+        try:
+            state = RedisTools.hget(config.TS_METRIC_SYNC_STATE_KEY, str(self.time_series_group_id))
+            return json.loads(state) if state else {}
+        except Exception:
+            logger.exception("failed to get metric sync state of group->[%s]", self.time_series_group_id)
+            return {}
 
-                # 因为获取到的为bytes类型，避免后续更新`table id`时，组装格式错误，转换为字符串
-                field_name = metric_with_score[0]
-                if type(field_name) == bytes:
-                    field_name = field_name.decode("utf-8")
-                metrics_info.append(
-                    {
-                        "field_name": field_name,
-                        "tag_value_list": dimensions,
-                        "last_modify_time": metric_with_score[1],
-                    }
-                )
-        return metrics_info
+    def set_metric_sync_state(self, state: Dict):
+        try:
+            RedisTools.hset_to_redis(config.TS_METRIC_SYNC_STATE_KEY, str(self.time_series_group_id), json.dumps(state))
+        except Exception:
+            logger.exception("failed to set metric sync state of group->[%s]", self.time_series_group_id)
 
     def update_time_series_metrics(self) -> bool:
         """从远端存储中同步TS的指标和维度对应关系
 
+        开启增量同步时，只拉取上次同步水位之后有上报的指标，并按 TIME_SERIES_METRIC_FULL_SYNC_INTERVAL 定期全量同步兜底
         :return: 返回是否有更新指标
         """
-        metrics_info = self.get_metrics_from_redis(expired_time=settings.FETCH_TIME_SERIES_METRIC_INTERVAL_SECONDS)
-        # 如果为空，直接返回
-        if not metrics_info:
+        if not settings.ENABLE_TIME_SERIES_METRIC_INCREMENTAL_SYNC:
+            metrics_info = self.get_metrics_from_redis(expired_time=settings.FETCH_TIME_SERIES_METRIC_INTERVAL_SECONDS)
+            # 如果为空，直接返回
+            if not metrics_info:
+                return False
+            return self._update_time_series_metrics(metrics_info)
+
+        now_ts = time.time()
+        state = self.get_metric_sync_state()
+        is_full_sync = now_ts - state.get("full_sync_time", 0) >= settings.TIME_SERIES_METRIC_FULL_SYNC_INTERVAL
+        begin_ts = None if is_full_sync else state.get("watermark")
+        try:
+            metrics_info = self.get_metrics_from_redis(
+                expired_time=settings.FETCH_TIME_SERIES_METRIC_INTERVAL_SECONDS, begin_ts=begin_ts, raise_exception=True
+            )
+        except Exception:
+            # 部分数据获取失败时不推进水位及全量同步时间，下次重新拉取，避免遗漏失败批次中的指标
+            logger.exception(
+                "TimeSeriesGroup<%s> failed to sync metrics from redis, keep sync state: %s", self.pk, state
+            )
             return False
 
+        is_updated = False
+        if metrics_info:
+            is_updated = self._update_time_series_metrics(metrics_info)
+            # 同步成功后才推进水位，水位上的指标下次会被重复拉取，保证不遗漏
+            state["watermark"] = max(state.get("watermark", 0), *(m["last_modify_time"] for m in metrics_info))
+        if is_full_sync:
+            state["full_sync_time"] = now_ts
+        self.set_metric_sync_state(state)
+
+        logger.info(
+            "TimeSeriesGroup<%s> sync %s metrics from redis, full_sync: %s, watermark: %s",
+            self.pk,
+            len(metrics_info),
+            is_full_sync,
+            state.get("watermark"),
+        )
+        return is_updated
+
+    def _update_time_series_metrics(self, metrics_info: List[Dict]) -> bool:
         # 记录是否有更新，然后推送redis并发布通知
         is_updated = self.update_metrics(metrics_info)
         logger.debug("TimeSeriesGroup<%s> already updated all metrics", self.pk)
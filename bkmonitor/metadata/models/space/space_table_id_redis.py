@@ -57,6 +57,255 @@ logger = logging.getLogger("metadata")
 class SpaceTableIDRedis:
     """空间路由结果表数据推送 redis 相关功能"""
 
+    # 批量推送时，每批次读取及写入 redis 的空间数量
+    BULK_PUSH_CHUNK_SIZE = 500
+
+    def __init__(self):
+        # 批量推送时预加载的与空间无关的数据，为空时按空间逐个查询
+        self._bulk_index = None
+
+    def load_bulk_index(self):
+        """一次性加载与空间无关的结果表数据，供批量计算各空间路由时复用，避免每个空间重复查询"""
+        from metadata.models.record_rule.rules import RecordRule
+
+        refine_table_ids = (
+            set(models.InfluxDBStorage.objects.values_list("table_id", flat=True))
+            | set(models.AccessVMRecord.objects.values_list("result_table_id", flat=True))
+            | set(models.ESStorage.objects.values_list("table_id", flat=True))
+        )
+
+        es_table_ids_by_biz = {}
+        es_tables = models.ResultTable.objects.filter(
+            default_storage=models.ClusterInfo.TYPE_ES, is_deleted=False, is_enable=True
+        ).values_list("bk_biz_id", "table_id")
+        for bk_biz_id, table_id in es_tables:
+            es_table_ids_by_biz.setdefault(bk_biz_id, []).append(table_id)
+
+        record_rule_table_ids = {}
+        for space_type, space_id, table_id in RecordRule.objects.values_list("space_type", "space_id", "table_id"):
+            record_rule_table_ids.setdefault((space_type, space_id), []).append(table_id)
+
+        # 空间关联的数据源，格式: {(space_type, space_id): [(bk_data_id, from_authorization)]}
+        space_data_ids = {}
+        for space_type, space_id, bk_data_id, from_authorization in models.SpaceDataSource.objects.values_list(
+            "space_type_id", "space_id", "bk_data_id", "from_authorization"
+        ):
+            space_data_ids.setdefault((space_type, space_id), []).append((bk_data_id, from_authorization))
+
+        data_id_table_ids = {}
+        for bk_data_id, table_id in models.DataSourceResultTable.objects.values_list("bk_data_id", "table_id"):
+            data_id_table_ids.setdefault(bk_data_id, []).append(table_id)
+
+        # 空间关联的资源，按主键排序，与逐个查询时 first() 的结果保持一致
+        space_resources = {}
+        for sr in (
+            models.SpaceResource.objects.filter(
+                resource_type__in=[SpaceTypes.BKCC.value, SpaceTypes.BCS.value, SpaceTypes.BKSAAS.value]
+            )
+            .order_by("id")
+            .values("space_type_id", "space_id", "resource_type", "resource_id", "dimension_values")
+        ):
+            space_resources.setdefault((sr["space_type_id"], sr["space_id"], sr["resource_type"]), []).append(sr)
+
+        # 集群数据源，同 get_cluster_data_ids
+        cluster_data_ids, k8s_data_id_cluster_id, custom_data_id_cluster_id = {}, {}, {}
+        for cluster in models.BCSClusterInfo.objects.values(
+            "cluster_id", "K8sMetricDataID", "CustomMetricDataID", "status"
+        ):
+            if cluster["status"] not in [
+                models.BCSClusterInfo.CLUSTER_STATUS_DELETED,
+                models.BCSClusterInfo.CLUSTER_RAW_STATUS_DELETED,
+            ]:
+                cluster_data_ids[cluster["cluster_id"]] = [cluster["K8sMetricDataID"], cluster["CustomMetricDataID"]]
+            k8s_data_id_cluster_id[cluster["K8sMetricDataID"]] = cluster["cluster_id"]
+            custom_data_id_cluster_id[cluster["CustomMetricDataID"]] = cluster["cluster_id"]
+
+        self._bulk_index = {
+            "refine_table_ids": refine_table_ids,
+            "es_table_ids_by_biz": es_table_ids_by_biz,
+            "record_rule_table_ids": record_rule_table_ids,
+            "space_data_ids": space_data_ids,
+            "data_id_table_ids": data_id_table_ids,
+            "space_resources": space_resources,
+            "cluster_data_ids": cluster_data_ids,
+            "k8s_data_id_cluster_id": k8s_data_id_cluster_id,
+            "custom_data_id_cluster_id": custom_data_id_cluster_id,
+            "platform_data_ids": list(
+                models.DataSource.objects.filter(is_platform_data_id=True).values_list("bk_data_id", "space_type_id")
+            ),
+            "space_pks": {
+                (space_type, space_id): pk
+                for space_type, space_id, pk in models.Space.objects.values_list("space_type_id", "space_id", "id")
+            },
+            "bcs_biz_table_ids": list(
+                models.ResultTable.objects.filter(
+                    Q(table_id__startswith=BKCI_SYSTEM_TABLE_ID_PREFIX)
+                    | Q(table_id__in=settings.BKCI_SPACE_ACCESS_PLUGIN_LIST)
+                ).values_list("table_id", flat=True)
+            ),
+            "bkci_1001_table_ids": list(
+                models.ResultTable.objects.filter(table_id__startswith=BKCI_1001_TABLE_ID_PREFIX).values_list(
+                    "table_id", flat=True
+                )
+            ),
+            "p4_1001_table_ids": list(
+                models.ResultTable.objects.filter(table_id__startswith=P4_1001_TABLE_ID_PREFIX).values_list(
+                    "table_id", flat=True
+                )
+            ),
+        }
+
+    def clear_bulk_index(self):
+        self._bulk_index = None
+
+    def compose_space_table_ids(self, space_type: str, space_id: str) -> Dict:
+        """计算空间对应的结果表及过滤条件，不写入 redis"""
+        space_id = str(space_id)
+        if space_type == SpaceTypes.BKCC.value:
+            return self._push_bkcc_space_table_ids(space_type, space_id, can_push_data=False)
+        elif space_type == SpaceTypes.BKCI.value:
+            return self._push_bkci_space_table_ids(space_type, space_id, can_push_data=False)
+        elif space_type == SpaceTypes.BKSAAS.value:
+            return self._push_bksaas_space_table_ids(space_type, space_id, can_push_data=False)
+        return {}
+
+    def bulk_push_space_table_ids(self, space_list: List[Dict], is_publish: Optional[bool] = False) -> List[str]:
+        """批量推送空间路由
+
+        预加载公共数据后逐个计算空间路由，并与 redis 中已有数据对比，仅写入及通知有变化的空间
+        :param space_list: 空间列表，格式: [{"space_type": "bkcc", "space_id": "2"}]
+        :return: 路由有变化的空间 UID 列表
+        """
+        from metadata.task.utils import bulk_handle
+
+        logger.info("start to bulk push space table_id data, space count: %s", len(space_list))
+        self.load_bulk_index()
+        # 多线程并发计算各空间路由，预加载数据只读，可在线程间共享
+        composed_values = {}
+
+        def _compose(spaces: List[Dict]):
+            for space in spaces:
+                space_uid = f"{space['space_type']}__{space['space_id']}"
+                try:
+                    composed_values[space_uid] = self.compose_space_table_ids(space["space_type"], space["space_id"])
+                except Exception:
+                    logger.exception("compose space table_id data error, space: %s", space_uid)
+
+        try:
+            if space_list:
+                bulk_handle(_compose, space_list)
+        finally:
+            self.clear_bulk_index()
+
+        changed_space_uids = []
+        for i in range(0, len(space_list), self.BULK_PUSH_CHUNK_SIZE):
+            chunk = space_list[i : i + self.BULK_PUSH_CHUNK_SIZE]
+            space_uids = [f"{space['space_type']}__{space['space_id']}" for space in chunk]
+            current_values = RedisTools.hmget(SPACE_TO_RESULT_TABLE_KEY, space_uids)
+
+            redis_values = {}
+            for space_uid, current_value in zip(space_uids, current_values):
+                _values = composed_values.get(space_uid)
+                # 与逐个推送保持一致，空数据不推送
+                if not _values:
+                    continue
+                if current_value and json.loads(current_value) == _values:
+                    continue
+                redis_values[space_uid] = json.dumps(_values)
+
+            if redis_values:
+                RedisTools.hmset_to_redis(SPACE_TO_RESULT_TABLE_KEY, redis_values)
+                changed_space_uids.extend(redis_values.keys())
+
+        if is_publish and changed_space_uids:
+            RedisTools.publish(SPACE_TO_RESULT_TABLE_CHANNEL, changed_space_uids)
+        logger.info(
+            "bulk push space table_id data successfully, space count: %s, changed count: %s",
+            len(space_list),
+            len(changed_space_uids),
+        )
+        return changed_space_uids
+
+    def _get_platform_data_ids(self, space_type: Optional[str] = None) -> Dict[int, str]:
+        """同 get_platform_data_ids，存在预加载数据时从预加载数据中获取"""
+        if self._bulk_index is None:
+            return get_platform_data_ids(space_type=space_type)
+        return {
+            bk_data_id: space_type_id
+            for bk_data_id, space_type_id in self._bulk_index["platform_data_ids"]
+            if not space_type or space_type == SpaceTypes.BKCC.value or space_type_id == space_type
+        }
+
+    def _get_space_table_id_data_id(
+        self,
+        space_type: str,
+        space_id: str,
+        table_id_list: Optional[List] = None,
+        from_authorization: Optional[bool] = None,
+        include_platform_data_id: Optional[bool] = True,
+        exclude_data_id_list: Optional[List] = None,
+    ) -> Dict:
+        """同 get_space_table_id_data_id，存在预加载数据时从预加载数据中获取"""
+        if self._bulk_index is None or table_id_list:
+            return get_space_table_id_data_id(
+                space_type,
+                space_id,
+                table_id_list=table_id_list,
+                from_authorization=from_authorization,
+                include_platform_data_id=include_platform_data_id,
+                exclude_data_id_list=exclude_data_id_list,
+            )
+        data_ids = {
+            bk_data_id
+            for bk_data_id, _from_authorization in self._bulk_index["space_data_ids"].get((space_type, space_id), [])
+            if from_authorization is None or _from_authorization == from_authorization
+        }
+        if include_platform_data_id:
+            data_ids |= set(self._get_platform_data_ids(space_type=space_type).keys())
+        if exclude_data_id_list:
+            data_ids -= set(exclude_data_id_list)
+        data_id_table_ids = self._bulk_index["data_id_table_ids"]
+        return {table_id: bk_data_id for bk_data_id in data_ids for table_id in data_id_table_ids.get(bk_data_id, [])}
+
+    def _get_result_tables_by_data_ids(self, data_id_list: List, table_id_list: Optional[List] = None) -> Dict:
+        """同 get_result_tables_by_data_ids，存在预加载数据时从预加载数据中获取"""
+        if self._bulk_index is None or table_id_list or not data_id_list:
+            return get_result_tables_by_data_ids(data_id_list, table_id_list)
+        data_id_table_ids = self._bulk_index["data_id_table_ids"]
+        return {
+            table_id: bk_data_id for bk_data_id in data_id_list for table_id in data_id_table_ids.get(bk_data_id, [])
+        }
+
+    def _get_cluster_data_ids(self, cluster_id_list: List, table_id_list: Optional[List] = None) -> Dict:
+        """同 get_cluster_data_ids，存在预加载数据时从预加载数据中获取"""
+        if self._bulk_index is None or table_id_list:
+            return get_cluster_data_ids(cluster_id_list, table_id_list)
+        data_id_list = []
+        for cluster_id in cluster_id_list:
+            data_id_list.extend(self._bulk_index["cluster_data_ids"].get(cluster_id, []))
+        data_id_cluster_id = {}
+        for data_id_map in [self._bulk_index["k8s_data_id_cluster_id"], self._bulk_index["custom_data_id_cluster_id"]]:
+            data_id_cluster_id.update(
+                {data_id: data_id_map[data_id] for data_id in data_id_list if data_id in data_id_map}
+            )
+        return data_id_cluster_id
+
+    def _get_space_resource(
+        self, space_type: str, space_id: str, resource_type: str, resource_id: Optional[str] = None
+    ) -> Optional[Dict]:
+        """获取空间关联的资源，返回第一条记录的 resource_id 及 dimension_values"""
+        if self._bulk_index is not None:
+            for sr in self._bulk_index["space_resources"].get((space_type, space_id, resource_type), []):
+                if resource_id is None or sr["resource_id"] == resource_id:
+                    return sr
+            return None
+        qs = models.SpaceResource.objects.filter(
+            space_type_id=space_type, space_id=space_id, resource_type=resource_type
+        )
+        if resource_id is not None:
+            qs = qs.filter(resource_id=resource_id)
+        return qs.values("resource_id", "dimension_values").first()
+
     def push_space_table_ids(
         self, space_type: str, space_id: str, is_publish: Optional[bool] = False, can_push_data: Optional[bool] = True
     ):
@@ -358,18 +607,20 @@ class SpaceTableIDRedis:
         logger.info("start to push cluster of bcs space table_id, space_type: %s, space_id: %s", space_type, space_id)
         # 首先获取关联业务的数据
         resource_type = SpaceTypes.BKCC.value
-        obj = models.SpaceResource.objects.filter(
-            space_type_id=space_type, space_id=space_id, resource_type=resource_type
-        ).first()
+        obj = self._get_space_resource(space_type, space_id, resource_type)
         if not obj:
             logger.error("space: %s__%s, resource_type: %s not found", space_type, space_id, resource_type)
             return {}
         # 获取空间关联的业务，注意这里业务 ID 为字符串类型
         # 追加空间访问指定插件的 filter
-        tids = models.ResultTable.objects.filter(
-            Q(table_id__startswith=BKCI_SYSTEM_TABLE_ID_PREFIX) | Q(table_id__in=settings.BKCI_SPACE_ACCESS_PLUGIN_LIST)
-        ).values_list("table_id", flat=True)
-        return {tid: {"filters": [{"bk_biz_id": str(obj.resource_id)}]} for tid in tids}
+        if self._bulk_index is not None:
+            tids = self._bulk_index["bcs_biz_table_ids"]
+        else:
+            tids = models.ResultTable.objects.filter(
+                Q(table_id__startswith=BKCI_SYSTEM_TABLE_ID_PREFIX)
+                | Q(table_id__in=settings.BKCI_SPACE_ACCESS_PLUGIN_LIST)
+            ).values_list("table_id", flat=True)
+        return {tid: {"filters": [{"bk_biz_id": str(obj["resource_id"])}]} for tid in tids}
 
     def _compose_bcs_space_cluster_table_ids(
         self,
@@ -381,15 +632,12 @@ class SpaceTableIDRedis:
         # 获取空间的集群数据
         resource_type = SpaceTypes.BCS.value
         # 优先进行判断项目相关联的容器资源，减少等待
-        sr_objs = models.SpaceResource.objects.filter(
-            space_type_id=space_type, space_id=space_id, resource_type=resource_type, resource_id=space_id
-        )
         default_values = {}
-        str_obj = sr_objs.first()
+        str_obj = self._get_space_resource(space_type, space_id, resource_type, resource_id=space_id)
         if not str_obj:
             logger.error("space: %s__%s, resource_type: %s not found", space_type, space_id, resource_type)
             return default_values
-        res_list = str_obj.dimension_values
+        res_list = str_obj["dimension_values"]
         # 如果关键维度数据为空，同样返回默认
         if not res_list:
             return default_values
@@ -404,12 +652,12 @@ class SpaceTableIDRedis:
                 cluster_info[res["cluster_id"]] = [{"bcs_cluster_id": res["cluster_id"], "namespace": None}]
         cluster_id_list = list(cluster_info.keys())
         # 获取集群下对应的数据源
-        data_id_cluster_id = get_cluster_data_ids(cluster_id_list)
+        data_id_cluster_id = self._get_cluster_data_ids(cluster_id_list)
         if not data_id_cluster_id:
             logger.error("space: %s__%s not found cluster", space_type, space_id)
             return default_values
         # 获取结果表及数据源
-        table_id_data_id = get_result_tables_by_data_ids(list(data_id_cluster_id.keys()))
+        table_id_data_id = self._get_result_tables_by_data_ids(list(data_id_cluster_id.keys()))
         # 组装 filter
         _values = {}
         for tid, data_id in table_id_data_id.items():
@@ -425,13 +673,16 @@ class SpaceTableIDRedis:
         """组装 bkci 全局下的结果表"""
         logger.info("start to push bkci level table_id, space_type: %s, space_id: %s", space_type, space_id)
         # 过滤空间级的数据源
-        data_ids = get_platform_data_ids(space_type=space_type)
+        data_ids = self._get_platform_data_ids(space_type=space_type)
         # 一个空间下 data_id 不会太多
-        table_is_list = list(
-            models.DataSourceResultTable.objects.filter(bk_data_id__in=data_ids.keys()).values_list(
-                "table_id", flat=True
+        if self._bulk_index is not None:
+            table_is_list = list(self._get_result_tables_by_data_ids(list(data_ids.keys())).keys()) if data_ids else []
+        else:
+            table_is_list = list(
+                models.DataSourceResultTable.objects.filter(bk_data_id__in=data_ids.keys()).values_list(
+                    "table_id", flat=True
+                )
             )
-        )
         _values = {}
         if not table_is_list:
             return _values
@@ -446,7 +697,7 @@ class SpaceTableIDRedis:
     def _compose_bkci_other_table_ids(self, space_type: str, space_id: str) -> Dict:
         logger.info("start to push bkci space other table_id, space_type: %s, space_id: %s", space_type, space_id)
         exclude_data_id_list = utils.cached_cluster_data_id_list()
-        table_id_data_id = get_space_table_id_data_id(
+        table_id_data_id = self._get_space_table_id_data_id(
             space_type,
             space_id,
             exclude_data_id_list=exclude_data_id_list,
@@ -473,13 +724,17 @@ class SpaceTableIDRedis:
         logger.info(
             "start to push bkci space cross space_type table_id, space_type: %s, space_id: %s", space_type, space_id
         )
-        tids = models.ResultTable.objects.filter(table_id__startswith=BKCI_1001_TABLE_ID_PREFIX).values_list(
-            "table_id", flat=True
-        )
-        # bkci 访问 p4 主机数据对应的结果表
-        p4_tids = models.ResultTable.objects.filter(table_id__startswith=P4_1001_TABLE_ID_PREFIX).values_list(
-            "table_id", flat=True
-        )
+        if self._bulk_index is not None:
+            tids = self._bulk_index["bkci_1001_table_ids"]
+            p4_tids = self._bulk_index["p4_1001_table_ids"]
+        else:
+            tids = models.ResultTable.objects.filter(table_id__startswith=BKCI_1001_TABLE_ID_PREFIX).values_list(
+                "table_id", flat=True
+            )
+            # bkci 访问 p4 主机数据对应的结果表
+            p4_tids = models.ResultTable.objects.filter(table_id__startswith=P4_1001_TABLE_ID_PREFIX).values_list(
+                "table_id", flat=True
+            )
         # 组装结果表对应的 filter
         tid_filters = {tid: {"filters": [{"projectId": space_id}]} for tid in tids}
         tid_filters.update({tid: {"filters": [{"devops_id": space_id}]} for tid in p4_tids})
@@ -489,10 +744,15 @@ class SpaceTableIDRedis:
         """组装非业务类型的全空间类型的结果表数据"""
         logger.info("start to push all space type table_id, space_type: %s, space_id: %s", space_type, space_id)
         # 转换空间对应的bk_biz_id
-        try:
-            _id = models.Space.objects.get(space_type_id=space_type, space_id=space_id).id
-        except models.Space.DoesNotExist:
-            return {}
+        if self._bulk_index is not None:
+            _id = self._bulk_index["space_pks"].get((space_type, space_id))
+            if _id is None:
+                return {}
+        else:
+            try:
+                _id = models.Space.objects.get(space_type_id=space_type, space_id=space_id).id
+            except models.Space.DoesNotExist:
+                return {}
         return {tid: {"filters": [{"bk_biz_id": str(-_id)}]} for tid in ALL_SPACE_TYPE_TABLE_ID_LIST}
 
     def _compose_bksaas_space_cluster_table_ids(
@@ -507,15 +767,12 @@ class SpaceTableIDRedis:
         # 获取空间的集群数据
         resource_type = SpaceTypes.BKSAAS.value
         # 优先进行判断项目相关联的容器资源，减少等待
-        sr_objs = models.SpaceResource.objects.filter(
-            space_type_id=space_type, space_id=space_id, resource_type=resource_type, resource_id=space_id
-        )
         default_values = {}
-        str_obj = sr_objs.first()
+        str_obj = self._get_space_resource(space_type, space_id, resource_type, resource_id=space_id)
         if not str_obj:
             logger.error("space: %s__%s, resource_type: %s not found", space_type, space_id, resource_type)
             return default_values
-        res_list = str_obj.dimension_values
+        res_list = str_obj["dimension_values"]
         # 如果关键维度数据为空，同样返回默认
         if not res_list:
             return default_values
@@ -530,12 +787,12 @@ class SpaceTableIDRedis:
                 cluster_info[res["cluster_id"]] = [{"bcs_cluster_id": res["cluster_id"], "namespace": None}]
         cluster_id_list = list(cluster_info.keys())
         # 获取集群下对应的数据源
-        data_id_cluster_id = get_cluster_data_ids(cluster_id_list, table_id_list)
+        data_id_cluster_id = self._get_cluster_data_ids(cluster_id_list, table_id_list)
         if not data_id_cluster_id:
             logger.error("space: %s__%s not found cluster", space_type, space_id)
             return default_values
         # 获取结果表及数据源
-        table_id_data_id = get_result_tables_by_data_ids(list(data_id_cluster_id.keys()), table_id_list)
+        table_id_data_id = self._get_result_tables_by_data_ids(list(data_id_cluster_id.keys()), table_id_list)
         # 组装 filter
         _values = {}
         for tid, data_id in table_id_data_id.items():
@@ -554,7 +811,7 @@ class SpaceTableIDRedis:
         logger.info("start to push bksaas space other table_id, space_type: %s, space_id: %s", space_type, space_id)
         exclude_data_id_list = utils.cached_cluster_data_id_list()
         # 过滤到对应的结果表
-        table_id_data_id = get_space_table_id_data_id(
+        table_id_data_id = self._get_space_table_id_data_id(
             space_type,
             space_id,
             table_id_list=table_id_list,
@@ -586,7 +843,7 @@ class SpaceTableIDRedis:
         default_filters: Optional[List] = None,
     ) -> Dict:
         # 过滤到对应的结果表
-        table_id_data_id = get_space_table_id_data_id(
+        table_id_data_id = self._get_space_table_id_data_id(
             space_type,
             space_id,
             table_id_list=table_id_list,
@@ -633,9 +890,16 @@ class SpaceTableIDRedis:
         # 获取结果表对应的类型
         measurement_type_dict = get_measurement_type_by_table_id(table_ids, _table_list, table_id_data_id)
         # 获取空间所属的数据源 ID
-        _space_data_ids = models.SpaceDataSource.objects.filter(
-            space_type_id=space_type, space_id=space_id, from_authorization=False
-        ).values_list("bk_data_id", flat=True)
+        if self._bulk_index is not None:
+            _space_data_ids = {
+                bk_data_id
+                for bk_data_id, from_auth in self._bulk_index["space_data_ids"].get((space_type, space_id), [])
+                if not from_auth
+            }
+        else:
+            _space_data_ids = models.SpaceDataSource.objects.filter(
+                space_type_id=space_type, space_id=space_id, from_authorization=False
+            ).values_list("bk_data_id", flat=True)
         for tid in table_ids:
             # NOTE: 特殊逻辑，忽略跨空间类型的 bkci 的结果表; 如果有其它，再提取为常量
             if tid.startswith(BKCI_1001_TABLE_ID_PREFIX):
@@ -678,17 +942,35 @@ class SpaceTableIDRedis:
         """组装预计算的结果表"""
         from metadata.models.record_rule.rules import RecordRule
 
+        if self._bulk_index is not None:
+            tids = self._bulk_index["record_rule_table_ids"].get((space_type, space_id), [])
+            return {tid: {"filters": []} for tid in tids}
+
         objs = RecordRule.objects.filter(space_type=space_type, space_id=space_id)
         return {obj.table_id: {"filters": []} for obj in objs}
 
     def _compose_es_table_ids(self, space_type: str, space_id: str):
         """组装es的结果表"""
+        if self._bulk_index is not None:
+            biz_id = self._get_biz_id_from_bulk_index(space_type, space_id)
+            tids = self._bulk_index["es_table_ids_by_biz"].get(biz_id, []) if biz_id is not None else []
+            return {tid: {"filters": []} for tid in tids}
+
         biz_id = models.Space.objects.get_biz_id_by_space(space_type, space_id)
         tids = models.ResultTable.objects.filter(
             bk_biz_id=biz_id, default_storage=models.ClusterInfo.TYPE_ES, is_deleted=False, is_enable=True
         ).values_list("table_id", flat=True)
         return {tid: {"filters": []} for tid in tids}
 
+    def _get_biz_id_from_bulk_index(self, space_type: str, space_id: str) -> Optional[int]:
+        """同 SpaceManager.get_biz_id_by_space，从预加载数据中获取"""
+        _id = self._bulk_index["space_pks"].get((space_type, space_id))
+        if _id is None:
+            return None
+        if space_type == SpaceTypes.BKCC.value:
+            return int(space_id)
+        return -_id
+
     def _compose_related_bkci_es_table_ids(self, space_type: str, space_id: str):
         """
         组装关联的BKCI类型的ES结果表
@@ -772,6 +1054,11 @@ class SpaceTableIDRedis:
 
     def _refine_table_ids(self, table_id_list: Optional[List] = None) -> Set:
         """提取写入到influxdb或vm的结果表数据"""
+        if self._bulk_index is not None:
+            if table_id_list:
+                return self._bulk_index["refine_table_ids"] & set(table_id_list)
+            return set(self._bulk_index["refine_table_ids"])
+
         # 过滤写入 influxdb 的结果表
         influxdb_table_ids = models.InfluxDBStorage.objects.values_list("table_id", flat=True)
         if table_id_list:
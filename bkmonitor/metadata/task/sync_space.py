@@ -503,17 +503,21 @@ def push_and_publish_space_router(
     # 拼装数据
     space_list = [{"space_type": space["space_type_id"], "space_id": space["space_id"]} for space in spaces]
 
-    # 批量处理
-    bulk_handle(multi_push_space_table_ids, space_list)
-
-    # 通知到使用方
-    if is_publish:
-        space_uid_list = [f"{space['space_type_id']}__{space['space_id']}" for space in spaces]
-        RedisTools.publish(SPACE_TO_RESULT_TABLE_CHANNEL, space_uid_list)
-
     # 更新数据
     from metadata.models.space.space_table_id_redis import SpaceTableIDRedis
 
+    if settings.ENABLE_SPACE_ROUTER_DIFF_PUSH:
+        # 批量计算，仅推送并通知路由有变化的空间
+        SpaceTableIDRedis().bulk_push_space_table_ids(space_list, is_publish=is_publish)
+    else:
+        # 批量处理
+        bulk_handle(multi_push_space_table_ids, space_list)
+
+        # 通知到使用方
+        if is_publish:
+            space_uid_list = [f"{space['space_type_id']}__{space['space_id']}" for space in spaces]
+            RedisTools.publish(SPACE_TO_RESULT_TABLE_CHANNEL, space_uid_list)
+
     # 仅存在空间 id 时，可以直接按照结果表进行处理
     table_id_list = []
     if space_id:
@@ -287,12 +287,16 @@ def push_and_publish_space_router(
         space_ids = models.Space.objects.filter(space_type_id=space_type).values_list("space_id", flat=True)
         # 拼装数据
         space_list = [{"space_type": space_type, "space_id": space_id} for space_id in space_ids]
-        # 使用线程处理
-        bulk_handle(multi_push_space_table_ids, space_list)
+        if settings.ENABLE_SPACE_ROUTER_DIFF_PUSH:
+            # 批量计算，仅推送并通知路由有变化的空间
+            space_client.bulk_push_space_table_ids(space_list, is_publish=True)
+        else:
+            # 使用线程处理
+            bulk_handle(multi_push_space_table_ids, space_list)
 
-        # 通知到使用方
-        push_redis_keys = [f"{space_type}__{space_id}" for space_id in space_ids]
-        RedisTools.publish(SPACE_TO_RESULT_TABLE_CHANNEL, push_redis_keys)
+            # 通知到使用方
+            push_redis_keys = [f"{space_type}__{space_id}" for space_id in space_ids]
+            RedisTools.publish(SPACE_TO_RESULT_TABLE_CHANNEL, push_redis_keys)
 
     # 更新数据
     space_client.push_data_label_table_ids(table_id_list=table_id_list, is_publish=True)
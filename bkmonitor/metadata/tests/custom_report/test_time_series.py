@@ -9,6 +9,8 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 import datetime
+import json
+import time
 
 import pytest
 
@@ -178,3 +180,126 @@ def test_delete_ts_metrics(create_and_delete_records):
 
     objs = models.TimeSeriesMetric.objects.filter(group_id=DEFAULT_GROUP_ID, field_name="disk_usage1")
     assert not objs.exists()
+
+
+class FakeTransferRedis:
+    def __init__(self, metrics, fail_hmget_calls=()):
+        self.metrics = sorted(metrics.items(), key=lambda x: (x[1], x[0]))
+        self.zrange_calls = []
+        # 指定第几次(从0开始) hmget 调用失败
+        self.fail_hmget_calls = set(fail_hmget_calls)
+        self.hmget_count = 0
+
+    def zrangebyscore(self, name, min, max, start, num, withscores):
+        self.zrange_calls.append((min, start))
+        members = [(m.encode(), score) for m, score in self.metrics if min <= score <= max]
+        return members[start : start + num]
+
+    def hmget(self, name, fields):
+        self.hmget_count += 1
+        if self.hmget_count - 1 in self.fail_hmget_calls:
+            raise ConnectionError("redis error")
+        return [json.dumps({"dimensions": {"bk_target_ip": {}}}) for _ in fields]
+
+
+@pytest.mark.django_db(databases=["default", "monitor_api"])
+def test_get_metrics_from_redis_by_cursor(create_and_delete_records, mocker, settings):
+    now = time.time()
+    # 存在相同 score 的指标跨越分页边界
+    metrics = {"metric_{}".format(i): now - 100 + i // 3 for i in range(10)}
+    client = FakeTransferRedis(metrics)
+    mocker.patch("metadata.models.custom_report.time_series.RedisClient.from_envs", return_value=client)
+    mocker.patch("metadata.models.custom_report.time_series.RedisTools.get_list", return_value=[])
+    mocker.patch.object(
+        models.TimeSeriesGroup, "data_source", new_callable=mocker.PropertyMock, return_value=mocker.MagicMock()
+    )
+    settings.MAX_METRICS_FETCH_STEP = 4
+
+    group = models.TimeSeriesGroup.objects.get(time_series_group_id=DEFAULT_GROUP_ID)
+    metrics_info = group.get_metrics_from_redis(expired_time=3600)
+    assert sorted(m["field_name"] for m in metrics_info) == sorted(metrics)
+
+    # 指定开始时间时，只获取之后有上报的指标
+    metrics_info = group.get_metrics_from_redis(expired_time=3600, begin_ts=now - 97)
+    assert sorted(m["field_name"] for m in metrics_info) == ["metric_9"]
+
+
+@pytest.fixture
+def incremental_sync(create_and_delete_records, mocker, settings):
+    settings.ENABLE_TIME_SERIES_METRIC_INCREMENTAL_SYNC = True
+    settings.FETCH_TIME_SERIES_METRIC_INTERVAL_SECONDS = 3600
+    settings.TIME_SERIES_METRIC_FULL_SYNC_INTERVAL = 6 * 3600
+    settings.MAX_METRICS_FETCH_STEP = 4
+
+    sync_state = {}
+    mocker.patch(
+        "metadata.models.custom_report.time_series.RedisTools.hget",
+        side_effect=lambda key, field: sync_state.get(field),
+    )
+    mocker.patch(
+        "metadata.models.custom_report.time_series.RedisTools.hset_to_redis",
+        side_effect=lambda key, field, value: sync_state.__setitem__(field, value),
+    )
+    mocker.patch("metadata.models.custom_report.time_series.RedisTools.get_list", return_value=[])
+    mocker.patch.object(
+        models.TimeSeriesGroup, "data_source", new_callable=mocker.PropertyMock, return_value=mocker.MagicMock()
+    )
+    update_metrics = mocker.patch.object(models.TimeSeriesGroup, "_update_time_series_metrics", return_value=True)
+    group = models.TimeSeriesGroup.objects.get(time_series_group_id=DEFAULT_GROUP_ID)
+    return group, update_metrics
+
+
+def synced_metrics(update_metrics):
+    return sorted(m["field_name"] for m in update_metrics.call_args[0][0])
+
+
+@pytest.mark.django_db(databases=["default", "monitor_api"])
+def test_update_time_series_metrics_incremental(incremental_sync, mocker, settings):
+    group, update_metrics = incremental_sync
+    now = time.time()
+    metrics = {"metric_{}".format(i): now - 100 + i for i in range(6)}
+    client = FakeTransferRedis(metrics)
+    mocker.patch("metadata.models.custom_report.time_series.RedisClient.from_envs", return_value=client)
+
+    # 首次同步为全量同步，水位推进到最新的上报时间
+    assert group.update_time_series_metrics()
+    assert synced_metrics(update_metrics) == sorted(metrics)
+    watermark = group.get_metric_sync_state()["watermark"]
+    assert watermark == metrics["metric_5"]
+
+    # 增量同步从上次的水位开始拉取
+    metrics["metric_new"] = now - 10
+    client = FakeTransferRedis(metrics)
+    mocker.patch("metadata.models.custom_report.time_series.RedisClient.from_envs", return_value=client)
+    assert group.update_time_series_metrics()
+    assert client.zrange_calls[0][0] == watermark
+    assert synced_metrics(update_metrics) == ["metric_5", "metric_new"]
+    assert group.get_metric_sync_state()["watermark"] == metrics["metric_new"]
+
+    # 到达全量同步间隔时，拉取整个有效期内的指标
+    settings.TIME_SERIES_METRIC_FULL_SYNC_INTERVAL = 0
+    client = FakeTransferRedis(metrics)
+    mocker.patch("metadata.models.custom_report.time_series.RedisClient.from_envs", return_value=client)
+    assert group.update_time_series_metrics()
+    assert client.zrange_calls[0][0] < metrics["metric_0"]
+    assert synced_metrics(update_metrics) == sorted(metrics)
+
+
+@pytest.mark.django_db(databases=["default", "monitor_api"])
+def test_update_time_series_metrics_page_failed(incremental_sync, mocker):
+    group, update_metrics = incremental_sync
+    now = time.time()
+    metrics = {"metric_{}".format(i): now - 100 + i for i in range(6)}
+
+    # 第二批数据获取失败时，不更新指标，也不推进水位及全量同步时间
+    client = FakeTransferRedis(metrics, fail_hmget_calls=[1])
+    mocker.patch("metadata.models.custom_report.time_series.RedisClient.from_envs", return_value=client)
+    assert not group.update_time_series_metrics()
+    update_metrics.assert_not_called()
+    assert group.get_metric_sync_state() == {}
+
+    # 恢复后重新全量拉取
+    client = FakeTransferRedis(metrics)
+    mocker.patch("metadata.models.custom_report.time_series.RedisClient.from_envs", return_value=client)
+    assert group.update_time_series_metrics()
+    assert synced_metrics(update_metrics) == sorted(metrics)
@@ -17,9 +17,13 @@ from metadata.models.space import ds_rt
 from metadata.models.space.space_table_id_redis import SpaceTableIDRedis
 
 from .conftest import (
+    DEFAULT_BCS_CLUSTER_ID_ONE,
+    DEFAULT_BCS_CLUSTER_ID_TWO,
     DEFAULT_DATA_ID,
     DEFAULT_EVENT_ES_TABLE_ID,
     DEFAULT_LOG_ES_TABLE_ID,
+    DEFAULT_SPACE_ID,
+    DEFAULT_SPACE_TYPE,
     DEFAULT_TABLE_ID,
 )
 
@@ -69,3 +73,53 @@ def test_compose_es_table_id_detail(create_and_delete_record):
     for key in ["db", "measurement", "storage_id"]:
         assert key in data[DEFAULT_LOG_ES_TABLE_ID]
         assert key in data[f"{DEFAULT_EVENT_ES_TABLE_ID}.__default__"]
+
+
+def test_bulk_push_space_table_ids(mocker):
+    space_values = {
+        "1": {DEFAULT_TABLE_ID: {"filters": [{"bk_biz_id": "1"}]}},
+        "2": {DEFAULT_TABLE_ID: {"filters": [{"bk_biz_id": "2"}]}},
+        "3": {},
+    }
+    client = SpaceTableIDRedis()
+    mocker.patch.object(client, "load_bulk_index")
+    mocker.patch.object(
+        client, "compose_space_table_ids", side_effect=lambda space_type, space_id: space_values[space_id]
+    )
+    # 空间 1 路由未变化，空间 2 路由有变化，空间 3 路由为空
+    mocker.patch(
+        "metadata.models.space.space_table_id_redis.RedisTools.hmget",
+        return_value=[json.dumps(space_values["1"]), json.dumps({}), None],
+    )
+    mock_hmset = mocker.patch("metadata.models.space.space_table_id_redis.RedisTools.hmset_to_redis")
+    mock_publish = mocker.patch("metadata.models.space.space_table_id_redis.RedisTools.publish")
+
+    space_list = [{"space_type": "bkcc", "space_id": space_id} for space_id in ["1", "2", "3"]]
+    changed_space_uids = client.bulk_push_space_table_ids(space_list, is_publish=True)
+
+    assert changed_space_uids == ["bkcc__2"]
+    mock_hmset.assert_called_once()
+    assert json.loads(mock_hmset.call_args[0][1]["bkcc__2"]) == space_values["2"]
+    mock_publish.assert_called_once_with(mocker.ANY, ["bkcc__2"])
+    assert client._bulk_index is None
+
+
+def test_bulk_index_same_as_query(create_and_delete_record):
+    client = SpaceTableIDRedis()
+    space = (DEFAULT_SPACE_TYPE, DEFAULT_SPACE_ID)
+    cluster_id_list = [DEFAULT_BCS_CLUSTER_ID_ONE, DEFAULT_BCS_CLUSTER_ID_TWO]
+
+    def _compose():
+        return {
+            "table_id_data_id": client._get_space_table_id_data_id(*space),
+            "resource_id": client._get_space_resource(*space, DEFAULT_SPACE_TYPE)["resource_id"],
+            "cluster_data_ids": client._get_cluster_data_ids(cluster_id_list),
+            "platform_data_ids": client._get_platform_data_ids(DEFAULT_SPACE_TYPE),
+            "data": client._compose_data(*space),
+        }
+
+    expected = _compose()
+    # 预加载后计算结果与逐个查询保持一致
+    client.load_bulk_index()
+    assert _compose() == expected
+    client.clear_bulk_index()